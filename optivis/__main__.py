@@ -10,4 +10,8 @@ if len(sys.argv) > 1:
     suite = loader.discover('.')
 
     runner = unittest.runner.TextTestRunner()
-    runner.run(suite)
\ No newline at end of file
+    runner.run(suite)
+  elif sys.argv[1] == 'export':
+    import optivis.view.batch
+
+    sys.exit(1 if optivis.view.batch.main(sys.argv[2:]) > 0 else 0)
\ No newline at end of file
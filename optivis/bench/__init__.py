@@ -3,11 +3,15 @@ from __future__ import unicode_literals, division
 import abc
 import weakref
 
+import optivis.geometry
+import observers
 import labels
 
-class AbstractBenchItem(object):
+class AbstractBenchItem(observers.Observable):
   """
   Abstract class for any bench item (e.g. component, link) to subclass. This does not include labels.
+  
+  Observers are notified when attributes affecting how the item is drawn change.
   """
   
   __metaclass__ = abc.ABCMeta
@@ -17,6 +21,9 @@ class AbstractBenchItem(object):
     self.paramList = paramList
     self.pykatObject = pykatObject
     
+    # new items have not been laid out yet
+    self.dirty = True
+    
   @abc.abstractmethod
   def getLabelOrigin(self):
     pass
@@ -25,10 +32,26 @@ class AbstractBenchItem(object):
   def getLabelAzimuth(self):
     pass
   
+  def getLabelRotation(self):
+    return optivis.geometry.Rotation(self.getLabelAzimuth())
+  
   @abc.abstractmethod
   def getSize(self):
     pass
     
+  @property
+  def dirty(self):
+    """
+    Whether a parameter affecting the layout of this item has changed since
+    the item was last laid out.
+    """
+    
+    return self.__dirty
+  
+  @dirty.setter
+  def dirty(self, dirty):
+    self.__dirty = bool(dirty)
+    
   @property
   def labels(self):
     return self.__labels
@@ -49,6 +72,19 @@ class AbstractBenchItem(object):
 
     self.__labels = processedLabels
 
+  def getExternalReferences(self):
+    """
+    Get objects referred to by this item that aren't part of the bench, e.g.
+    pykat objects, which copies of the item should share rather than copy.
+    """
+    
+    references = [self.__pykatObject, self.paramList]
+    
+    for label in self.labels:
+      references.append(label.content)
+    
+    return references
+  
   @property
   def pykatObject(self):
     # references to external items should be made using weakref, so if they are deleted after the reference is made, the reference will be None
@@ -21,6 +21,9 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if position is None:
       position = optivis.geometry.Coordinates(0, 0)
     
+    # bounding box, computed when first needed
+    self.__boundingBox = None
+    
     self.name = name
     self.filename = filename
     self.size = size
@@ -38,14 +41,41 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
   
   def getLabelAzimuth(self):
     return self.azimuth
+  
+  def getLabelRotation(self):
+    return self.rotation
     
   def getSize(self):
     return self.size
     
   def __eq__(self, other):
-    return self.__dict__ == other.__dict__
+    # a component's nodes refer back to the component itself, so two distinct
+    # components never have equal attributes; identity is therefore enough
+    return self is other
+  
+  def __ne__(self, other):
+    return self is not other
+  
+  def __hash__(self):
+    return id(self)
+  
+  def getExternalReferences(self):
+    return super(AbstractComponent, self).getExternalReferences() + [self.tooltip]
   
   def getBoundingBox(self):
+    """
+    Get the (lower, upper) corners of the box enclosing the rotated component.
+    
+    The box is cached until the component's position, azimuth or size is set,
+    so the returned coordinates must not be modified.
+    """
+    
+    if self.__boundingBox is None:
+      self.__boundingBox = self.calculateBoundingBox()
+    
+    return self.__boundingBox
+  
+  def calculateBoundingBox(self):
     # get nominal corner positions
     topLeft = self.size * optivis.geometry.Coordinates(-0.5, -0.5)
     topRight = self.size * optivis.geometry.Coordinates(0.5, -0.5)
@@ -53,10 +83,10 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     bottomRight = self.size * optivis.geometry.Coordinates(0.5, 0.5)
     
     # rotate corners by azimuth
-    topLeft = topLeft.rotate(self.azimuth)
-    topRight = topRight.rotate(self.azimuth)
-    bottomLeft = bottomLeft.rotate(self.azimuth)
-    bottomRight = bottomRight.rotate(self.azimuth)
+    topLeft = self.rotation.rotate(topLeft)
+    topRight = self.rotation.rotate(topRight)
+    bottomLeft = self.rotation.rotate(bottomLeft)
+    bottomRight = self.rotation.rotate(bottomRight)
     
     # find min and max coordinates    
     xPositions = [topLeft.x, topRight.x, bottomLeft.x, bottomRight.x]
@@ -91,8 +121,13 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if not isinstance(filename, basestring):
       raise Exception('Specified filename is not of type basestring')
     
+    changed = self.hasObservers() and filename != self.__filename
+    
     self.__filename = filename
     
+    if changed:
+      self.notifyObservers('filename')
+    
   @property
   def size(self):
     return self.__size
@@ -107,7 +142,15 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if size.x < 0 or size.y < 0:
       raise Exception('Size dimensions must be positive')
     
+    changed = self.hasObservers() and size != self.__size
+    
     self.__size = size
+    
+    # invalidate cached bounding box
+    self.__boundingBox = None
+    
+    if changed:
+      self.notifyObservers('size')
   
   @property
   def inputNodes(self):
@@ -134,7 +177,28 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
     azimuth = float(azimuth) % 360
     
+    changed = self.hasObservers() and azimuth != self.__azimuth
+    
     self.__azimuth = azimuth
+    self.dirty = True
+    
+    # invalidate cached rotation and bounding box
+    self.__rotation = None
+    self.__boundingBox = None
+    
+    if changed:
+      self.notifyObservers('azimuth')
+  
+  @property
+  def rotation(self):
+    """
+    Rotation by this component's azimuth, cached until the azimuth changes.
+    """
+    
+    if self.__rotation is None:
+      self.__rotation = optivis.geometry.Rotation(self.azimuth)
+    
+    return self.__rotation
   
   @property
   def aoi(self):
@@ -145,7 +209,13 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
     aoi = float(aoi) % 360
     
+    changed = self.hasObservers() and aoi != self.__aoi
+    
     self.__aoi = aoi
+    self.dirty = True
+    
+    if changed:
+      self.notifyObservers('aoi')
     
   @property
   def position(self):
@@ -156,7 +226,19 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if not isinstance(position, optivis.geometry.Coordinates):
       raise Exception('Specified position is not of type optivis.geometry.Coordinates')
     
+    if self.__boundingBox is not None:
+      # moving the component doesn't change the shape of its bounding box, so
+      # move the box rather than calculating it again
+      offset = position - self.__position
+      
+      self.__boundingBox = (self.__boundingBox[0].translate(offset), self.__boundingBox[1].translate(offset))
+    
+    changed = self.hasObservers() and position != self.__position
+    
     self.__position = position
+    
+    if changed:
+      self.notifyObservers('position')
   
   def getInputNode(self, nodeName):
     for node in self.inputNodes:
@@ -4,8 +4,9 @@ import abc
 
 import optivis.bench
 import optivis.geometry
+import observers
 
-class AbstractLabel(object):
+class AbstractLabel(observers.Observable):
   def __init__(self, *args, **kwargs):
     super(AbstractLabel, self).__init__(*args, **kwargs)
 
@@ -39,6 +40,14 @@ class Label(AbstractLabel):
 
   def __str__(self):
     return "\"{0}\"".format(self.text)
+  
+  def getAbsolutePosition(self):
+    """
+    Get position of label's anchor, taking account of its item's label origin
+    and azimuth, and the label's position and offset with respect to these.
+    """
+    
+    return self.item.getLabelRotation().rotateAndTranslate(self.position * self.item.getSize() + self.offset, self.item.getLabelOrigin())
 
   @property
   def text(self):
@@ -49,7 +58,12 @@ class Label(AbstractLabel):
     if not isinstance(text, basestring):
       raise Exception('Specified label text is not of type basestring')
 
+    changed = self.hasObservers() and text != self.__text
+    
     self.__text = text
+    
+    if changed:
+      self.notifyObservers('text')
   
   @property
   def position(self):
@@ -61,8 +75,13 @@ class Label(AbstractLabel):
     if not isinstance(position, optivis.geometry.Coordinates):
       raise Exception('Specified position is not of type Coordinates')
     
+    changed = self.hasObservers() and position != self.__position
+    
     self.__position = position
     
+    if changed:
+      self.notifyObservers('position')
+    
   @property
   def azimuth(self):
     return self.__azimuth
@@ -72,7 +91,12 @@ class Label(AbstractLabel):
     # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
     azimuth = float(azimuth)
     
+    changed = self.hasObservers() and azimuth != self.__azimuth
+    
     self.__azimuth = azimuth
+    
+    if changed:
+      self.notifyObservers('azimuth')
 
   @property
   def item(self):
@@ -94,4 +118,9 @@ class Label(AbstractLabel):
     if not isinstance(offset, optivis.geometry.Coordinates):
       raise Exception('Specified offset is not of type Coordinates')
 
+    changed = self.hasObservers() and offset != self.__offset
+    
     self.__offset = offset
+    
+    if changed:
+      self.notifyObservers('offset')
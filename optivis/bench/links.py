@@ -57,10 +57,7 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
     return optivis.geometry.Coordinates(math.sqrt(math.pow(size.x, 2) + math.pow(size.y, 2)), 0)
   
   def hasComponent(self, component):
-    if component in self.getComponents():
-      return True
-    
-    return False
+    return component is self.outputNode.component or component is self.inputNode.component
   
   def getComponents(self):
     return [self.outputNode.component, self.inputNode.component]
@@ -120,7 +117,13 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
       if length < 0:
         raise Exception('Length must be greater than or equal to 0')
     
+    changed = self.hasObservers() and length != self.__length
+    
     self.__length = length
+    self.dirty = True
+    
+    if changed:
+      self.notifyObservers('length')
     
   @property
   def start(self):
@@ -131,8 +134,13 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
     if not isinstance(start, optivis.geometry.Coordinates):
       raise Exception('Specified start is not of type optivis.geometry.Coordinates')
     
+    changed = self.hasObservers() and start != self.__start
+    
     self.__start = start
     
+    if changed:
+      self.notifyObservers('start')
+    
   @property
   def end(self):
     return self.__end
@@ -142,7 +150,12 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
     if not isinstance(end, optivis.geometry.Coordinates):
       raise Exception('Specified end is not of type optivis.geometry.Coordinates')
     
+    changed = self.hasObservers() and end != self.__end
+    
     self.__end = end
+    
+    if changed:
+      self.notifyObservers('end')
 
   @property
   def specs(self):
@@ -160,6 +173,8 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
     else:
       raise Exception('Specified specs is not a LinkSpec or a list of LinkSpec objects')
 
+    self.notifyObservers('specs')
+
 class Link(AbstractLink):
   def __init__(self, *args, **kwargs):
     super(Link, self).__init__(*args, **kwargs)
@@ -82,14 +82,14 @@ class Node(object):
     Get position of node with respect to component's center
     """
     
-    return (self.position * self.component.size).rotate(self.component.azimuth)
+    return self.component.rotation.rotate(self.position * self.component.size)
   
   def getAbsolutePosition(self):
     """
     Return position of node taking account of node's component's position
     """
     
-    return self.component.position.translate(self.getRelativePosition())
+    return self.component.rotation.rotateAndTranslate(self.position * self.component.size, self.component.position)
   
   def getAbsoluteAzimuth(self):
     return self.component.azimuth + self.getNodeAzimuth()
@@ -0,0 +1,47 @@
+from __future__ import unicode_literals, division
+
+class Observable(object):
+  """
+  Mixin for objects which notify observers when their attributes change, e.g.
+  so that views can update only what a change affects.
+  
+  Observers are callables taking the changed object and the name of the
+  changed attribute. They are not pickled or copied along with the object.
+  """
+  
+  # no observers until the first is added
+  __observers = ()
+  
+  def addObserver(self, observer):
+    if not callable(observer):
+      raise Exception('Specified observer is not callable')
+    
+    if not self.__observers:
+      self.__observers = []
+    
+    self.__observers.append(observer)
+  
+  def removeObserver(self, observer):
+    if observer not in self.__observers:
+      raise Exception('Specified observer is not observing {0}'.format(self))
+    
+    self.__observers.remove(observer)
+  
+  def hasObservers(self):
+    return len(self.__observers) > 0
+  
+  def notifyObservers(self, attribute):
+    # iterate over a copy, as observers may remove themselves
+    for observer in list(self.__observers):
+      observer(self, attribute)
+  
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    
+    # observers are usually bound to views of this object, so aren't part of its state
+    state.pop('_Observable__observers', None)
+    
+    return state
+  
+  def __setstate__(self, state):
+    self.__dict__.update(state)
@@ -60,5 +60,53 @@ class TestComponentAttributes(TestCase):
     self.assertRaises(Exception, setattr, self.componentA, 'position', (5, 5))
     self.assertRaises(Exception, setattr, self.componentA, 'position', '(5, 5)')
     
+class TestComponentIdentity(TestCase):
+  def test_equality(self):
+    componentA = components.Laser()
+    componentB = components.Laser()
+    
+    self.assertEqual(componentA, componentA)
+    self.assertNotEqual(componentA, componentB)
+  
+  def test_hash(self):
+    componentA = components.Laser()
+    componentB = components.Laser()
+    
+    self.assertEqual(len(set([componentA, componentA, componentB])), 2)
+    
+class TestComponentRotation(TestCase):
+  def setUp(self):
+    self.componentA = components.Laser(azimuth=30)
+  
+  def test_rotation_cached(self):
+    self.assertIs(self.componentA.rotation, self.componentA.rotation)
+    self.assertEqual(self.componentA.rotation.azimuth, 30)
+  
+  def test_rotation_invalidated(self):
+    rotation = self.componentA.rotation
+    
+    self.componentA.azimuth = 60
+    
+    self.assertIsNot(self.componentA.rotation, rotation)
+    self.assertEqual(self.componentA.rotation.azimuth, 60)
+    
+class TestComponentBoundingBox(TestCase):
+  def setUp(self):
+    self.componentA = components.CavityMirror()
+  
+  def test_bounding_box_cached(self):
+    self.assertIs(self.componentA.getBoundingBox(), self.componentA.getBoundingBox())
+  
+  def test_bounding_box_moved(self):
+    self.componentA.getBoundingBox()
+    
+    self.componentA.position = optivis.geometry.Coordinates(10, 20)
+    self.componentA.azimuth = 90
+    
+    self.assertEqual(self.componentA.getBoundingBox(), self.componentA.calculateBoundingBox())
+    
+    self.componentA.position = optivis.geometry.Coordinates(-5, 5)
+    
+    self.assertEqual(self.componentA.getBoundingBox(), self.componentA.calculateBoundingBox())
+    
 # TODO: tests for getInputNode/getOutputNode (checks whether specified node search term is string), tests for inputNodes/outputNodes setters
-# TODO: test for getBoundingBox() ?
\ No newline at end of file
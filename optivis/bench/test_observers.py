@@ -0,0 +1,97 @@
+from __future__ import unicode_literals, division
+
+import pickle
+from unittest import TestCase
+
+import optivis.geometry
+import components
+import links
+import labels
+
+class Recorder(object):
+  """
+  Observer recording the notifications it receives.
+  """
+  
+  def __init__(self):
+    self.notifications = []
+  
+  def __call__(self, item, attribute):
+    self.notifications.append((item, attribute))
+
+class TestObservers(TestCase):
+  def setUp(self):
+    self.componentA = components.Laser()
+    self.componentB = components.CavityMirror()
+    
+    self.link = links.Link(self.componentA.getOutputNode('out'), self.componentB.getInputNode('fr'), 10)
+    self.label = labels.Label(text='label', item=self.componentB)
+    
+    self.recorder = Recorder()
+  
+  def test_component_notifications(self):
+    self.componentB.addObserver(self.recorder)
+    
+    self.componentB.aoi = 10
+    self.componentB.azimuth = 20
+    self.componentB.position = optivis.geometry.Coordinates(1, 2)
+    
+    self.assertEqual(self.recorder.notifications, [(self.componentB, 'aoi'), (self.componentB, 'azimuth'), (self.componentB, 'position')])
+  
+  def test_link_notifications(self):
+    self.link.addObserver(self.recorder)
+    
+    self.link.length = 20
+    self.link.start = optivis.geometry.Coordinates(1, 2)
+    self.link.end = optivis.geometry.Coordinates(3, 4)
+    
+    self.assertEqual(self.recorder.notifications, [(self.link, 'length'), (self.link, 'start'), (self.link, 'end')])
+  
+  def test_label_notifications(self):
+    self.label.addObserver(self.recorder)
+    
+    self.label.offset = optivis.geometry.Coordinates(5, 0)
+    self.label.text = 'other'
+    
+    self.assertEqual(self.recorder.notifications, [(self.label, 'offset'), (self.label, 'text')])
+  
+  def test_unchanged_not_notified(self):
+    self.componentB.addObserver(self.recorder)
+    
+    # setting the same values doesn't change anything
+    self.componentB.aoi = self.componentB.aoi
+    self.componentB.position = self.componentB.position.translate(optivis.geometry.Coordinates(0, 0))
+    
+    self.assertEqual(self.recorder.notifications, [])
+  
+  def test_other_items_not_notified(self):
+    self.componentB.addObserver(self.recorder)
+    
+    self.componentA.aoi = 10
+    self.link.length = 20
+    
+    self.assertEqual(self.recorder.notifications, [])
+  
+  def test_remove_observer(self):
+    self.componentB.addObserver(self.recorder)
+    self.componentB.removeObserver(self.recorder)
+    
+    self.componentB.aoi = 10
+    
+    self.assertFalse(self.componentB.hasObservers())
+    self.assertEqual(self.recorder.notifications, [])
+    
+    # not observing any more
+    self.assertRaises(Exception, self.componentB.removeObserver, self.recorder)
+  
+  def test_invalid_observer(self):
+    self.assertRaises(Exception, self.componentB.addObserver, None)
+  
+  def test_observers_not_pickled(self):
+    self.componentB.addObserver(self.recorder)
+    
+    # the recorder would be pickled if observers were part of the component's state
+    component = pickle.loads(pickle.dumps(self.componentB, pickle.HIGHEST_PROTOCOL))
+    
+    self.assertFalse(component.hasObservers())
+    self.assertEqual(component.aoi, self.componentB.aoi)
@@ -3,36 +3,33 @@ from __future__ import unicode_literals, division
 import math
 
 class Coordinates(object):
+  # store coordinates in fixed slots rather than a per-instance dict, as very
+  # many coordinates are created during layout and drawing
+  __slots__ = ('x', 'y')
+  
   def __init__(self, x, y):
     self.x = x
     self.y = y
   
-  @property
-  def x(self):
-    return self.__x
-  
-  @x.setter
-  def x(self, x):
-    self.__x = x
-  
-  @property
-  def y(self):
-    return self.__y
-  
-  @y.setter
-  def y(self, y):
-    self.__y = y
-  
   def __str__(self):
     return "({0}, {1})".format(self.x, self.y)
+  
+  def __getstate__(self):
+    # needed to pickle with __slots__
+    return (self.x, self.y)
+  
+  def __setstate__(self, state):
+    (self.x, self.y) = state
     
   def translate(self, *args):
-    translation = Coordinates(0, 0)
+    x = self.x
+    y = self.y
     
     for arg in args:
-      translation += arg
+      x += arg.x
+      y += arg.y
     
-    return Coordinates(self.x + translation.x, self.y + translation.y)
+    return Coordinates(x, y)
   
   def rotate(self, azimuth):
     """
@@ -40,11 +37,31 @@ class Coordinates(object):
     Azimuth is the angle in degrees to rotate in a clockwise direction.
     """
     
+    angle = math.radians(azimuth)
+    cos = math.cos(angle)
+    sin = math.sin(angle)
+    
     # apply rotation matrix to x and y
-    xRot = self.x * math.cos(math.radians(azimuth)) - self.y * math.sin(math.radians(azimuth))
-    yRot = self.x * math.sin(math.radians(azimuth)) + self.y * math.cos(math.radians(azimuth))
+    return Coordinates(self.x * cos - self.y * sin, self.x * sin + self.y * cos)
+  
+  def rotateAndTranslate(self, azimuth, *args):
+    """
+    Rotation of coordinates about the origin followed by translation, without
+    creating intermediate coordinates.
+    """
+    
+    angle = math.radians(azimuth)
+    cos = math.cos(angle)
+    sin = math.sin(angle)
+    
+    x = self.x * cos - self.y * sin
+    y = self.x * sin + self.y * cos
     
-    return Coordinates(xRot, yRot)
+    for arg in args:
+      x += arg.x
+      y += arg.y
+    
+    return Coordinates(x, y)
   
   def flip(self):
     return Coordinates(-self.x, -self.y)
@@ -61,31 +78,17 @@ class Coordinates(object):
     tol=1e-18
     rel=1e-7
     
-    if tol is rel is None:
-      raise TypeError('Cannot specify both absolute and relative errors are None')
-    
-    xTests = []
-    yTests = []
-    
-    if tol is not None:
-      xTests.append(tol)
-      yTests.append(tol)
-      
-    if rel is not None:
-      xTests.append(rel * abs(self.x))
-      yTests.append(rel * abs(self.y))
-    
-    assert xTests
-    assert yTests
-    
     if not isinstance(otherCoordinates, Coordinates):
       if not isinstance(otherCoordinates, float) or isinstance(otherCoordinates, int):
-	raise Exception('Specified equality target is not of type Coordinates, float or int')
-      
-      return (abs(self.x - otherCoordinates) <= max(xTests)) and (abs(self.y - otherCoordinates) <= max(yTests))
+        raise Exception('Specified equality target is not of type Coordinates, float or int')
       
+      otherX = otherCoordinates
+      otherY = otherCoordinates
     else:
-      return (abs(self.x - otherCoordinates.x) <= max(xTests)) and (abs(self.y - otherCoordinates.y) <= max(yTests))
+      otherX = otherCoordinates.x
+      otherY = otherCoordinates.y
+    
+    return (abs(self.x - otherX) <= max(tol, rel * abs(self.x))) and (abs(self.y - otherY) <= max(tol, rel * abs(self.y)))
   
   def __ne__(self, otherCoordinates):
     return not self.__eq__(otherCoordinates)
@@ -128,3 +131,39 @@ class Coordinates(object):
       return Coordinates(self.x - factor.x, self.y - factor.y)
     else:
       return Coordinates(self.x - factor, self.y - factor)  
+
+class Rotation(object):
+  """
+  Rotation about the origin by a fixed azimuth, using a left-handed coordinate
+  system. The cosine and sine of the azimuth are computed once, so the same
+  rotation can be applied to many coordinates cheaply.
+  """
+  
+  __slots__ = ('azimuth', 'cos', 'sin')
+  
+  def __init__(self, azimuth):
+    angle = math.radians(azimuth)
+    
+    self.azimuth = azimuth
+    self.cos = math.cos(angle)
+    self.sin = math.sin(angle)
+  
+  def __getstate__(self):
+    # needed to pickle with __slots__
+    return self.azimuth
+  
+  def __setstate__(self, state):
+    self.__init__(state)
+  
+  def rotate(self, coordinates):
+    return Coordinates(coordinates.x * self.cos - coordinates.y * self.sin, coordinates.x * self.sin + coordinates.y * self.cos)
+  
+  def rotateAndTranslate(self, coordinates, *args):
+    x = coordinates.x * self.cos - coordinates.y * self.sin
+    y = coordinates.x * self.sin + coordinates.y * self.cos
+    
+    for arg in args:
+      x += arg.x
+      y += arg.y
+    
+    return Coordinates(x, y)
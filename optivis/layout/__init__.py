@@ -5,10 +5,13 @@ import math
 
 import optivis
 import optivis.geometry
+import optivis.log
 import optivis.bench.components
 import optivis.bench.links
 import scale
 
+logger = optivis.log.getLogger('layout')
+
 class AbstractLayout(object):
   __metaclass__ = abc.ABCMeta
 
@@ -17,12 +20,34 @@ class AbstractLayout(object):
   # set of components that are part of links
   linkedComponents = set([])
   
+  # whether arrange() can re-place just the components downstream of edited items
+  incrementalSupported = True
+  
   def __init__(self, scene, scaleFunc=None):
     if scaleFunc is None:
       scaleFunc = scale.ScaleFunction()
     
     self.scene = scene
     self.scaleFunc = scaleFunc
+    
+    # layout tree from the last arrangement: the link, reference component and
+    # order each component was placed with, and the components placed from
+    # each component
+    self.placements = {}
+    self.children = {}
+    self.placementCount = 0
+    
+    # reference, number of links and constraints, and scale function
+    # coefficients present at the last arrangement
+    self.arrangedReference = None
+    self.arrangedLinkCount = None
+    self.arrangedConstraintCount = None
+    self.arrangedCoefficients = None
+    
+    # scene's layout stamp set by the last arrangement, and by the last
+    # arrangement that built the layout tree
+    self.arrangedStamp = None
+    self.placedStamp = None
   
   @property
   def scene(self):
@@ -50,33 +75,235 @@ class AbstractLayout(object):
   def isFixed(self, component):
     pass
 
-  def arrange(self):    
+  def arrange(self, incremental=False):
+    """
+    Lay out the scene.
+    
+    If incremental is True and the scene has been arranged by this layout
+    before, only the components downstream of components and links edited
+    since then are re-placed. Otherwise, the whole scene is laid out.
+    """
+    
     # make sure there is a reference component
     if self.scene.reference is None:
       # set reference to first link's output component
       self.scene.reference = self.scene.links[0].outputNode.component
     
-    ###
-    # Layout and link everything
-    
-    # empty linked components list
-    self.linkedComponents = set([])
-    
-    # layout links
-    self.layoutLinks()
+    if incremental and self.canArrangeIncrementally():
+      # layout only what has changed
+      self.layoutDirtyItems()
+    else:
+      ###
+      # Layout and link everything
+      
+      # empty linked components list and layout tree
+      self.linkedComponents = set([])
+      self.placements = {}
+      self.children = {}
+      self.placementCount = 0
+      
+      # layout links
+      self.layoutLinks()
     
     # move scene positions so that left most, topmost object is at the origin
     self.normalisePositions()
+    
+    self.recordArrangement()
+    
+    # the layout tree matches the scene
+    self.placedStamp = self.arrangedStamp
+  
+  def recordArrangement(self):
+    """
+    Record the scene as arranged by this layout, e.g. after positions found by
+    laying out a snapshot of the scene with this layout have been set on it.
+    The layout tree is not updated, so the next arrangement is a full one.
+    """
+    
+    # remember what was arranged
+    self.arrangedReference = self.scene.reference
+    self.arrangedLinkCount = len(self.scene.links)
+    self.arrangedConstraintCount = len(self.scene.constraints)
+    self.arrangedCoefficients = list(self.scaleFunc.coefficients)
+    
+    # stamp the scene, so other layouts know their arrangements are overwritten
+    self.scene.layoutStamp += 1
+    self.arrangedStamp = self.scene.layoutStamp
+    
+    # everything is now laid out
+    for component in self.scene.getComponents():
+      component.dirty = False
+    
+    for link in self.scene.links:
+      link.dirty = False
+    
+    for constraint in self.scene.constraints:
+      constraint.dirty = False
+  
+  def canArrangeIncrementally(self):
+    if not self.incrementalSupported:
+      return False
+    
+    # scene must have last been arranged by this layout, with the same reference and links
+    return self.placedStamp == self.scene.layoutStamp and self.arrangedReference is self.scene.reference and self.arrangedLinkCount == len(self.scene.links)
+  
+  def isArranged(self):
+    """
+    Check whether the scene is still as this layout last arranged it, i.e. no
+    other layout has arranged it and no links, constraints, bench item or
+    constraint parameters or scale function coefficients have changed since.
+    
+    Views can share a layout and call this to skip arranging the scene again.
+    """
+    
+    if self.arrangedStamp != self.scene.layoutStamp:
+      return False
+    
+    if self.arrangedReference is not self.scene.reference or self.arrangedLinkCount != len(self.scene.links) or self.arrangedConstraintCount != len(self.scene.constraints):
+      return False
+    
+    if self.arrangedCoefficients != list(self.scaleFunc.coefficients):
+      return False
+    
+    if any(constraint.dirty for constraint in self.scene.constraints):
+      return False
+    
+    return not any(component.dirty for component in self.scene.getComponents()) and not any(link.dirty for link in self.scene.links)
+  
+  def layoutDirtyItems(self):
+    """
+    Re-place the components downstream of edited items, leaving the rest of the
+    scene where it was last placed.
+    """
+    
+    # components whose placement, and that of everything downstream, must be redone
+    roots = []
+    
+    for component in self.scene.getComponents():
+      if not component.dirty:
+        continue
+      
+      if component is self.scene.reference:
+        # everything placed from the reference is affected
+        roots.extend(self.children.get(id(component), []))
+      elif id(component) in self.placements:
+        roots.append(component)
+    
+    for link in self.scene.links:
+      if not link.dirty:
+        continue
+      
+      # links which are not part of the layout tree are straight lines between
+      # fixed components, and are updated along with their components below
+      for component in link.getComponents():
+        if id(component) in self.placements and self.placements[id(component)][0] is link:
+          roots.append(component)
+    
+    # re-place upstream roots first, so that downstream ones are covered by them
+    roots.sort(key=lambda component: self.placements[id(component)][2])
+    
+    # components re-placed so far
+    movedComponents = set([])
+    
+    for root in roots:
+      if root in movedComponents:
+        # already re-placed as part of an upstream root
+        continue
+      
+      (link, referenceComponent, order) = self.placements[id(root)]
+      
+      subtree = self.getPlacedSubtree(root)
+      
+      # forget the subtree's placement so that it gets laid out again
+      for component in subtree:
+        self.linkedComponents.discard(component)
+        
+        del(self.placements[id(component)])
+        self.children.pop(id(component), None)
+      
+      self.children[id(referenceComponent)].remove(root)
+      
+      self.layoutLinkChain(link, referenceComponent)
+      
+      movedComponents.update(subtree)
+    
+    # components may have rotated in place
+    movedComponents.update(component for component in self.scene.getComponents() if component.dirty)
+    
+    # update links attached to moved components, including straight links from
+    # components which were not moved
+    for component in movedComponents:
+      for link in self.scene.getComponentLinks(component):
+        link.start = link.outputNode.getAbsolutePosition()
+        link.end = link.inputNode.getAbsolutePosition()
+  
+  def getPlacedSubtree(self, component):
+    """
+    Get the specified component and every component placed downstream of it
+    during the last arrangement.
+    """
+    
+    subtree = []
+    stack = [component]
+    
+    while stack:
+      component = stack.pop()
+      
+      subtree.append(component)
+      stack.extend(self.children.get(id(component), []))
+    
+    return subtree
   
   def layoutLinks(self):
     # loop over links attached to reference component, and also other links
     # attached to components to which these links attach the reference
     for link in self.getComponentLinks(self.scene.reference):
-      # recursive
       self.layoutLinkChain(link, self.scene.reference)
       
-  def layoutLinkChain(self, link, referenceComponent):    
-    print "[Layout] Linking {0} with respect to {1}".format(link, referenceComponent)
+  def layoutLinkChain(self, link, referenceComponent):
+    """
+    Lay out the specified link and every link downstream of it, depth first.
+    
+    An explicit stack is used instead of recursion so that chains of any
+    length can be laid out without hitting the interpreter's recursion limit.
+    """
+    
+    # a path through the scene can only use each link once in each direction
+    # before it must be going round in circles
+    maxDepth = 2 * len(self.scene.links)
+    
+    # stack of links still to lay out, with the component they are laid out
+    # from and their depth along the current path
+    stack = [(link, referenceComponent, 1)]
+    
+    while stack:
+      (link, referenceComponent, depth) = stack.pop()
+      
+      if depth > maxDepth:
+        raise Exception('Layout of link {0} does not terminate'.format(link))
+      
+      targetComponent = self.layoutLink(link, referenceComponent)
+      
+      if targetComponent is None:
+        # target was already laid out, so there's nothing downstream to do
+        continue
+      
+      # get links to/from the target component, avoiding this one
+      subLinks = self.getComponentLinks(targetComponent, avoid=link)
+      
+      # push sub links in reverse so they are popped, and laid out, in order
+      for subLink in reversed(subLinks):
+        stack.append((subLink, targetComponent, depth + 1))
+  
+  def layoutLink(self, link, referenceComponent):
+    """
+    Lay out the specified link with respect to the specified reference component.
+    
+    Returns the newly placed target component, or None if the target component
+    was already laid out.
+    """
+    
+    logger.debug("Linking %s with respect to %s", link, referenceComponent)
     
     referenceNode = None
     targetNode = None
@@ -94,13 +321,13 @@ class AbstractLayout(object):
     
     # check if target is already laid out
     if self.isFixed(targetComponent):      
-      print "[Layout]      WARNING: target component {0} is already laid out. Linking with straight line.".format(targetComponent)
+      logger.warning("Target component %s is already laid out. Linking with straight line.", targetComponent)
       
       # set link start and end positions
       link.start = link.outputNode.getAbsolutePosition()
       link.end = link.inputNode.getAbsolutePosition()
       
-      return
+      return None
     
     # set other node azimuth first
     targetNode.setAbsoluteAzimuth(referenceNode.getAbsoluteAzimuth())
@@ -116,25 +343,19 @@ class AbstractLayout(object):
     self.linkedComponents.add(referenceComponent)
     self.linkedComponents.add(targetComponent)
     
-    # get links to/from the target component, avoiding this one
-    subLinks = self.getComponentLinks(targetComponent, avoid=link)
+    # record where the target component was placed from
+    self.placements[id(targetComponent)] = (link, referenceComponent, self.placementCount)
+    self.placementCount += 1
     
-    # layout any components linked to target component
-    for subLink in subLinks:
-      self.layoutLinkChain(subLink, targetComponent)
+    if id(referenceComponent) not in self.children:
+      self.children[id(referenceComponent)] = []
     
-  def getComponentLinks(self, component, avoid=None):
-    links = []
+    self.children[id(referenceComponent)].append(targetComponent)
     
-    for link in self.scene.links:
-      if link == avoid:
-	# skip this link, because it has been requested to be avoided
-	continue
-      
-      if link.hasComponent(component):
-	links.append(link)
-
-    return links
+    return targetComponent
+    
+  def getComponentLinks(self, component, avoid=None):
+    return self.scene.getComponentLinks(component, avoid=avoid)
 
   def removeLinkFromList(self, link, links):
     for i in range(0, len(links)):
@@ -155,15 +376,15 @@ class AbstractLayout(object):
     # angle
     pivotAngle = referenceNode.getAbsoluteAzimuth()
     
-    # position of component with respect to pivot
-    relativePosition = optivis.geometry.Coordinates(self.getScaledLinkLength(link.length), 0).rotate(pivotAngle)
+    # position of component with respect to pivot, before rotation
+    relativePosition = optivis.geometry.Coordinates(self.getScaledLinkLength(link.length), 0)
     
     if isinstance(referenceNode, optivis.bench.nodes.InputNode):
       # flip position because we're going 'backwards' from input to output
       relativePosition = relativePosition.flip()
     
     # absolute position of component
-    return pivotPosition.translate(relativePosition)
+    return relativePosition.rotateAndTranslate(pivotAngle, pivotPosition)
 
   def normalisePositions(self):
     """
@@ -196,6 +417,10 @@ class StandardLayout(AbstractLayout):
 class ConstrainedLayout(AbstractLayout):
   title = "Constrained"
   
+  # constraints can re-place components that are already laid out, so the
+  # layout tree does not tell us what is downstream of an edit
+  incrementalSupported = False
+  
   def __init__(self, *args, **kwargs):
     super(ConstrainedLayout, self).__init__(*args, **kwargs)
   
@@ -212,22 +437,21 @@ class ConstrainedLayout(AbstractLayout):
       # check if any constraints constrain this component
       for constraint in self.scene.constraints:
         if constraint.constrains(component):
-          print "{0} is fixed".format(component)
+          logger.debug("%s is fixed", component)
           return True
       
       # check if this is attached to a constrained component
-      for link in self.scene.links:
-        if link.hasComponent(component):
-          # this link is attached to the component
-          # is the other side constrained?
-          for thisComponent in link.getComponents():
-            if thisComponent is not component:
-              # this is the other side of the link
-              for constraint in self.scene.constraints:
-                if constraint.constrains(thisComponent):
-                  print "{0} is fixed because it's attached to fixed component {1}".format(component, thisComponent)
-                  return True
-    
-    print "{0} is not fixed".format(component)
-    
-    return False
\ No newline at end of file
+      for link in self.scene.getComponentLinks(component):
+        # this link is attached to the component
+        # is the other side constrained?
+        for thisComponent in link.getComponents():
+          if thisComponent is not component:
+            # this is the other side of the link
+            for constraint in self.scene.constraints:
+              if constraint.constrains(thisComponent):
+                logger.debug("%s is fixed because it's attached to fixed component %s", component, thisComponent)
+                return True
+    
+    logger.debug("%s is not fixed", component)
+    
+    return False
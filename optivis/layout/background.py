@@ -0,0 +1,332 @@
+from __future__ import unicode_literals, division
+
+import copy
+import threading
+import traceback
+
+import optivis.log
+import optivis.geometry
+import optivis.scene
+import optivis.bench.components
+import optivis.bench.nodes
+import optivis.bench.links
+
+logger = optivis.log.getLogger('layout')
+
+class LayoutComponent(optivis.bench.components.AbstractComponent):
+  """
+  Stand-in for a component in scenes rebuilt from snapshots, with only what
+  layouts use: size, angle of incidence, azimuth, position and nodes.
+  """
+  
+  def __init__(self, size, aoi, azimuth, position, dirty):
+    super(LayoutComponent, self).__init__(filename='', size=size, inputNodes=[], outputNodes=[], azimuth=azimuth, aoi=aoi, position=position)
+    
+    self.dirty = dirty
+
+class SceneSnapshot(object):
+  """
+  What layouts read from a scene, i.e. its link topology and lengths, the
+  sizes, angles of incidence and azimuths of its components, the nodes its
+  links attach to, and its reference and constraints.
+  
+  This is much cheaper to take than a copy of the scene, as graphics, labels
+  and other parameters are left out, and only holds plain values, so layouts
+  of the scene rebuilt from it can run on another thread.
+  """
+  
+  def __init__(self, scene):
+    # edit stamp of the scene when the snapshot was taken
+    self.editStamp = scene.editStamp
+    
+    components = scene.getComponents()
+    links = scene.links
+    
+    # indices of components and links, in that order, keyed by identity
+    indices = dict((id(item), index) for (index, item) in enumerate(components + list(links)))
+    
+    if scene.reference is None:
+      self.referenceIndex = None
+    elif id(scene.reference) in indices:
+      self.referenceIndex = indices[id(scene.reference)]
+    else:
+      raise Exception('Reference component is not linked in the scene')
+    
+    # (size, aoi, azimuth, position, dirty) of each component, in scene order,
+    # with coordinates as (x, y)
+    self.components = [((component.size.x, component.size.y), component.aoi, component.azimuth, (component.position.x, component.position.y), component.dirty) for component in components]
+    
+    # (component index, input, name, position, aoi multiplier, aoi offset) of
+    # each node that links attach to, with input True for input nodes
+    self.nodes = []
+    
+    # (output node index, input node index, length, dirty) of each link, in
+    # scene order
+    self.links = []
+    
+    nodeIndices = {}
+    
+    for link in links:
+      for node in [link.outputNode, link.inputNode]:
+        if id(node) not in nodeIndices:
+          nodeIndices[id(node)] = len(self.nodes)
+          
+          self.nodes.append((indices[id(node.component)], isinstance(node, optivis.bench.nodes.InputNode), node.name, (node.position.x, node.position.y), node.aoiMultiplier, node.aoiOffset))
+      
+      self.links.append((nodeIndices[id(link.outputNode)], nodeIndices[id(link.inputNode)], link.length, link.dirty))
+    
+    # (copy, item A index, item B index, dirty) of each constraint, with items
+    # indexed as above; the copies still refer to the scene's own items
+    self.constraints = [(copy.copy(constraint), indices[id(constraint.componentA)], indices[id(constraint.componentB)], constraint.dirty) for constraint in scene.constraints]
+  
+  def createScene(self):
+    """
+    Rebuild the scene from the snapshot, with stand-ins for its components.
+    """
+    
+    scene = optivis.scene.Scene(title='')
+    
+    components = [LayoutComponent(optivis.geometry.Coordinates(*size), aoi, azimuth, optivis.geometry.Coordinates(*position), dirty) for (size, aoi, azimuth, position, dirty) in self.components]
+    
+    nodes = []
+    
+    for (componentIndex, isInput, name, position, aoiMultiplier, aoiOffset) in self.nodes:
+      component = components[componentIndex]
+      
+      if isInput:
+        node = optivis.bench.nodes.InputNode(name=name, component=component, position=optivis.geometry.Coordinates(*position), aoiMultiplier=aoiMultiplier, aoiOffset=aoiOffset)
+        component.inputNodes.append(node)
+      else:
+        node = optivis.bench.nodes.OutputNode(name=name, component=component, position=optivis.geometry.Coordinates(*position), aoiMultiplier=aoiMultiplier, aoiOffset=aoiOffset)
+        component.outputNodes.append(node)
+      
+      nodes.append(node)
+    
+    for (outputIndex, inputIndex, length, dirty) in self.links:
+      link = optivis.bench.links.Link(nodes[outputIndex], nodes[inputIndex], length=length)
+      link.dirty = dirty
+      
+      scene.addLink(link)
+    
+    items = components + list(scene.links)
+    
+    if self.referenceIndex is not None:
+      scene.reference = items[self.referenceIndex]
+    
+    for (constraint, indexA, indexB, dirty) in self.constraints:
+      # copy again, so the snapshot can be rebuilt more than once
+      constraint = copy.copy(constraint)
+      constraint.componentA = items[indexA]
+      constraint.componentB = items[indexB]
+      constraint.dirty = dirty
+      
+      scene.addConstraint(constraint)
+    
+    return scene
+
+class LayoutResult(object):
+  """
+  Positions and azimuths found by laying out a scene rebuilt from a snapshot,
+  to be applied to the scene itself.
+  """
+  
+  def __init__(self, stamp, layout=None, error=None, editStamp=None):
+    # stamp of the request this is the result of
+    self.stamp = stamp
+    
+    # edit stamp of the scene when the snapshot laid out was taken
+    self.editStamp = editStamp
+    
+    # traceback of the exception raised by the layout, if any
+    self.error = error
+    
+    # layout manager class and scale function coefficients used
+    self.layoutManager = None
+    self.coefficients = None
+    
+    # index of the reference component, (position, azimuth, dirty) of each
+    # component and (start, end, dirty) of each link, in scene order
+    self.referenceIndex = None
+    self.componentStates = []
+    self.linkStates = []
+    
+    if layout is not None:
+      self.layoutManager = type(layout)
+      self.coefficients = list(layout.scaleFunc.coefficients)
+      
+      scene = layout.scene
+      components = scene.getComponents()
+      
+      self.referenceIndex = components.index(scene.reference)
+      self.componentStates = [(component.position, component.azimuth, component.dirty) for component in components]
+      self.linkStates = [(link.start, link.end, link.dirty) for link in scene.links]
+  
+  @property
+  def success(self):
+    return self.error is None
+  
+  def isOutdated(self, scene):
+    """
+    Check whether the specified scene has been edited since the snapshot laid
+    out was taken.
+    """
+    
+    return self.editStamp is not None and self.editStamp != scene.editStamp
+  
+  def apply(self, scene, layout=None):
+    """
+    Set the positions and azimuths of the specified scene's components and
+    links to those found by the layout. The scene must be the one that the
+    layout's snapshot was taken of, and must not have been edited since, as
+    the edits would be overwritten.
+    
+    If a layout of the scene is specified, e.g. one shared by views, and it
+    would have arranged the scene the same way, it records the scene as
+    arranged so that it doesn't arrange it again.
+    """
+    
+    if not self.success:
+      # last line of the traceback contains the exception
+      raise Exception('Layout failed: {0}'.format(self.error.strip().splitlines()[-1]))
+    
+    if self.isOutdated(scene):
+      raise Exception('Scene has been edited since the layout was requested')
+    
+    components = scene.getComponents()
+    
+    if len(components) != len(self.componentStates) or len(scene.links) != len(self.linkStates):
+      raise Exception('Layout result does not match the specified scene')
+    
+    # layout picks a reference if the scene doesn't have one
+    if scene.reference is None:
+      scene.reference = components[self.referenceIndex]
+    
+    for (component, (position, azimuth, dirty)) in zip(components, self.componentStates):
+      component.azimuth = azimuth
+      component.position = position
+      component.dirty = dirty
+    
+    for (link, (start, end, dirty)) in zip(scene.links, self.linkStates):
+      link.start = start
+      link.end = end
+      link.dirty = dirty
+    
+    if layout is not None and layout.scene is scene and type(layout) is self.layoutManager and list(layout.scaleFunc.coefficients) == self.coefficients:
+      layout.recordArrangement()
+    else:
+      # arrangements made by layouts of the scene itself are overwritten
+      scene.layoutStamp += 1
+
+class BackgroundLayout(object):
+  """
+  Lays out snapshots of scenes on a worker thread, so that the thread owning
+  the scenes isn't blocked. Snapshots are taken when the layout is requested,
+  so the worker never reads the scenes themselves.
+  
+  Only the latest request matters: requests still waiting when a new one is
+  made are dropped, and results of earlier requests, or of requests for
+  scenes edited since, are stale. Results are passed to the callback on the
+  worker thread, and should be applied with apply() on the thread owning the
+  scene, which ignores stale results.
+  """
+  
+  def __init__(self, callback):
+    self.callback = callback
+    
+    # stamp of the latest request
+    self.__stamp = 0
+    
+    # (stamp, scene snapshot, layout manager class, scale function copy) of
+    # the request waiting to be laid out, if any
+    self.__request = None
+    
+    self.__condition = threading.Condition()
+    self.__thread = None
+  
+  @property
+  def stamp(self):
+    return self.__stamp
+  
+  def request(self, scene, layoutManager, scaleFunc=None):
+    """
+    Request a layout of the specified scene, superseding earlier requests.
+    Returns the stamp of the request.
+    
+    This must be called on the thread owning the scene, as a snapshot of the
+    scene and a copy of the scale function are taken here for the worker to
+    lay out.
+    """
+    
+    snapshot = SceneSnapshot(scene)
+    scaleFuncCopy = copy.deepcopy(scaleFunc)
+    
+    with self.__condition:
+      self.__stamp += 1
+      self.__request = (self.__stamp, snapshot, layoutManager, scaleFuncCopy)
+      
+      if self.__thread is None:
+        self.__thread = threading.Thread(target=self.run, name='optivis-layout')
+        
+        # don't keep the process alive just for layouts
+        self.__thread.daemon = True
+        self.__thread.start()
+      
+      self.__condition.notify()
+      
+      return self.__stamp
+  
+  def run(self):
+    while True:
+      with self.__condition:
+        while self.__request is None:
+          self.__condition.wait()
+        
+        (stamp, snapshot, layoutManager, scaleFunc) = self.__request
+        self.__request = None
+      
+      self.callback(self.layout(stamp, snapshot, layoutManager, scaleFunc))
+  
+  @staticmethod
+  def layout(stamp, snapshot, layoutManager, scaleFunc=None):
+    """
+    Lay out the scene rebuilt from the specified snapshot, returning the
+    result.
+    """
+    
+    logger.debug("Starting background layout %d", stamp)
+    
+    try:
+      layout = layoutManager(snapshot.createScene(), scaleFunc=scaleFunc)
+      layout.arrange()
+      
+      return LayoutResult(stamp, layout=layout, editStamp=snapshot.editStamp)
+    except Exception:
+      return LayoutResult(stamp, error=traceback.format_exc(), editStamp=snapshot.editStamp)
+  
+  def isStale(self, result, scene=None):
+    """
+    Check whether the specified result has been superseded by a later request
+    or, if a scene is specified, whether the scene has been edited since the
+    result was requested.
+    """
+    
+    if result.stamp != self.__stamp:
+      return True
+    
+    return scene is not None and result.isOutdated(scene)
+  
+  def apply(self, result, scene, layout=None):
+    """
+    Apply the specified result to the scene, unless it is stale. Returns True
+    if it was applied, and False otherwise. See LayoutResult.apply for the
+    meaning of layout.
+    """
+    
+    if self.isStale(result, scene):
+      logger.debug("Dropping stale background layout %d", result.stamp)
+      
+      return False
+    
+    result.apply(scene, layout=layout)
+    
+    return True
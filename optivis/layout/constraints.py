@@ -4,14 +4,35 @@ import abc
 
 from optivis.bench import AbstractBenchItem
 from optivis.bench.links import AbstractLink
+from optivis.bench.observers import Observable
 
-class AbstractConstraint():
+class AbstractConstraint(Observable):
+  """
+  Observers are notified when the constrained items or other parameters of
+  the constraint change.
+  """
+  
   __metaclass__ = abc.ABCMeta
   
   def __init__(self, componentA, componentB):
     self.componentA = componentA
     self.componentB = componentB
     
+    # new constraints have not been applied by a layout yet
+    self.dirty = True
+  
+  @property
+  def dirty(self):
+    """
+    Whether the constraint has changed since the scene was last laid out.
+    """
+    
+    return self.__dirty
+  
+  @dirty.setter
+  def dirty(self, dirty):
+    self.__dirty = bool(dirty)
+    
   @property
   def componentA(self):
     return self.__componentA
@@ -22,6 +43,10 @@ class AbstractConstraint():
       raise Exception('Specified component is not of type AbstractBenchItem')
     
     self.__componentA = component
+    self.dirty = True
+    
+    if self.hasObservers():
+      self.notifyObservers('componentA')
 
   @property
   def componentB(self):
@@ -33,6 +58,10 @@ class AbstractConstraint():
       raise Exception('Specified component is not of type AbstractBenchItem')
     
     self.__componentB = component
+    self.dirty = True
+    
+    if self.hasObservers():
+      self.notifyObservers('componentB')
   
   @abc.abstractmethod
   def constrain(self):
@@ -89,7 +118,13 @@ class LinkAngularConstraint(AbstractLinkConstraint):
     # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
     angle = float(angle) % 360
     
+    changed = self.hasObservers() and angle != self.__angle
+    
     self.__angle = angle
+    self.dirty = True
+    
+    if changed:
+      self.notifyObservers('angle')
   
   def constrain(self):
     # set common component's angle of incidence
@@ -1,5 +1,4 @@
 from __future__ import unicode_literals, division
-import numpy
 
 class ScaleFunction(object):  
   def __init__(self, coefficients=None):    
@@ -17,6 +16,9 @@ class ScaleFunction(object):
     return scaledLength
   
   def validate(self):
+    # numpy is optional, so is only imported when it is needed
+    import numpy
+    
     roots = numpy.roots(numpy.polyder(self.coefficients))
     
   @property
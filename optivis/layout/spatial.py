@@ -0,0 +1,561 @@
+from __future__ import unicode_literals, division
+
+import math
+
+import optivis.geometry
+import optivis.bench.components
+import optivis.bench.links
+import optivis.bench.labels
+
+class SpatialIndex(object):
+  """
+  Uniform grid index over the bounding boxes of laid out items.
+  
+  Items are components, links and labels, or any other object whose bounding
+  box is given explicitly. Each item is stored in every grid cell its box
+  overlaps, except links, which are stored in the cells their line segments
+  cross, so that range, nearest and intersection queries only look at items
+  near the area of interest. Boxes are read when items are inserted, so
+  the index must be updated when items move; see update() and refresh().
+  """
+  
+  def __init__(self, cellSize=50):
+    self.cellSize = cellSize
+    
+    # map of item identities to (item, bounds, cells, order, segment), where
+    # bounds is (lower x, lower y, upper x, upper y), order is the insertion
+    # order and segment is the (start x, start y, end x, end y) of links, or
+    # None for other items
+    self.__entries = {}
+    
+    # map of (column, row) cells to the identities of the items overlapping them
+    self.__cells = {}
+    
+    # identities of items whose bounding boxes were specified explicitly
+    self.__explicit = set([])
+    
+    # (lower column, lower row, upper column, upper row) of the cells items
+    # have been added to since the index was last empty
+    self.__extent = None
+    
+    self.__count = 0
+  
+  @classmethod
+  def fromScene(cls, scene, cellSize=None):
+    """
+    Build an index of the components, links and labels in an arranged scene.
+    
+    If no cell size is specified, it is set to twice the mean component size.
+    """
+    
+    components = scene.getComponents()
+    
+    if cellSize is None:
+      if components:
+        cellSize = 2 * sum(max(component.size.x, component.size.y) for component in components) / len(components)
+      else:
+        cellSize = 50
+    
+    index = cls(cellSize=cellSize)
+    
+    for component in components:
+      index.insert(component)
+      
+      for label in component.labels:
+        index.insert(label)
+    
+    for link in scene.links:
+      index.insert(link)
+      
+      for label in link.labels:
+        index.insert(label)
+    
+    return index
+  
+  @property
+  def cellSize(self):
+    return self.__cellSize
+  
+  @cellSize.setter
+  def cellSize(self, cellSize):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    cellSize = float(cellSize)
+    
+    if cellSize <= 0:
+      raise Exception('Cell size must be greater than 0')
+    
+    self.__cellSize = cellSize
+  
+  def __len__(self):
+    return len(self.__entries)
+  
+  def __contains__(self, item):
+    return id(item) in self.__entries
+  
+  @staticmethod
+  def getItemBoundingBox(item):
+    """
+    Get the (lower, upper) corners of the box enclosing the specified item.
+    
+    Labels are represented by their anchor point, as the extent of their text
+    depends on how they are drawn.
+    """
+    
+    if isinstance(item, optivis.bench.components.AbstractComponent):
+      return item.getBoundingBox()
+    elif isinstance(item, optivis.bench.links.AbstractLink):
+      return (optivis.geometry.Coordinates(min(item.start.x, item.end.x), min(item.start.y, item.end.y)), optivis.geometry.Coordinates(max(item.start.x, item.end.x), max(item.start.y, item.end.y)))
+    elif isinstance(item, optivis.bench.labels.Label):
+      position = item.getAbsolutePosition()
+      
+      return (position, position)
+    else:
+      raise Exception('Bounding box of item {0} is unknown, so must be specified'.format(item))
+  
+  @staticmethod
+  def getItemSegment(item):
+    """
+    Get the (start x, start y, end x, end y) of the specified item's line
+    segment if it is a link, or None otherwise.
+    """
+    
+    if isinstance(item, optivis.bench.links.AbstractLink):
+      return (item.start.x, item.start.y, item.end.x, item.end.y)
+    
+    return None
+  
+  def insert(self, item, lowerBound=None, upperBound=None):
+    """
+    Add an item to the index, with its bounding box given by the specified
+    corners or, if these are not specified, found from the item itself.
+    """
+    
+    if id(item) in self.__entries:
+      raise Exception('Item {0} is already indexed'.format(item))
+    
+    segment = None
+    
+    if lowerBound is None or upperBound is None:
+      (lowerBound, upperBound) = self.getItemBoundingBox(item)
+      segment = self.getItemSegment(item)
+    else:
+      self.__explicit.add(id(item))
+    
+    bounds = (lowerBound.x, lowerBound.y, upperBound.x, upperBound.y)
+    
+    if segment is None:
+      cells = self.getCells(bounds)
+    else:
+      cells = self.getSegmentCells(segment)
+    
+    for cell in cells:
+      if cell not in self.__cells:
+        self.__cells[cell] = set([])
+      
+      self.__cells[cell].add(id(item))
+    
+    # cells covered by the bounds contain all of the item's cells
+    (lowerCell, upperCell) = (self.getCell(bounds[0], bounds[1]), self.getCell(bounds[2], bounds[3]))
+    
+    if self.__extent is None:
+      self.__extent = lowerCell + upperCell
+    else:
+      self.__extent = (min(self.__extent[0], lowerCell[0]), min(self.__extent[1], lowerCell[1]), max(self.__extent[2], upperCell[0]), max(self.__extent[3], upperCell[1]))
+    
+    self.__entries[id(item)] = (item, bounds, cells, self.__count, segment)
+    self.__count += 1
+  
+  def remove(self, item):
+    if id(item) not in self.__entries:
+      raise Exception('Item {0} is not indexed'.format(item))
+    
+    (item, bounds, cells, order, segment) = self.__entries.pop(id(item))
+    self.__explicit.discard(id(item))
+    
+    for cell in cells:
+      self.__cells[cell].discard(id(item))
+      
+      if not self.__cells[cell]:
+        del(self.__cells[cell])
+    
+    if not self.__cells:
+      self.__extent = None
+  
+  def update(self, item, lowerBound=None, upperBound=None):
+    """
+    Move an indexed item to its new bounding box. Returns True if the box
+    changed, and False otherwise.
+    """
+    
+    if id(item) not in self.__entries:
+      raise Exception('Item {0} is not indexed'.format(item))
+    
+    if lowerBound is None or upperBound is None:
+      (lowerBound, upperBound) = self.getItemBoundingBox(item)
+    
+    explicit = id(item) in self.__explicit
+    
+    (item, bounds, cells, order, segment) = self.__entries[id(item)]
+    
+    if bounds == (lowerBound.x, lowerBound.y, upperBound.x, upperBound.y) and (explicit or segment == self.getItemSegment(item)):
+      # not moved
+      return False
+    
+    self.remove(item)
+    self.insert(item, lowerBound, upperBound)
+    
+    if not explicit:
+      self.__explicit.discard(id(item))
+    
+    # keep original insertion order
+    self.__entries[id(item)] = self.__entries[id(item)][:3] + (order,) + self.__entries[id(item)][4:]
+    
+    return True
+  
+  def refresh(self):
+    """
+    Update every indexed item whose bounding box can be found from the item
+    itself, e.g. after the scene has been arranged again. Only items which
+    have moved are reindexed. Returns the moved items.
+    """
+    
+    moved = []
+    
+    for (item, bounds, cells, order, segment) in sorted(self.__entries.values(), key=lambda entry: entry[3]):
+      if id(item) in self.__explicit:
+        # box can't be found from the item
+        continue
+      
+      if self.update(item):
+        moved.append(item)
+    
+    return moved
+  
+  def getItemsInRange(self, lowerBound, upperBound):
+    """
+    Get items whose bounding boxes overlap the rectangle with the specified corners.
+    """
+    
+    bounds = (lowerBound.x, lowerBound.y, upperBound.x, upperBound.y)
+    
+    return self.getItemsInBounds(bounds)
+  
+  def getItemsAt(self, position):
+    """
+    Get items whose bounding boxes contain the specified position.
+    """
+    
+    return self.getItemsInRange(position, position)
+  
+  def getIntersectingItems(self, item):
+    """
+    Get items whose bounding boxes overlap the specified indexed item's.
+    """
+    
+    if id(item) not in self.__entries:
+      raise Exception('Item {0} is not indexed'.format(item))
+    
+    entry = self.__entries[id(item)]
+    
+    ids = set([])
+    
+    for cell in entry[2]:
+      ids.update(self.__cells[cell])
+    
+    ids.discard(id(item))
+    
+    entries = [self.__entries[key] for key in ids if self.entriesOverlap(entry, self.__entries[key])]
+    
+    # sort by insertion order
+    entries.sort(key=lambda entry: entry[3])
+    
+    return [entry[0] for entry in entries]
+  
+  def getIntersections(self):
+    """
+    Get every pair of items whose bounding boxes overlap.
+    """
+    
+    pairs = set([])
+    
+    for ids in self.__cells.values():
+      ids = sorted(ids, key=lambda key: self.__entries[key][3])
+      
+      for i in range(0, len(ids)):
+        for j in range(i + 1, len(ids)):
+          if self.entriesOverlap(self.__entries[ids[i]], self.__entries[ids[j]]):
+            pairs.add((ids[i], ids[j]))
+    
+    # sort by insertion order
+    pairs = sorted(pairs, key=lambda pair: (self.__entries[pair[0]][3], self.__entries[pair[1]][3]))
+    
+    return [(self.__entries[idA][0], self.__entries[idB][0]) for (idA, idB) in pairs]
+  
+  def getNearestItem(self, position):
+    """
+    Get the item whose bounding box is nearest to the specified position, or
+    None if the index is empty.
+    """
+    
+    if not self.__cells:
+      return None
+    
+    (column, row) = self.getCell(position.x, position.y)
+    (lowerColumn, lowerRow, upperColumn, upperRow) = self.__extent
+    
+    # nearest and furthest rings of cells around the position's cell that can
+    # contain items
+    minRing = max(0, lowerColumn - column, column - upperColumn, lowerRow - row, row - upperRow)
+    maxRing = max(abs(lowerColumn - column), abs(upperColumn - column), abs(lowerRow - row), abs(upperRow - row))
+    
+    # distance from the position to the edge of its cell
+    margin = min(position.x - column * self.cellSize, (column + 1) * self.cellSize - position.x, position.y - row * self.cellSize, (row + 1) * self.cellSize - position.y)
+    
+    nearestItem = None
+    nearestDistance = float('inf')
+    nearestOrder = None
+    
+    for ring in range(minRing, maxRing + 1):
+      for cell in self.getRingCells(column, row, ring):
+        for key in self.__cells.get(cell, []):
+          (item, bounds, cells, order, segment) = self.__entries[key]
+          
+          if segment is None:
+            distance = self.getDistance(bounds, position)
+          else:
+            distance = self.getSegmentDistance(segment, position)
+          
+          # prefer earlier items when equally near
+          if distance < nearestDistance or (distance == nearestDistance and order < nearestOrder):
+            nearestItem = item
+            nearestDistance = distance
+            nearestOrder = order
+      
+      # items not yet seen are only in further rings, which are at least this
+      # far away
+      if nearestDistance < ring * self.cellSize + margin:
+        break
+    
+    return nearestItem
+  
+  def getItemsInBounds(self, bounds):
+    ids = set([])
+    
+    for cell in self.getCells(bounds):
+      ids.update(self.__cells.get(cell, []))
+    
+    entries = [self.__entries[key] for key in ids if self.entryOverlapsBounds(self.__entries[key], bounds)]
+    
+    # sort by insertion order
+    entries.sort(key=lambda entry: entry[3])
+    
+    return [entry[0] for entry in entries]
+  
+  def getCell(self, x, y):
+    return (int(math.floor(x / self.cellSize)), int(math.floor(y / self.cellSize)))
+  
+  def getCells(self, bounds):
+    (lowerColumn, lowerRow) = self.getCell(bounds[0], bounds[1])
+    (upperColumn, upperRow) = self.getCell(bounds[2], bounds[3])
+    
+    return [(column, row) for column in range(lowerColumn, upperColumn + 1) for row in range(lowerRow, upperRow + 1)]
+  
+  def getSegmentCells(self, segment):
+    """
+    Get cells crossed by the line segment with the specified (start x, start y,
+    end x, end y), in order from the start, by walking along it from cell to
+    cell.
+    """
+    
+    (startX, startY, endX, endY) = segment
+    
+    (column, row) = self.getCell(startX, startY)
+    (endColumn, endRow) = self.getCell(endX, endY)
+    
+    (dx, dy) = (endX - startX, endY - startY)
+    
+    # direction of steps between cells, fraction of the segment between the
+    # start and the next column and row boundaries it crosses, and fraction
+    # of the segment between each boundary
+    (stepColumn, nextColumnFraction, columnFraction) = self.getSegmentSteps(startX, dx, column)
+    (stepRow, nextRowFraction, rowFraction) = self.getSegmentSteps(startY, dy, row)
+    
+    cells = [(column, row)]
+    
+    # cells stepped through, which limits the walk if rounding errors take it
+    # past the end cell
+    steps = abs(endColumn - column) + abs(endRow - row)
+    
+    while steps > 0 and (column, row) != (endColumn, endRow):
+      if nextColumnFraction < nextRowFraction:
+        column += stepColumn
+        nextColumnFraction += columnFraction
+        steps -= 1
+      elif nextRowFraction < nextColumnFraction:
+        row += stepRow
+        nextRowFraction += rowFraction
+        steps -= 1
+      else:
+        # segment passes through a corner, so touches both neighbouring cells
+        cells.append((column + stepColumn, row))
+        cells.append((column, row + stepRow))
+        
+        column += stepColumn
+        row += stepRow
+        nextColumnFraction += columnFraction
+        nextRowFraction += rowFraction
+        steps -= 2
+      
+      cells.append((column, row))
+    
+    return cells
+  
+  def getSegmentSteps(self, start, delta, cell):
+    """
+    Get the step direction, fraction of the segment to the first cell
+    boundary, and fraction between boundaries along one axis of a segment
+    walk.
+    """
+    
+    if delta > 0:
+      return (1, ((cell + 1) * self.cellSize - start) / delta, self.cellSize / delta)
+    elif delta < 0:
+      return (-1, (cell * self.cellSize - start) / delta, -self.cellSize / delta)
+    
+    # never crosses a boundary along this axis
+    return (0, float('inf'), float('inf'))
+  
+  def entryOverlapsBounds(self, entry, bounds):
+    if not self.overlaps(entry[1], bounds):
+      return False
+    
+    if entry[4] is None:
+      return True
+    
+    return self.segmentOverlaps(entry[4], bounds)
+  
+  def entriesOverlap(self, entryA, entryB):
+    if not self.overlaps(entryA[1], entryB[1]):
+      return False
+    
+    if entryA[4] is None:
+      return entryB[4] is None or self.segmentOverlaps(entryB[4], entryA[1])
+    elif entryB[4] is None:
+      return self.segmentOverlaps(entryA[4], entryB[1])
+    
+    return self.segmentsIntersect(entryA[4], entryB[4])
+  
+  @staticmethod
+  def getRingCells(column, row, ring):
+    """
+    Get cells a Chebyshev distance of ring cells away from the specified cell.
+    """
+    
+    if ring == 0:
+      return [(column, row)]
+    
+    cells = []
+    
+    # top and bottom edges
+    for i in range(column - ring, column + ring + 1):
+      cells.append((i, row - ring))
+      cells.append((i, row + ring))
+    
+    # left and right edges, excluding corners
+    for j in range(row - ring + 1, row + ring):
+      cells.append((column - ring, j))
+      cells.append((column + ring, j))
+    
+    return cells
+  
+  @staticmethod
+  def overlaps(boundsA, boundsB):
+    return boundsA[0] <= boundsB[2] and boundsB[0] <= boundsA[2] and boundsA[1] <= boundsB[3] and boundsB[1] <= boundsA[3]
+  
+  @staticmethod
+  def segmentOverlaps(segment, bounds):
+    """
+    Check whether the specified line segment touches the box with the
+    specified bounds, by clipping the segment to the box.
+    """
+    
+    (startX, startY, endX, endY) = segment
+    
+    # range of fractions along the segment that are inside the box
+    (lower, upper) = (0, 1)
+    
+    for (start, delta, lowerBound, upperBound) in [(startX, endX - startX, bounds[0], bounds[2]), (startY, endY - startY, bounds[1], bounds[3])]:
+      if delta == 0:
+        if start < lowerBound or start > upperBound:
+          return False
+        
+        continue
+      
+      (fractionA, fractionB) = ((lowerBound - start) / delta, (upperBound - start) / delta)
+      
+      lower = max(lower, min(fractionA, fractionB))
+      upper = min(upper, max(fractionA, fractionB))
+      
+      if lower > upper:
+        return False
+    
+    return True
+  
+  @staticmethod
+  def segmentsIntersect(segmentA, segmentB):
+    """
+    Check whether the specified line segments touch each other.
+    """
+    
+    def getOrientation(x0, y0, x1, y1, x2, y2):
+      cross = (x1 - x0) * (y2 - y0) - (y1 - y0) * (x2 - x0)
+      
+      return (cross > 0) - (cross < 0)
+    
+    def onSegment(x0, y0, x1, y1, x, y):
+      # point collinear with the segment lies within its box
+      return min(x0, x1) <= x <= max(x0, x1) and min(y0, y1) <= y <= max(y0, y1)
+    
+    (ax0, ay0, ax1, ay1) = segmentA
+    (bx0, by0, bx1, by1) = segmentB
+    
+    orientations = [getOrientation(ax0, ay0, ax1, ay1, bx0, by0), getOrientation(ax0, ay0, ax1, ay1, bx1, by1), getOrientation(bx0, by0, bx1, by1, ax0, ay0), getOrientation(bx0, by0, bx1, by1, ax1, ay1)]
+    
+    if orientations[0] != orientations[1] and orientations[2] != orientations[3] and 0 not in orientations:
+      return True
+    
+    return (orientations[0] == 0 and onSegment(ax0, ay0, ax1, ay1, bx0, by0)) or (orientations[1] == 0 and onSegment(ax0, ay0, ax1, ay1, bx1, by1)) or (orientations[2] == 0 and onSegment(bx0, by0, bx1, by1, ax0, ay0)) or (orientations[3] == 0 and onSegment(bx0, by0, bx1, by1, ax1, ay1))
+  
+  @staticmethod
+  def getSegmentDistance(segment, position):
+    """
+    Distance from the specified position to the nearest point on the line
+    segment with the specified (start x, start y, end x, end y).
+    """
+    
+    (startX, startY, endX, endY) = segment
+    (dx, dy) = (endX - startX, endY - startY)
+    
+    lengthSquared = dx * dx + dy * dy
+    
+    if lengthSquared == 0:
+      fraction = 0
+    else:
+      # fraction along the segment of the nearest point, clamped to the segment
+      fraction = max(0, min(1, ((position.x - startX) * dx + (position.y - startY) * dy) / lengthSquared))
+    
+    (x, y) = (startX + fraction * dx - position.x, startY + fraction * dy - position.y)
+    
+    return math.sqrt(x * x + y * y)
+  
+  @staticmethod
+  def getDistance(bounds, position):
+    """
+    Distance from the specified position to the nearest point in the box with
+    the specified bounds, or zero if the position is inside it.
+    """
+    
+    dx = max(bounds[0] - position.x, 0, position.x - bounds[2])
+    dy = max(bounds[1] - position.y, 0, position.y - bounds[3])
+    
+    return math.sqrt(dx * dx + dy * dy)
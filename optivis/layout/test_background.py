@@ -0,0 +1,221 @@
+from __future__ import unicode_literals, division
+
+import Queue
+
+import optivis.scene
+import optivis.layout
+import optivis.layout.constraints
+import optivis.layout.background as background
+import optivis.bench.components as components
+
+from optivis.layout.testing import LayoutTestCase
+
+class TestSceneCopy(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+  
+  def test_copy(self):
+    sceneCopy = self.scene.copy()
+    
+    self.assertEqual(len(sceneCopy.getComponents()), len(self.scene.getComponents()))
+    self.assertEqual(len(sceneCopy.links), len(self.scene.links))
+    
+    # bench items are copied
+    for (component, componentCopy) in zip(self.scene.getComponents(), sceneCopy.getComponents()):
+      self.assertIsNot(component, componentCopy)
+    
+    # reference is the copy of the original
+    self.assertEqual(sceneCopy.getComponents().index(sceneCopy.reference), self.scene.getComponents().index(self.scene.reference))
+  
+  def test_external_references_shared(self):
+    pykatObject = object()
+    
+    component = self.scene.getComponents()[1]
+    component.pykatObject = pykatObject
+    
+    self.assertIs(self.scene.copy().getComponents()[1].pykatObject, pykatObject)
+
+class TestSceneSnapshot(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+  
+  def test_same_as_scene(self):
+    sceneCopy = background.SceneSnapshot(self.scene).createScene()
+    
+    self.assertEqual(len(sceneCopy.getComponents()), len(self.scene.getComponents()))
+    self.assertEqual(len(sceneCopy.links), len(self.scene.links))
+    self.assertEqual(sceneCopy.getComponents().index(sceneCopy.reference), self.scene.getComponents().index(self.scene.reference))
+    
+    optivis.layout.StandardLayout(self.scene).arrange()
+    optivis.layout.StandardLayout(sceneCopy).arrange()
+    
+    self.assertScenesEqual(sceneCopy, self.scene)
+  
+  def test_constraints(self):
+    scene = self.createChainScene(3)
+    
+    constraint = optivis.layout.constraints.LinkAngularConstraint(90, scene.links[0], scene.links[1])
+    scene.addConstraint(constraint)
+    
+    sceneCopy = background.SceneSnapshot(scene).createScene()
+    
+    # constraint refers to the rebuilt links
+    self.assertIs(sceneCopy.constraints[0].linkA, sceneCopy.links[0])
+    self.assertIs(constraint.linkA, scene.links[0])
+    
+    optivis.layout.ConstrainedLayout(scene).arrange()
+    optivis.layout.ConstrainedLayout(sceneCopy).arrange()
+    
+    self.assertScenesEqual(sceneCopy, scene)
+  
+  def test_edits_after_snapshot(self):
+    snapshot = background.SceneSnapshot(self.scene)
+    
+    self.scene.links[0].length = 200
+    self.scene.getComponents()[2].aoi = 10
+    
+    self.assertEqual(snapshot.createScene().links[0].length, 100)
+    self.assertEqual(snapshot.createScene().getComponents()[2].aoi, 30)
+
+class TestLayoutResult(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+    
+    self.expectedScene = self.createScene()
+    optivis.layout.StandardLayout(self.expectedScene).arrange()
+  
+  def test_apply(self):
+    result = background.BackgroundLayout.layout(1, background.SceneSnapshot(self.scene), optivis.layout.StandardLayout)
+    
+    # scene itself is not laid out until the result is applied
+    self.assertTrue(all(component.dirty for component in self.scene.getComponents()))
+    
+    result.apply(self.scene)
+    
+    self.assertScenesEqual(self.scene, self.expectedScene)
+    self.assertFalse(any(component.dirty for component in self.scene.getComponents()))
+  
+  def test_apply_overwrites_arrangement(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.arrange()
+    
+    background.BackgroundLayout.layout(1, background.SceneSnapshot(self.scene), optivis.layout.StandardLayout).apply(self.scene)
+    
+    self.assertFalse(layout.isArranged())
+  
+  def test_apply_records_arrangement(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    otherLayout = optivis.layout.StandardLayout(self.scene)
+    otherLayout.arrange()
+    
+    background.BackgroundLayout.layout(1, background.SceneSnapshot(self.scene), optivis.layout.StandardLayout).apply(self.scene, layout=layout)
+    
+    # the layout needn't arrange the scene again, but others must
+    self.assertTrue(layout.isArranged())
+    self.assertFalse(otherLayout.isArranged())
+    
+    # the layout tree wasn't built by the layout itself
+    self.assertFalse(layout.canArrangeIncrementally())
+  
+  def test_apply_other_layout(self):
+    layout = optivis.layout.ConstrainedLayout(self.scene)
+    
+    background.BackgroundLayout.layout(1, background.SceneSnapshot(self.scene), optivis.layout.StandardLayout).apply(self.scene, layout=layout)
+    
+    self.assertFalse(layout.isArranged())
+  
+  def test_failed(self):
+    # no links to lay out
+    result = background.BackgroundLayout.layout(1, background.SceneSnapshot(optivis.scene.Scene()), optivis.layout.StandardLayout)
+    
+    self.assertFalse(result.success)
+    self.assertRaises(Exception, result.apply, self.scene)
+  
+  def test_edited(self):
+    result = background.BackgroundLayout.layout(1, background.SceneSnapshot(self.scene), optivis.layout.StandardLayout)
+    
+    self.scene.getComponents()[2].aoi = 10
+    
+    self.assertTrue(result.isOutdated(self.scene))
+    self.assertRaises(Exception, result.apply, self.scene)
+    self.assertEqual(self.scene.getComponents()[2].aoi, 10)
+  
+  def test_different_scene(self):
+    result = background.BackgroundLayout.layout(1, background.SceneSnapshot(self.scene), optivis.layout.StandardLayout)
+    
+    # add components after the layout
+    self.scene.link(components.Laser().getOutputNode('out'), components.CavityMirror().getInputNode('fr'), length=10)
+    
+    self.assertRaises(Exception, result.apply, self.scene)
+
+class TestBackgroundLayout(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+    self.results = Queue.Queue()
+    
+    self.worker = background.BackgroundLayout(self.results.put)
+  
+  def test_layout(self):
+    stamp = self.worker.request(self.scene, optivis.layout.StandardLayout)
+    
+    result = self.results.get(timeout=10)
+    
+    self.assertEqual(result.stamp, stamp)
+    self.assertTrue(self.worker.apply(result, self.scene))
+    
+    expectedScene = self.createScene()
+    optivis.layout.StandardLayout(expectedScene).arrange()
+    
+    self.assertScenesEqual(self.scene, expectedScene)
+  
+  def test_edited_after_request(self):
+    self.worker.request(self.scene, optivis.layout.StandardLayout)
+    
+    self.scene.reference.azimuth = 30
+    
+    result = self.results.get(timeout=10)
+    
+    # edit is neither overwritten nor marked as laid out
+    self.assertTrue(self.worker.isStale(result, self.scene))
+    self.assertFalse(self.worker.apply(result, self.scene))
+    self.assertEqual(self.scene.reference.azimuth, 30)
+    self.assertTrue(self.scene.reference.dirty)
+  
+  def test_link_edited_after_request(self):
+    self.worker.request(self.scene, optivis.layout.StandardLayout)
+    
+    self.scene.links[0].length = 200
+    
+    self.assertFalse(self.worker.apply(self.results.get(timeout=10), self.scene))
+    self.assertTrue(self.scene.links[0].dirty)
+    
+    # laid out with the edit once requested again
+    self.worker.request(self.scene, optivis.layout.StandardLayout)
+    
+    self.assertTrue(self.worker.apply(self.results.get(timeout=10), self.scene))
+    self.assertAlmostEqual(self.scene.links[0].getSize().x, 200)
+  
+  def test_constraint_edited_after_request(self):
+    constraint = optivis.layout.constraints.LinkAngularConstraint(90, self.scene.links[1], self.scene.links[2])
+    self.scene.addConstraint(constraint)
+    
+    self.worker.request(self.scene, optivis.layout.StandardLayout)
+    
+    constraint.angle = 60
+    
+    self.assertFalse(self.worker.apply(self.results.get(timeout=10), self.scene))
+    self.assertTrue(constraint.dirty)
+  
+  def test_stale_result_dropped(self):
+    self.worker.request(self.scene, optivis.layout.StandardLayout)
+    staleResult = self.results.get(timeout=10)
+    
+    self.worker.request(self.scene, optivis.layout.StandardLayout)
+    
+    self.assertTrue(self.worker.isStale(staleResult))
+    self.assertFalse(self.worker.apply(staleResult, self.scene))
+    
+    # not applied
+    self.assertTrue(all(component.dirty for component in self.scene.getComponents()))
+    
+    self.assertTrue(self.worker.apply(self.results.get(timeout=10), self.scene))
@@ -0,0 +1,149 @@
+from __future__ import unicode_literals, division
+
+import sys
+from unittest import TestCase
+
+import optivis.scene
+import optivis.layout
+import optivis.layout.constraints
+import optivis.bench.components as components
+
+from optivis.layout.testing import CountingLayout, LayoutTestCase
+
+class TestLayoutDeepChain(LayoutTestCase):
+  def setUp(self):
+    # chain longer than the recursion limit
+    self.scene = self.createChainScene(sys.getrecursionlimit() + 100)
+  
+  def test_standard_layout(self):
+    optivis.layout.StandardLayout(self.scene).arrange()
+    
+    self.assertLinkLengths(self.scene)
+    
+  def test_constrained_layout(self):
+    optivis.layout.ConstrainedLayout(self.scene).arrange()
+    
+    self.assertLinkLengths(self.scene)
+
+class TestLayoutCycle(TestCase):
+  def test_unconstrained_cycle(self):
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    bs = components.BeamSplitter()
+    m1 = components.CavityMirror()
+    m2 = components.CavityMirror()
+    
+    scene.link(laser.getOutputNode('out'), bs.getInputNode('frA'), length=10)
+    scene.link(bs.getOutputNode('bkA'), m1.getInputNode('fr'), length=10)
+    scene.link(m1.getOutputNode('fr'), m2.getInputNode('fr'), length=10)
+    scene.link(m2.getOutputNode('fr'), bs.getInputNode('frB'), length=10)
+    
+    scene.reference = laser
+    
+    # without constraints, the constrained layout re-places components forever
+    self.assertRaises(Exception, optivis.layout.ConstrainedLayout(scene).arrange)
+    
+    # the standard layout links the cycle back with a straight line
+    optivis.layout.StandardLayout(scene).arrange()
+
+class TestLayoutIncremental(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+    self.layout = CountingLayout(self.scene)
+    self.layout.arrange()
+    
+    self.expectedScene = self.createScene()
+  
+  def test_clean_after_arrange(self):
+    self.assertFalse(any(component.dirty for component in self.scene.getComponents()))
+    self.assertFalse(any(link.dirty for link in self.scene.links))
+  
+  def test_aoi_edit(self):
+    self.scene.getComponents()[2].aoi = 40
+    self.expectedScene.getComponents()[2].aoi = 40
+    
+    self.layout.linkCount = 0
+    self.layout.arrange(incremental=True)
+    optivis.layout.StandardLayout(self.expectedScene).arrange()
+    
+    self.assertScenesEqual(self.scene, self.expectedScene)
+    
+    # only the mirror chain from the beam splitter back round to it is laid out again
+    self.assertEqual(self.layout.linkCount, 4)
+    
+  def test_length_edit(self):
+    self.scene.links[5].length = 50
+    self.expectedScene.links[5].length = 50
+    
+    self.layout.linkCount = 0
+    self.layout.arrange(incremental=True)
+    optivis.layout.StandardLayout(self.expectedScene).arrange()
+    
+    self.assertScenesEqual(self.scene, self.expectedScene)
+    self.assertEqual(self.layout.linkCount, 1)
+  
+  def test_reference_edit(self):
+    self.scene.reference.azimuth = 30
+    self.expectedScene.reference.azimuth = 30
+    
+    self.layout.arrange(incremental=True)
+    optivis.layout.StandardLayout(self.expectedScene).arrange()
+    
+    self.assertScenesEqual(self.scene, self.expectedScene)
+
+  def test_other_layout_arranged(self):
+    # another layout arranging the scene in between means a full arrangement
+    otherLayout = CountingLayout(self.scene)
+    otherLayout.arrange()
+    
+    self.layout.linkCount = 0
+    self.layout.arrange(incremental=True)
+    
+    self.assertEqual(self.layout.linkCount, otherLayout.linkCount)
+
+class TestLayoutArranged(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+    self.layout = optivis.layout.StandardLayout(self.scene)
+  
+  def test_not_arranged(self):
+    self.assertFalse(self.layout.isArranged())
+  
+  def test_arranged(self):
+    self.layout.arrange()
+    
+    self.assertTrue(self.layout.isArranged())
+  
+  def test_edited(self):
+    self.layout.arrange()
+    self.scene.links[0].length = 20
+    
+    self.assertFalse(self.layout.isArranged())
+  
+  def test_scale_function_edited(self):
+    self.layout.arrange()
+    self.layout.scaleFunc.coefficients = [0, 2]
+    
+    self.assertFalse(self.layout.isArranged())
+  
+  def test_constraint_edited(self):
+    constraint = optivis.layout.constraints.LinkAngularConstraint(90, self.scene.links[1], self.scene.links[2])
+    self.scene.addConstraint(constraint)
+    
+    layout = optivis.layout.ConstrainedLayout(self.scene)
+    layout.arrange()
+    
+    self.assertTrue(layout.isArranged())
+    
+    # same number of constraints, but a different angle
+    constraint.angle = 60
+    
+    self.assertFalse(layout.isArranged())
+  
+  def test_arranged_by_other_layout(self):
+    self.layout.arrange()
+    
+    optivis.layout.StandardLayout(self.scene).arrange()
+    
+    self.assertFalse(self.layout.isArranged())
@@ -0,0 +1,191 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import optivis.scene
+import optivis.layout
+import optivis.layout.spatial
+import optivis.geometry
+import optivis.bench.components as components
+import optivis.bench.labels as labels
+
+from optivis.geometry import Coordinates
+
+class TestSpatialIndex(TestCase):
+  def setUp(self):
+    self.index = optivis.layout.spatial.SpatialIndex(cellSize=10)
+    
+    # plain objects with explicit boxes
+    self.a = object()
+    self.b = object()
+    self.c = object()
+    
+    self.index.insert(self.a, Coordinates(0, 0), Coordinates(5, 5))
+    self.index.insert(self.b, Coordinates(4, 4), Coordinates(25, 8))
+    self.index.insert(self.c, Coordinates(100, 100), Coordinates(101, 101))
+  
+  def test_invalid_cell_size(self):
+    self.assertRaises(Exception, optivis.layout.spatial.SpatialIndex, 0)
+  
+  def test_duplicate_insert(self):
+    self.assertRaises(Exception, self.index.insert, self.a, Coordinates(0, 0), Coordinates(1, 1))
+  
+  def test_range(self):
+    self.assertEqual(self.index.getItemsInRange(Coordinates(-1, -1), Coordinates(3, 3)), [self.a])
+    self.assertEqual(self.index.getItemsInRange(Coordinates(20, 0), Coordinates(30, 10)), [self.b])
+    self.assertEqual(self.index.getItemsInRange(Coordinates(-50, -50), Coordinates(200, 200)), [self.a, self.b, self.c])
+    self.assertEqual(self.index.getItemsInRange(Coordinates(50, 50), Coordinates(60, 60)), [])
+    self.assertEqual(self.index.getItemsAt(Coordinates(4.5, 4.5)), [self.a, self.b])
+  
+  def test_nearest(self):
+    self.assertIs(self.index.getNearestItem(Coordinates(1, 1)), self.a)
+    self.assertIs(self.index.getNearestItem(Coordinates(40, 6)), self.b)
+    self.assertIs(self.index.getNearestItem(Coordinates(90, 95)), self.c)
+    self.assertIs(self.index.getNearestItem(Coordinates(-500, -500)), self.a)
+    
+    self.assertIsNone(optivis.layout.spatial.SpatialIndex().getNearestItem(Coordinates(0, 0)))
+  
+  def test_nearest_searches_outward(self):
+    rings = []
+    getRingCells = self.index.getRingCells
+    
+    def recordRingCells(column, row, ring):
+      rings.append(ring)
+      
+      return getRingCells(column, row, ring)
+    
+    self.index.getRingCells = recordRingCells
+    
+    # a is found in the position's own cell, so c's cells are never searched
+    self.assertIs(self.index.getNearestItem(Coordinates(1, 1)), self.a)
+    self.assertEqual(rings, [0])
+    
+    del(rings[:])
+    
+    # rings between the position and the indexed cells are skipped
+    self.assertIs(self.index.getNearestItem(Coordinates(-500, -500)), self.a)
+    self.assertEqual(rings[0], 50)
+  
+  def test_nearest_after_remove(self):
+    self.index.remove(self.a)
+    self.index.remove(self.b)
+    
+    self.assertIs(self.index.getNearestItem(Coordinates(1, 1)), self.c)
+    
+    self.index.remove(self.c)
+    
+    self.assertIsNone(self.index.getNearestItem(Coordinates(1, 1)))
+  
+  def test_intersections(self):
+    self.assertEqual(self.index.getIntersectingItems(self.a), [self.b])
+    self.assertEqual(self.index.getIntersectingItems(self.c), [])
+    self.assertEqual(self.index.getIntersections(), [(self.a, self.b)])
+  
+  def test_update(self):
+    self.assertTrue(self.index.update(self.c, Coordinates(2, 2), Coordinates(3, 3)))
+    self.assertFalse(self.index.update(self.c, Coordinates(2, 2), Coordinates(3, 3)))
+    
+    self.assertEqual(self.index.getItemsInRange(Coordinates(90, 90), Coordinates(110, 110)), [])
+    self.assertEqual(self.index.getIntersectingItems(self.c), [self.a])
+    
+    # insertion order is kept
+    self.assertEqual(self.index.getIntersections(), [(self.a, self.b), (self.a, self.c)])
+  
+  def test_remove(self):
+    self.index.remove(self.b)
+    
+    self.assertEqual(len(self.index), 2)
+    self.assertNotIn(self.b, self.index)
+    self.assertEqual(self.index.getIntersections(), [])
+    self.assertRaises(Exception, self.index.remove, self.b)
+
+class TestSpatialIndexScene(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.laser = components.Laser(labels=[labels.Label(text="Laser")])
+    self.lens = components.ConvexLens()
+    self.mirror = components.CavityMirror()
+    
+    self.scene.link(self.laser.getOutputNode('out'), self.lens.getInputNode('bk'), length=100)
+    self.scene.link(self.lens.getOutputNode('fr'), self.mirror.getInputNode('fr'), length=100)
+    
+    self.scene.reference = self.laser
+    
+    self.layout = optivis.layout.StandardLayout(self.scene)
+    self.layout.arrange()
+    
+    self.index = optivis.layout.spatial.SpatialIndex.fromScene(self.scene)
+  
+  def test_items(self):
+    # components, links and labels
+    self.assertEqual(len(self.index), 6)
+    self.assertIn(self.laser.labels[0], self.index)
+  
+  def test_range_matches_bounding_boxes(self):
+    (lowerBound, upperBound) = self.mirror.getBoundingBox()
+    
+    self.assertIn(self.mirror, self.index.getItemsInRange(lowerBound, upperBound))
+    self.assertNotIn(self.laser, self.index.getItemsInRange(lowerBound, upperBound))
+  
+  def test_nearest(self):
+    self.assertIs(self.index.getNearestItem(self.lens.position), self.lens)
+  
+  def test_link_intersections(self):
+    # each link touches the components at either end
+    self.assertIn(self.laser, self.index.getIntersectingItems(self.scene.links[0]))
+    self.assertIn(self.lens, self.index.getIntersectingItems(self.scene.links[0]))
+    self.assertNotIn(self.mirror, self.index.getIntersectingItems(self.scene.links[0]))
+  
+  def test_refresh(self):
+    self.assertEqual(self.index.refresh(), [])
+    
+    self.scene.links[1].length = 300
+    self.layout.arrange()
+    
+    self.assertEqual(self.index.refresh(), [self.mirror, self.scene.links[1]])
+    self.assertIs(self.index.getNearestItem(self.mirror.position), self.mirror)
+
+class TestSpatialIndexDiagonalLink(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.laser = components.Laser(azimuth=45)
+    self.lens = components.ConvexLens()
+    
+    self.scene.link(self.laser.getOutputNode('out'), self.lens.getInputNode('bk'), length=20000)
+    
+    self.scene.reference = self.laser
+    
+    optivis.layout.StandardLayout(self.scene).arrange()
+    
+    self.link = self.scene.links[0]
+    self.index = optivis.layout.spatial.SpatialIndex.fromScene(self.scene, cellSize=10)
+  
+  def test_cells(self):
+    # cells along the segment, rather than every cell in its bounding box
+    cells = self.index.getSegmentCells(self.index.getItemSegment(self.link))
+    
+    self.assertLess(len(cells), 3 * 20000 / 10)
+    self.assertEqual(len(cells), len(set(cells)))
+  
+  def test_range(self):
+    middle = (self.link.start + self.link.end) / 2
+    offset = Coordinates(1000, -1000)
+    
+    # inside the link's bounding box, but away from its segment
+    self.assertNotIn(self.link, self.index.getItemsInRange(middle + offset, middle + offset + Coordinates(10, 10)))
+    self.assertIn(self.link, self.index.getItemsInRange(middle - Coordinates(10, 10), middle + Coordinates(10, 10)))
+  
+  def test_nearest(self):
+    middle = (self.link.start + self.link.end) / 2
+    
+    self.assertIs(self.index.getNearestItem(middle + Coordinates(5, -5)), self.link)
+  
+  def test_segments_intersect(self):
+    segmentsIntersect = optivis.layout.spatial.SpatialIndex.segmentsIntersect
+    
+    self.assertTrue(segmentsIntersect((0, 0, 10, 10), (0, 10, 10, 0)))
+    self.assertTrue(segmentsIntersect((0, 0, 10, 10), (10, 10, 20, 0)))
+    self.assertFalse(segmentsIntersect((0, 0, 10, 10), (0, 1, 10, 11)))
+    self.assertFalse(segmentsIntersect((0, 0, 10, 10), (11, 11, 20, 20)))
@@ -0,0 +1,56 @@
+from __future__ import unicode_literals, division
+
+import sys
+import unittest
+
+import optivis.layout
+import optivis.bench.components as components
+
+from optivis.layout.testing import LayoutTestCase
+
+# numpy is optional
+try:
+  import numpy
+  import optivis.layout.vectorised
+except ImportError:
+  numpy = None
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestVectorisedLayoutDeepChain(LayoutTestCase):
+  def test_deep_chain(self):
+    # chain longer than the recursion limit
+    scene = self.createChainScene(sys.getrecursionlimit() + 100)
+    
+    optivis.layout.vectorised.VectorisedLayout(scene).arrange()
+    
+    self.assertLinkLengths(scene)
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestVectorisedLayout(LayoutTestCase):
+  def setUp(self):
+    self.scene = self.createScene()
+    self.expectedScene = self.createScene()
+    
+    # add a component that can't be reached from the reference
+    self.scene.link(components.Laser().getOutputNode('out'), components.Dump().getInputNode('in'), length=10)
+    self.expectedScene.link(components.Laser().getOutputNode('out'), components.Dump().getInputNode('in'), length=10)
+  
+  def test_same_as_standard_layout(self):
+    optivis.layout.vectorised.VectorisedLayout(self.scene).arrange()
+    optivis.layout.StandardLayout(self.expectedScene).arrange()
+    
+    self.assertScenesEqual(self.scene, self.expectedScene)
+  
+  def test_tree_sums(self):
+    # tree with root 0, branches 0 -> 1 -> 2 -> 4 and 0 -> 3
+    sums = optivis.layout.vectorised.VectorisedLayout.getTreeSums(numpy.array([1.0, 2.0, 4.0, 8.0, 16.0]), numpy.array([0, 0, 1, 0, 2]))
+    
+    self.assertEqual(sums.tolist(), [1.0, 3.0, 7.0, 9.0, 23.0])
+  
+  def test_arranged_by_other_layout(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.arrange()
+    
+    optivis.layout.vectorised.VectorisedLayout(self.scene).arrange()
+    
+    self.assertFalse(layout.isArranged())
@@ -0,0 +1,85 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import optivis.scene
+import optivis.layout
+import optivis.bench.components as components
+
+class CountingLayout(optivis.layout.StandardLayout):
+  """
+  Standard layout that counts how many links it lays out.
+  """
+  
+  def __init__(self, *args, **kwargs):
+    super(CountingLayout, self).__init__(*args, **kwargs)
+    
+    self.linkCount = 0
+  
+  def layoutLink(self, *args, **kwargs):
+    self.linkCount += 1
+    
+    return super(CountingLayout, self).layoutLink(*args, **kwargs)
+
+class LayoutTestCase(TestCase):
+  """
+  Test case with scenes to lay out, and checks that scenes are laid out the
+  same and that links have their lengths.
+  """
+  
+  def createScene(self):
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    bs = components.BeamSplitter()
+    m1 = components.CavityMirror(aoi=30)
+    m2 = components.CavityMirror(aoi=15)
+    m3 = components.CavityMirror(aoi=-45)
+    pd = components.Photodiode()
+    
+    scene.link(laser.getOutputNode('out'), bs.getInputNode('frA'), length=100)
+    scene.link(bs.getOutputNode('bkA'), m1.getInputNode('fr'), length=50)
+    scene.link(m1.getOutputNode('fr'), m2.getInputNode('fr'), length=50)
+    scene.link(m2.getOutputNode('fr'), m3.getInputNode('fr'), length=58)
+    scene.link(m3.getOutputNode('fr'), bs.getInputNode('frB'), length=42.5)
+    scene.link(bs.getOutputNode('frA'), pd.getInputNode('in'), length=20)
+    
+    scene.reference = laser
+    
+    return scene
+  
+  def createChainScene(self, count):
+    """
+    Create scene of a laser followed by a chain of the specified number of
+    lenses.
+    """
+    
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    
+    previousNode = laser.getOutputNode('out')
+    
+    for i in range(0, count):
+      lens = components.ConvexLens(aoi=i % 45)
+      
+      scene.link(previousNode, lens.getInputNode('bk'), length=5)
+      
+      previousNode = lens.getOutputNode('fr')
+    
+    scene.reference = laser
+    
+    return scene
+  
+  def assertLinkLengths(self, scene):
+    for link in scene.links:
+      self.assertAlmostEqual(link.getSize().x, link.length)
+  
+  def assertScenesEqual(self, sceneA, sceneB):
+    for (componentA, componentB) in zip(sceneA.getComponents(), sceneB.getComponents()):
+      self.assertEqual(componentA.position, componentB.position)
+      self.assertAlmostEqual(componentA.azimuth, componentB.azimuth)
+    
+    for (linkA, linkB) in zip(sceneA.links, sceneB.links):
+      self.assertEqual(linkA.start, linkB.start)
+      self.assertEqual(linkA.end, linkB.end)
@@ -0,0 +1,269 @@
+from __future__ import unicode_literals, division
+
+import numpy
+
+import optivis.geometry
+import optivis.layout
+
+class VectorisedLayout(optivis.layout.StandardLayout):
+  """
+  Standard layout computed with NumPy array operations.
+  
+  The layout tree is found first, then component azimuths and positions are
+  accumulated along it in batches rather than one link at a time. Results are
+  written back to the bench items once, at the end. This avoids per-item
+  overhead when laying out scenes with very many items.
+  """
+  
+  title = "Vectorised"
+  
+  # the layout tree is not recorded per component
+  incrementalSupported = False
+  
+  def __init__(self, *args, **kwargs):
+    super(VectorisedLayout, self).__init__(*args, **kwargs)
+    
+    # placed components and their packed azimuths and positions
+    self.placedComponents = []
+    self.azimuths = None
+    self.positions = None
+  
+  # override
+  def layoutLinks(self):
+    reference = self.scene.reference
+    
+    ###
+    # find the layout tree, in the same order as the standard layout
+    
+    # placed components, the index of the component each was placed from and
+    # the link used to place it
+    components = [reference]
+    parents = [0]
+    treeLinks = [None]
+    
+    # map of component identities to indices
+    indices = {id(reference): 0}
+    
+    stack = [(link, reference) for link in reversed(self.getComponentLinks(reference))]
+    
+    while stack:
+      (link, referenceComponent) = stack.pop()
+      
+      if link.inputNode.component is referenceComponent:
+        targetComponent = link.outputNode.component
+      else:
+        targetComponent = link.inputNode.component
+      
+      if id(targetComponent) in indices:
+        # already placed, so this link will be a straight line
+        continue
+      
+      indices[id(targetComponent)] = len(components)
+      
+      components.append(targetComponent)
+      parents.append(indices[id(referenceComponent)])
+      treeLinks.append(link)
+      
+      for subLink in reversed(self.getComponentLinks(targetComponent, avoid=link)):
+        stack.append((subLink, targetComponent))
+    
+    ###
+    # pack link and node parameters into arrays
+    
+    count = len(components)
+    
+    # reference and target node azimuths relative to their components
+    referenceNodeAzimuths = numpy.zeros(count)
+    targetNodeAzimuths = numpy.zeros(count)
+    
+    # reference and target node positions relative to their components, unrotated
+    referenceNodePositions = numpy.zeros((count, 2))
+    targetNodePositions = numpy.zeros((count, 2))
+    
+    # scaled link lengths, negative when going backwards from input to output
+    lengths = numpy.zeros(count)
+    
+    for i in range(1, count):
+      link = treeLinks[i]
+      
+      if link.inputNode.component is components[parents[i]]:
+        referenceNode = link.inputNode
+        targetNode = link.outputNode
+        direction = -1
+      else:
+        referenceNode = link.outputNode
+        targetNode = link.inputNode
+        direction = 1
+      
+      referenceNodeAzimuths[i] = referenceNode.getNodeAzimuth()
+      targetNodeAzimuths[i] = targetNode.getNodeAzimuth()
+      
+      referenceNodePosition = referenceNode.position * referenceNode.component.size
+      targetNodePosition = targetNode.position * targetNode.component.size
+      
+      referenceNodePositions[i] = referenceNodePosition.x, referenceNodePosition.y
+      targetNodePositions[i] = targetNodePosition.x, targetNodePosition.y
+      
+      lengths[i] = direction * self.getScaledLinkLength(link.length)
+    
+    parents = numpy.array(parents)
+    
+    ###
+    # azimuths
+    
+    # each component's azimuth is its parent's plus the difference between the
+    # reference and target node azimuths
+    azimuthSteps = referenceNodeAzimuths - targetNodeAzimuths
+    azimuthSteps[0] = reference.azimuth
+    
+    azimuths = self.getTreeSums(azimuthSteps, parents)
+    
+    ###
+    # positions
+    
+    # each component's position is its parent's plus the reference node's
+    # position, the link and the target node's position, rotated appropriately
+    parentAzimuths = azimuths[parents]
+    
+    positionSteps = self.rotate(referenceNodePositions, parentAzimuths) - self.rotate(targetNodePositions, azimuths)
+    
+    linkAzimuths = numpy.radians(parentAzimuths + referenceNodeAzimuths)
+    positionSteps[:, 0] += lengths * numpy.cos(linkAzimuths)
+    positionSteps[:, 1] += lengths * numpy.sin(linkAzimuths)
+    
+    positionSteps[0] = reference.position.x, reference.position.y
+    
+    self.placedComponents = components
+    self.azimuths = azimuths % 360
+    self.positions = self.getTreeSums(positionSteps, parents)
+    
+    # components are fixed once placed
+    if count > 1:
+      self.linkedComponents = set(components)
+  
+  # override
+  def normalisePositions(self):
+    """
+    Move the position of all components such that the topmost, leftmost
+    position is the origin, and write the layout back to the scene
+    """
+    
+    indices = dict((id(component), i) for (i, component) in enumerate(self.placedComponents))
+    
+    ###
+    # bounding box
+    
+    sizes = numpy.array([(component.size.x, component.size.y) for component in self.placedComponents])
+    
+    azimuths = numpy.radians(self.azimuths)
+    cosines = numpy.abs(numpy.cos(azimuths))
+    sines = numpy.abs(numpy.sin(azimuths))
+    
+    # half extents of rotated components
+    extents = numpy.empty(sizes.shape)
+    extents[:, 0] = (sizes[:, 0] * cosines + sizes[:, 1] * sines) / 2
+    extents[:, 1] = (sizes[:, 0] * sines + sizes[:, 1] * cosines) / 2
+    
+    lowerBound = (self.positions - extents).min(axis=0)
+    
+    # components which couldn't be reached from the reference keep their positions
+    for component in self.scene.getComponents():
+      if id(component) not in indices:
+        (thisLowerBound, thisUpperBound) = component.getBoundingBox()
+        
+        lowerBound = numpy.minimum(lowerBound, (thisLowerBound.x, thisLowerBound.y))
+    
+    offset = optivis.geometry.Coordinates(-lowerBound[0], -lowerBound[1])
+    
+    positions = self.positions + (offset.x, offset.y)
+    
+    ###
+    # write back
+    
+    for (component, azimuth, position) in zip(self.placedComponents, self.azimuths.tolist(), positions.tolist()):
+      component.azimuth = azimuth
+      component.position = optivis.geometry.Coordinates(*position)
+    
+    for component in self.scene.getComponents():
+      if id(component) not in indices:
+        component.position = component.position.translate(offset)
+    
+    ###
+    # links
+    
+    placedLinks = []
+    nodeComponents = []
+    nodePositions = []
+    
+    for link in self.scene.links:
+      if id(link.outputNode.component) not in indices:
+        # link between components that weren't placed
+        link.start = link.start.translate(offset)
+        link.end = link.end.translate(offset)
+        
+        continue
+      
+      placedLinks.append(link)
+      
+      for node in (link.outputNode, link.inputNode):
+        nodePosition = node.position * node.component.size
+        
+        nodeComponents.append(indices[id(node.component)])
+        nodePositions.append((nodePosition.x, nodePosition.y))
+    
+    if not placedLinks:
+      return
+    
+    nodeComponents = numpy.array(nodeComponents)
+    
+    # absolute node positions, alternating start and end
+    nodePositions = positions[nodeComponents] + self.rotate(numpy.array(nodePositions), self.azimuths[nodeComponents])
+    
+    for (i, link) in enumerate(placedLinks):
+      link.start = optivis.geometry.Coordinates(*nodePositions[2 * i].tolist())
+      link.end = optivis.geometry.Coordinates(*nodePositions[2 * i + 1].tolist())
+  
+  @staticmethod
+  def rotate(positions, azimuths):
+    """
+    Rotate an array of (x, y) positions clockwise by an array of azimuths in degrees.
+    """
+    
+    azimuths = numpy.radians(azimuths)
+    
+    cosines = numpy.cos(azimuths)
+    sines = numpy.sin(azimuths)
+    
+    rotated = numpy.empty(positions.shape)
+    rotated[:, 0] = positions[:, 0] * cosines - positions[:, 1] * sines
+    rotated[:, 1] = positions[:, 0] * sines + positions[:, 1] * cosines
+    
+    return rotated
+  
+  @staticmethod
+  def getTreeSums(values, parents):
+    """
+    Sum values along each path from the root of a tree.
+    
+    parents contains the index of each element's parent, with the root (and
+    only the root) being its own parent. Uses pointer jumping, so the number of
+    array operations grows with the logarithm of the depth of the tree.
+    """
+    
+    count = len(parents)
+    
+    # append a zero valued sentinel which the root, and eventually every
+    # element, points to
+    sums = numpy.concatenate((values, numpy.zeros((1,) + values.shape[1:])))
+    ancestors = numpy.append(parents, count)
+    ancestors[ancestors == numpy.arange(count + 1)] = count
+    
+    pending = numpy.flatnonzero(ancestors != count)
+    
+    while len(pending):
+      sums[pending] += sums[ancestors[pending]]
+      ancestors[pending] = ancestors[ancestors[pending]]
+      
+      pending = pending[ancestors[pending] != count]
+    
+    return sums[:count]
@@ -0,0 +1,40 @@
+from __future__ import unicode_literals, division
+
+import logging
+
+# Each subsystem (e.g. layout, gui) logs to its own child of the "optivis"
+# logger, which discards messages unless enabled. Messages are formatted
+# lazily, so when a level is disabled logging calls in layout and drawing loops
+# do no formatting work.
+
+class NullHandler(logging.Handler):
+  """
+  Handler that discards records, for Python versions without logging.NullHandler.
+  """
+  
+  def emit(self, record):
+    pass
+
+rootLogger = logging.getLogger('optivis')
+rootLogger.addHandler(NullHandler())
+
+def getLogger(subsystem):
+  """
+  Get logger for the specified subsystem.
+  """
+  
+  return logging.getLogger('{0}.{1}'.format(rootLogger.name, subsystem))
+
+def enable(level=logging.DEBUG, stream=None):
+  """
+  Show optivis log messages of at least the specified level on the specified
+  stream, or stderr if this is not specified. Returns the added handler.
+  """
+  
+  handler = logging.StreamHandler(stream)
+  handler.setFormatter(logging.Formatter('[%(name)s] %(levelname)s: %(message)s'))
+  
+  rootLogger.addHandler(handler)
+  rootLogger.setLevel(level)
+  
+  return handler
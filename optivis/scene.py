@@ -1,6 +1,10 @@
 from __future__ import unicode_literals, division
 
+import os.path
+import copy
 import datetime
+import hashlib
+from collections import OrderedDict
 
 import geometry
 import bench.components
@@ -8,15 +12,92 @@ import bench.links
 import layout.constraints
 
 class Scene(object):
-  links = []
-  constraints = []
-  
   def __init__(self, title=None, reference=None):
     if title is None:
       title = datetime.datetime.now().strftime('%Y-%M-%d %H:%M')
     
+    # incremented each time the scene or its items are edited in a way that
+    # affects the layout; layouts set azimuths, so this includes arranging it
+    self.editStamp = 0
+    
     self.title = title
     self.reference = reference
+    
+    self.__links = []
+    self.constraints = []
+    
+    # incremented by layouts each time they arrange the scene
+    self.layoutStamp = 0
+    
+    self.resetIndices()
+  
+  def resetIndices(self):
+    # registry of linked components, keyed by identity, in the order they were
+    # first seen
+    self.__components = OrderedDict()
+    
+    # adjacency index mapping each component's identity to the links attached
+    # to it
+    self.__componentLinks = {}
+    
+    # component bounding boxes last used to find the scene's bounding box, and
+    # the scene's (lower x, lower y, upper x, upper y) bounds
+    self.__boundingBoxes = {}
+    self.__bounds = (float('inf'), float('inf'), float('-inf'), float('-inf'))
+    
+    # components whose bounding boxes may have changed since the bounds were
+    # last found, keyed by identity
+    self.__movedComponents = {}
+  
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    
+    # identities are different once unpickled, so indices keyed by them are
+    # rebuilt instead of pickled
+    for key in ['_Scene__components', '_Scene__componentLinks', '_Scene__boundingBoxes', '_Scene__bounds', '_Scene__movedComponents']:
+      del(state[key])
+    
+    return state
+  
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    
+    self.resetIndices()
+    
+    links = self.__links
+    self.__links = []
+    
+    for link in links:
+      self.addLink(link)
+    
+    for constraint in self.constraints:
+      constraint.addObserver(self.constraintChanged)
+  
+  def copy(self):
+    """
+    Get a deep copy of the scene, e.g. to lay out separately from this one.
+    
+    Objects that bench items refer to outside of the bench, such as pykat
+    objects, are shared with the copy rather than copied.
+    """
+    
+    memo = {}
+    
+    for item in self.getComponents() + list(self.links):
+      for reference in item.getExternalReferences():
+        if reference is not None:
+          memo[id(reference)] = reference
+    
+    return copy.deepcopy(self, memo)
+  
+  @property
+  def links(self):
+    """
+    Links in the scene, in the order they were added. This is read only, as
+    the scene's indices must be updated when links are added; use addLink().
+    """
+    
+    return tuple(self.__links)
   
   @property
   def title(self):
@@ -46,6 +127,7 @@ class Scene(object):
 	raise Exception('Specified component is not of type AbstractComponent')
     
     self.__reference = component
+    self.editStamp += 1
   
   def link(self, *args, **kwargs):
     link = bench.links.Link(*args, **kwargs)
@@ -56,41 +138,230 @@ class Scene(object):
     if not isinstance(link, bench.links.AbstractLink):
       raise Exception('Specified link is not of type AbstractLink')
     
-    self.links.append(link)
+    self.__links.append(link)
+    self.editStamp += 1
+    
+    link.addObserver(self.linkChanged)
+    
+    # update component registry and adjacency index (input component first,
+    # to preserve component order)
+    for component in [link.inputNode.component, link.outputNode.component]:
+      key = id(component)
+      
+      if key not in self.__components:
+        self.__components[key] = component
+        self.__componentLinks[key] = []
+        
+        # scene bounds are updated when the component moves
+        self.__movedComponents[key] = component
+        component.addObserver(self.componentChanged)
+      
+      self.__componentLinks[key].append(link)
   
   def addConstraint(self, constraint):
     if not isinstance(constraint, layout.constraints.AbstractConstraint):
       raise Exception('Specified constraint is not of type AbstractConstraint')
     
     self.constraints.append(constraint)
+    self.editStamp += 1
+    
+    constraint.addObserver(self.constraintChanged)
   
   def getComponents(self):
-    components = []
+    return list(self.__components.values())
+  
+  def hasComponent(self, component):
+    return id(component) in self.__components
+  
+  def componentChanged(self, component, attribute):
+    """
+    Observer of the scene's components, noting those whose bounding boxes may
+    have changed.
+    """
+    
+    if attribute in ['position', 'azimuth', 'size']:
+      self.__movedComponents[id(component)] = component
+    
+    if attribute in ['azimuth', 'aoi', 'size']:
+      self.editStamp += 1
+  
+  def linkChanged(self, link, attribute):
+    """
+    Observer of the scene's links.
+    """
+    
+    if attribute == 'length':
+      self.editStamp += 1
+  
+  def constraintChanged(self, constraint, attribute):
+    """
+    Observer of the scene's constraints.
+    """
+    
+    self.editStamp += 1
+  
+  def getComponentLinks(self, component, avoid=None):
+    """
+    Get links attached to the specified component, optionally skipping the
+    link specified by avoid.
+    """
+    
+    key = id(component)
+    
+    if key not in self.__componentLinks:
+      return []
+    
+    return [link for link in self.__componentLinks[key] if link is not avoid]
+  
+  def getFingerprint(self, layoutManager=None, scaleFunc=None):
+    """
+    Get hash identifying what the scene looks like once laid out.
+    
+    This covers the components and their graphics files, links, labels and
+    constraints, and the specified layout manager class and scale function,
+    but not positions or azimuths that are found by the layout. Only plain
+    values are described, so it is the same for equivalent scenes in
+    different processes.
+    """
+    
+    components = self.getComponents()
+    
+    # layout picks the first link's output component if there is no reference
+    reference = self.reference
+    
+    if reference is None and self.__links:
+      reference = self.__links[0].outputNode.component
+    
+    # components placed by the layout, i.e. those connected to the reference
+    placedComponents = set([])
+    
+    if reference is not None:
+      pending = [reference]
+      placedComponents.add(id(reference))
+      
+      while pending:
+        for link in self.getComponentLinks(pending.pop()):
+          for component in link.getComponents():
+            if id(component) not in placedComponents:
+              placedComponents.add(id(component))
+              pending.append(component)
+    
+    # components and links are identified by their position in the scene
+    indices = dict((id(component), index) for (index, component) in enumerate(components))
+    indices.update((id(link), index) for (index, link) in enumerate(self.links))
+    
+    def describeCoordinates(coordinates):
+      # integer and float coordinates are equivalent
+      return (float(coordinates.x), float(coordinates.y))
+    
+    def describeContent(content):
+      # content is shown as text, and other representations of values can
+      # contain memory addresses
+      return sorted((unicode(key), unicode(value)) for (key, value) in content.items())
+    
+    def describeLabels(item):
+      return [(label.text, describeCoordinates(label.position), label.azimuth, describeCoordinates(label.offset), describeContent(label.content)) for label in item.labels]
+    
+    def describeAsset(component):
+      path = os.path.abspath(os.path.join(component.svgDir, component.filename))
+      
+      try:
+        modificationTime = os.path.getmtime(path)
+      except OSError:
+        # missing files fail when drawn
+        modificationTime = None
+      
+      return (path, modificationTime)
+    
+    def describeClass(item):
+      return '{0}.{1}'.format(item.__class__.__module__, item.__class__.__name__)
+    
+    description = []
+    
+    for component in components:
+      description.append((describeClass(component), component.name, describeAsset(component), describeCoordinates(component.size), component.aoi, describeLabels(component)))
+      
+      if id(component) not in placedComponents:
+        # the layout leaves the component where it is, but moves the scene so
+        # that it starts at the origin, so only its position relative to the
+        # reference matters
+        position = component.position
+        
+        if reference is not None:
+          position = position - reference.position
+        
+        description.append((describeCoordinates(position), component.azimuth))
     
     for link in self.links:
-      if link.inputNode.component not in components:
-	components.append(link.inputNode.component)
+      specs = [(spec.width, spec.color, spec.pattern, spec.offset, spec.startMarker, spec.endMarker, spec.startMarkerRadius, spec.endMarkerRadius, spec.startMarkerColor, spec.endMarkerColor) for spec in link.specs]
       
-      if link.outputNode.component not in components:
-	components.append(link.outputNode.component)
-
-    return components
+      description.append((describeClass(link), indices[id(link.inputNode.component)], link.inputNode.name, indices[id(link.outputNode.component)], link.outputNode.name, link.length, specs, describeLabels(link)))
+    
+    for constraint in self.constraints:
+      angle = None
+      
+      if isinstance(constraint, layout.constraints.LinkAngularConstraint):
+        angle = constraint.angle
+      
+      description.append((describeClass(constraint), indices.get(id(constraint.componentA)), indices.get(id(constraint.componentB)), angle))
+    
+    # layout is relative to the reference component's azimuth
+    if reference is not None:
+      description.append((indices.get(id(reference)), reference.azimuth))
+    
+    if layoutManager is not None:
+      description.append('{0}.{1}'.format(layoutManager.__module__, layoutManager.__name__))
+    
+    if scaleFunc is not None:
+      description.append((describeClass(scaleFunc), list(scaleFunc.coefficients)))
+    
+    return hashlib.sha1(repr(description).encode('utf-8')).hexdigest()
   
   def getBoundingBox(self):
-    # set initial bounds to infinity
-    lowerBound = geometry.Coordinates(float('inf'), float('inf'))
-    upperBound = geometry.Coordinates(float('-inf'), float('-inf'))
+    """
+    Get the (lower, upper) corners of the box enclosing all components.
+    
+    The scene's bounds are kept between calls, and only updated for components
+    that have moved or changed shape since the last call.
+    """
     
-    # loop over components to find actual bounds
-    for component in self.getComponents():
-      (thisLowerBound, thisUpperBound) = component.getBoundingBox()
+    (lowerX, lowerY, upperX, upperY) = self.__bounds
+    
+    # whether a component on the edge of the bounds has moved, in which case
+    # the bounds might shrink and have to be found again from scratch
+    recalculate = False
+    
+    for (key, component) in self.__movedComponents.items():
+      boundingBox = component.getBoundingBox()
+      previousBoundingBox = self.__boundingBoxes.get(key)
+      
+      self.__boundingBoxes[key] = boundingBox
       
-      if thisLowerBound.x < lowerBound.x: lowerBound.x = thisLowerBound.x
-      if thisLowerBound.y < lowerBound.y: lowerBound.y = thisLowerBound.y
-      if thisUpperBound.x > upperBound.x: upperBound.x = thisUpperBound.x
-      if thisUpperBound.y > upperBound.y: upperBound.y = thisUpperBound.y
+      if previousBoundingBox is not None:
+        (previousLowerBound, previousUpperBound) = previousBoundingBox
+        
+        if previousLowerBound.x <= lowerX or previousLowerBound.y <= lowerY or previousUpperBound.x >= upperX or previousUpperBound.y >= upperY:
+          recalculate = True
+      
+      (thisLowerBound, thisUpperBound) = boundingBox
+      
+      # grow bounds to include this component
+      lowerX = min(lowerX, thisLowerBound.x)
+      lowerY = min(lowerY, thisLowerBound.y)
+      upperX = max(upperX, thisUpperBound.x)
+      upperY = max(upperY, thisUpperBound.y)
+    
+    self.__movedComponents.clear()
+    
+    if recalculate:
+      lowerX = min(lowerBound.x for (lowerBound, upperBound) in self.__boundingBoxes.values())
+      lowerY = min(lowerBound.y for (lowerBound, upperBound) in self.__boundingBoxes.values())
+      upperX = max(upperBound.x for (lowerBound, upperBound) in self.__boundingBoxes.values())
+      upperY = max(upperBound.y for (lowerBound, upperBound) in self.__boundingBoxes.values())
+    
+    self.__bounds = (lowerX, lowerY, upperX, upperY)
     
-    return (lowerBound, upperBound)
+    return (geometry.Coordinates(lowerX, lowerY), geometry.Coordinates(upperX, upperY))
   
   def getSize(self):
     (lowerBound, upperBound) = self.getBoundingBox()
@@ -0,0 +1,46 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import optivis.geometry
+
+class TestCoordinates(TestCase):
+  def setUp(self):
+    self.coordinates = optivis.geometry.Coordinates(3, 4)
+  
+  def test_no_instance_dict(self):
+    self.assertRaises(AttributeError, setattr, self.coordinates, 'z', 5)
+  
+  def test_mutable(self):
+    self.coordinates.x = 5
+    
+    self.assertEqual(self.coordinates, optivis.geometry.Coordinates(5, 4))
+  
+  def test_translate(self):
+    translated = self.coordinates.translate(optivis.geometry.Coordinates(1, 2), optivis.geometry.Coordinates(-3, 1))
+    
+    self.assertEqual(translated, optivis.geometry.Coordinates(1, 7))
+    
+    # original is unchanged
+    self.assertEqual(self.coordinates, optivis.geometry.Coordinates(3, 4))
+  
+  def test_rotate(self):
+    # positive azimuths are clockwise in a left-handed coordinate system
+    self.assertEqual(self.coordinates.rotate(90), optivis.geometry.Coordinates(-4, 3))
+    self.assertEqual(self.coordinates.rotate(180), optivis.geometry.Coordinates(-3, -4))
+  
+  def test_rotate_and_translate(self):
+    translation = optivis.geometry.Coordinates(1, 2)
+    
+    self.assertEqual(self.coordinates.rotateAndTranslate(30, translation), self.coordinates.rotate(30).translate(translation))
+
+class TestRotation(TestCase):
+  def setUp(self):
+    self.coordinates = optivis.geometry.Coordinates(3, 4)
+  
+  def test_same_as_coordinates_rotate(self):
+    for azimuth in [0, 30, 90, 135, 270, -45]:
+      rotation = optivis.geometry.Rotation(azimuth)
+      
+      self.assertEqual(rotation.rotate(self.coordinates), self.coordinates.rotate(azimuth))
+      self.assertEqual(rotation.rotateAndTranslate(self.coordinates, self.coordinates), self.coordinates.rotateAndTranslate(azimuth, self.coordinates))
@@ -0,0 +1,59 @@
+from __future__ import unicode_literals, division
+
+import io
+import logging
+from unittest import TestCase
+
+import optivis.log
+import optivis.scene
+import optivis.layout
+import optivis.bench.components as components
+
+class CountingComponent(components.ConvexLens):
+  """
+  Lens that counts how many times it is formatted as a string.
+  """
+  
+  formatCount = 0
+  
+  def __str__(self):
+    CountingComponent.formatCount += 1
+    
+    return super(CountingComponent, self).__str__()
+
+class TestLog(TestCase):
+  def setUp(self):
+    CountingComponent.formatCount = 0
+    
+    self.scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    lens = CountingComponent()
+    
+    self.scene.link(laser.getOutputNode('out'), lens.getInputNode('bk'), length=10)
+    self.scene.reference = laser
+  
+  def tearDown(self):
+    optivis.log.rootLogger.setLevel(logging.NOTSET)
+  
+  def test_subsystem_logger(self):
+    self.assertEqual(optivis.log.getLogger('layout').name, 'optivis.layout')
+  
+  def test_disabled_does_not_format(self):
+    optivis.log.rootLogger.setLevel(logging.WARNING)
+    
+    optivis.layout.ConstrainedLayout(self.scene).arrange()
+    
+    self.assertEqual(CountingComponent.formatCount, 0)
+  
+  def test_enabled(self):
+    stream = io.StringIO()
+    handler = optivis.log.enable(stream=stream)
+    
+    try:
+      optivis.layout.ConstrainedLayout(self.scene).arrange()
+    finally:
+      optivis.log.rootLogger.removeHandler(handler)
+    
+    self.assertGreater(CountingComponent.formatCount, 0)
+    self.assertIn('[optivis.layout] DEBUG: Linking', stream.getvalue())
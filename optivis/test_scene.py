@@ -1,10 +1,18 @@
 from __future__ import unicode_literals, division
 
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 
 import optivis.scene
+import optivis.geometry
 import optivis.bench.components as components
 import optivis.bench.links as links
+import optivis.bench.labels as labels
+import optivis.layout
+import optivis.layout.scale
+import optivis.layout.constraints
 
 class TestSceneSetTitle(TestCase):
   def setUp(self):
@@ -42,4 +50,244 @@ class TestSceneAddLink(TestCase):
   
   def test_add_invalid_link(self):    
     # can't add a link of type Laser
-    self.assertRaises(Exception, self.scene.addLink, self.componentA)
\ No newline at end of file
+    self.assertRaises(Exception, self.scene.addLink, self.componentA)
+
+
+class TestSceneComponentLinks(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    self.componentA = components.Laser()
+    self.componentB = components.BeamSplitter()
+    self.componentC = components.CavityMirror()
+    
+    self.linkA = links.Link(self.componentA.getOutputNode('out'), self.componentB.getInputNode('frA'), length=10)
+    self.linkB = links.Link(self.componentB.getOutputNode('frA'), self.componentC.getInputNode('fr'), length=10)
+    
+    self.scene.addLink(self.linkA)
+    self.scene.addLink(self.linkB)
+  
+  def test_component_links(self):
+    self.assertEqual(self.scene.getComponentLinks(self.componentA), [self.linkA])
+    self.assertEqual(self.scene.getComponentLinks(self.componentB), [self.linkA, self.linkB])
+    self.assertEqual(self.scene.getComponentLinks(self.componentB, avoid=self.linkA), [self.linkB])
+    
+    # unlinked components have no links
+    self.assertEqual(self.scene.getComponentLinks(components.Dump()), [])
+  
+  def test_components(self):
+    componentList = self.scene.getComponents()
+    
+    self.assertEqual(len(componentList), 3)
+    self.assertIs(componentList[0], self.componentB)
+    self.assertIs(componentList[1], self.componentA)
+    self.assertIs(componentList[2], self.componentC)
+  
+  def test_links_not_shared_between_scenes(self):
+    self.assertEqual(optivis.scene.Scene().links, ())
+  
+  def test_links_read_only(self):
+    self.assertEqual(self.scene.links, (self.linkA, self.linkB))
+    
+    # links can only be added with addLink, which keeps the indices up to date
+    self.assertRaises(AttributeError, setattr, self.scene, 'links', [])
+    self.assertFalse(hasattr(self.scene.links, 'append'))
+  
+  def test_has_component(self):
+    self.assertTrue(self.scene.hasComponent(self.componentA))
+    self.assertTrue(self.scene.hasComponent(self.componentC))
+    
+    # component with identical attributes but not linked
+    self.assertFalse(self.scene.hasComponent(components.Laser()))
+  
+  def test_components_not_duplicated(self):
+    self.scene.link(self.componentC.getOutputNode('fr'), components.Dump().getInputNode('in'), length=10)
+    
+    self.assertEqual(len(self.scene.getComponents()), 4)
+
+class TestSceneBoundingBox(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    self.componentA = components.Laser()
+    self.componentB = components.CavityMirror(position=optivis.geometry.Coordinates(100, 50))
+    
+    self.scene.link(self.componentA.getOutputNode('out'), self.componentB.getInputNode('fr'), length=10)
+  
+  def assertBoundingBox(self, lowerBound, upperBound):
+    (thisLowerBound, thisUpperBound) = self.scene.getBoundingBox()
+    
+    self.assertEqual(thisLowerBound, lowerBound)
+    self.assertEqual(thisUpperBound, upperBound)
+  
+  def test_bounding_box(self):
+    self.assertBoundingBox(optivis.geometry.Coordinates(-31, -23), optivis.geometry.Coordinates(105.5, 64.5))
+  
+  def test_bounding_box_grows(self):
+    self.scene.getBoundingBox()
+    
+    self.componentB.position = optivis.geometry.Coordinates(200, 50)
+    
+    self.assertBoundingBox(optivis.geometry.Coordinates(-31, -23), optivis.geometry.Coordinates(205.5, 64.5))
+  
+  def test_bounding_box_shrinks(self):
+    self.scene.getBoundingBox()
+    
+    self.componentB.position = optivis.geometry.Coordinates(0, 0)
+    
+    self.assertBoundingBox(optivis.geometry.Coordinates(-31, -23), optivis.geometry.Coordinates(31, 23))
+  
+  def test_unmoved_components_not_checked(self):
+    self.scene.getBoundingBox()
+    
+    def getBoundingBox():
+      raise Exception('Unmoved component checked')
+    
+    self.componentA.getBoundingBox = getBoundingBox
+    self.componentB.position = optivis.geometry.Coordinates(200, 50)
+    
+    self.assertBoundingBox(optivis.geometry.Coordinates(-31, -23), optivis.geometry.Coordinates(205.5, 64.5))
+  
+  def test_bounding_box_after_rotation(self):
+    self.scene.getBoundingBox()
+    
+    self.componentA.azimuth = 90
+    
+    self.assertBoundingBox(optivis.geometry.Coordinates(-23, -31), optivis.geometry.Coordinates(105.5, 64.5))
+
+class TestSceneFingerprint(TestCase):
+  def getScene(self, length=10, aoi=0, text='Laser'):
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser(labels=[labels.Label(text=text)])
+    mirror = components.CavityMirror(aoi=aoi)
+    
+    scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), length=length)
+    scene.reference = laser
+    
+    return scene
+  
+  def test_equivalent_scenes(self):
+    self.assertEqual(self.getScene().getFingerprint(), self.getScene().getFingerprint())
+  
+  def test_layout_does_not_change(self):
+    scene = self.getScene()
+    fingerprint = scene.getFingerprint()
+    
+    optivis.layout.StandardLayout(scene).arrange()
+    
+    self.assertEqual(scene.getFingerprint(), fingerprint)
+  
+  def test_changes(self):
+    fingerprint = self.getScene().getFingerprint()
+    
+    self.assertNotEqual(self.getScene(length=20).getFingerprint(), fingerprint)
+    self.assertNotEqual(self.getScene(aoi=10).getFingerprint(), fingerprint)
+    self.assertNotEqual(self.getScene(text='Source').getFingerprint(), fingerprint)
+  
+  def test_unplaced_components(self):
+    scene = self.getScene()
+    
+    # not connected to the reference, so not moved by the layout
+    dump = components.Dump(position=optivis.geometry.Coordinates(50, 50))
+    scene.link(components.Laser().getOutputNode('out'), dump.getInputNode('in'), length=10)
+    
+    fingerprint = scene.getFingerprint()
+    
+    dump.position = optivis.geometry.Coordinates(60, 50)
+    
+    self.assertNotEqual(scene.getFingerprint(), fingerprint)
+    
+    # layout moves the whole scene to the origin, but not relative to the reference
+    fingerprint = scene.getFingerprint()
+    
+    optivis.layout.StandardLayout(scene).arrange()
+    
+    self.assertEqual(scene.getFingerprint(), fingerprint)
+  
+  def test_assets(self):
+    scene = self.getScene()
+    fingerprint = scene.getFingerprint()
+    
+    directory = tempfile.mkdtemp()
+    
+    try:
+      shutil.copy(os.path.join(scene.reference.svgDir, scene.reference.filename), directory)
+      
+      # graphic from another directory
+      scene.reference.svgDir = directory
+      
+      self.assertNotEqual(scene.getFingerprint(), fingerprint)
+      
+      fingerprint = scene.getFingerprint()
+      
+      # graphic edited
+      os.utime(os.path.join(directory, scene.reference.filename), (1, 1))
+      
+      self.assertNotEqual(scene.getFingerprint(), fingerprint)
+    finally:
+      shutil.rmtree(directory)
+  
+  def test_label_content(self):
+    scene = self.getScene()
+    otherScene = self.getScene()
+    
+    # described as shown, not by representations that may differ between processes
+    scene.reference.labels[0].content = {'power': 1.5}
+    otherScene.reference.labels[0].content = {'power': 1.5}
+    
+    self.assertEqual(scene.getFingerprint(), otherScene.getFingerprint())
+    
+    otherScene.reference.labels[0].content = {'power': 2.5}
+    
+    self.assertNotEqual(scene.getFingerprint(), otherScene.getFingerprint())
+  
+  def test_layout_manager(self):
+    scene = self.getScene()
+    
+    self.assertNotEqual(scene.getFingerprint(layoutManager=optivis.layout.StandardLayout), scene.getFingerprint(layoutManager=optivis.layout.ConstrainedLayout))
+    self.assertNotEqual(scene.getFingerprint(scaleFunc=optivis.layout.scale.ScaleFunction()), scene.getFingerprint(scaleFunc=optivis.layout.scale.LargeLengthScaleFunction()))
+
+class TestSceneEditStamp(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.laser = components.Laser()
+    self.mirror = components.CavityMirror()
+    
+    self.scene.link(self.laser.getOutputNode('out'), self.mirror.getInputNode('fr'), length=10)
+    self.scene.reference = self.laser
+  
+  def assertEdited(self, edit, edited=True):
+    stamp = self.scene.editStamp
+    
+    edit()
+    
+    self.assertEqual(self.scene.editStamp != stamp, edited)
+  
+  def test_edits(self):
+    self.assertEdited(lambda: setattr(self.laser, 'azimuth', 30))
+    self.assertEdited(lambda: setattr(self.mirror, 'aoi', 10))
+    self.assertEdited(lambda: setattr(self.mirror, 'size', optivis.geometry.Coordinates(10, 10)))
+    self.assertEdited(lambda: setattr(self.scene.links[0], 'length', 20))
+    self.assertEdited(lambda: setattr(self.scene, 'reference', self.mirror))
+  
+  def test_constraint_edits(self):
+    link = links.Link(self.mirror.getOutputNode('fr'), components.CavityMirror().getInputNode('fr'), length=10)
+    self.scene.addLink(link)
+    
+    constraint = optivis.layout.constraints.LinkAngularConstraint(90, self.scene.links[0], link)
+    
+    self.assertEdited(lambda: self.scene.addConstraint(constraint))
+    self.assertEdited(lambda: setattr(constraint, 'angle', 60))
+    
+    # constraints of copies are observed too
+    sceneCopy = self.scene.copy()
+    stamp = sceneCopy.editStamp
+    
+    sceneCopy.constraints[0].angle = 30
+    
+    self.assertNotEqual(sceneCopy.editStamp, stamp)
+  
+  def test_other_changes(self):
+    self.assertEdited(lambda: setattr(self.laser, 'position', optivis.geometry.Coordinates(10, 10)), edited=False)
+    self.assertEdited(lambda: setattr(self.laser, 'filename', 'other.svg'), edited=False)
+    self.assertEdited(lambda: setattr(self.scene.links[0], 'end', optivis.geometry.Coordinates(10, 10)), edited=False)
@@ -24,7 +24,7 @@ class AbstractView(object):
   
   labelFlags = OrderedDict()
   
-  def __init__(self, scene, size=None, zoom=1.0, layoutManager=None, showFlags=None, startMarkers=False, endMarkers=False, startMarkerRadius=5, endMarkerRadius=3, startMarkerColor=None, endMarkerColor=None):
+  def __init__(self, scene, size=None, zoom=1.0, layoutManager=None, showFlags=None, startMarkers=False, endMarkers=False, startMarkerRadius=5, endMarkerRadius=3, startMarkerColor=None, endMarkerColor=None, layoutInstance=None):
     if not isinstance(scene, optivis.scene.Scene):
       raise Exception('Specified scene is not of type optivis.scene.Scene')
     
@@ -55,8 +55,23 @@ class AbstractView(object):
     self.startMarkerColor = startMarkerColor
     self.endMarkerColor = endMarkerColor
     
+    # layout manager instance used for the current arrangement, which can be
+    # shared between views of the same scene
+    self.layoutInstance = layoutInstance
+    
     return
   
+  def getLayoutInstance(self):
+    """
+    Get layout manager instance for this view's scene and layout manager
+    class, reusing the current one if it matches.
+    """
+    
+    if type(self.layoutInstance) is not self.layoutManager or self.layoutInstance.scene is not self.scene:
+      self.layoutInstance = self.layoutManager(self.scene)
+    
+    return self.layoutInstance
+  
   def getLayoutManagerClasses(self):    
     managers = []
     
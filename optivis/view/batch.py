@@ -0,0 +1,203 @@
+from __future__ import unicode_literals, division
+
+import os.path
+import sys
+import time
+import pickle
+import runpy
+import argparse
+import traceback
+import multiprocessing
+
+import optivis.view.svg
+
+class ExportJob(object):
+  """
+  Scene to export to a file, with the arguments to pass to Svg.export.
+  
+  If no file format is specified, it is taken from the path's extension.
+  """
+  
+  def __init__(self, scene, path, fileFormat=None, size=None, dpi=96, layoutManager=None, symbols=False):
+    if fileFormat is None:
+      fileFormat = os.path.splitext(path)[1][1:].lower()
+    
+    self.scene = scene
+    self.path = path
+    self.fileFormat = fileFormat
+    self.size = size
+    self.dpi = dpi
+    self.layoutManager = layoutManager
+    self.symbols = symbols
+  
+  def __str__(self):
+    return "{0} ({1})".format(self.path, self.fileFormat)
+
+class ExportResult(object):
+  def __init__(self, job, error=None, duration=None):
+    self.job = job
+    
+    # traceback of the exception raised by the export, if any
+    self.error = error
+    
+    # time taken to export, in seconds
+    self.duration = duration
+  
+  @property
+  def success(self):
+    return self.error is None
+  
+  def __str__(self):
+    if self.success:
+      return "Exported {0} in {1:.2f} s".format(self.job, self.duration)
+    
+    # last line of the traceback contains the exception
+    return "Failed to export {0}: {1}".format(self.job, self.error.strip().splitlines()[-1])
+
+def runJob(job):
+  """
+  Export the specified job, returning the error traceback, or None if the
+  export succeeded, and the time taken.
+  
+  This is run in the worker processes, so must be a module level function.
+  """
+  
+  start = time.time()
+  error = None
+  
+  try:
+    view = optivis.view.svg.Svg(job.scene, layoutManager=job.layoutManager)
+    view.export(job.path, fileFormat=job.fileFormat, size=job.size, dpi=job.dpi, symbols=job.symbols)
+  except Exception:
+    error = traceback.format_exc()
+  
+  return (error, time.time() - start)
+
+def runPickledJob(task):
+  """
+  Export the job pickled in the specified (index, pickled job) task,
+  returning the index, the error traceback, or None if the export succeeded,
+  and the time taken.
+  
+  This is run in the worker processes, so must be a module level function.
+  """
+  
+  (index, data) = task
+  
+  return (index,) + runJob(pickle.loads(data))
+
+class BatchExporter(object):
+  """
+  Exports many scenes in parallel with a pool of processes.
+  
+  Scenes are pickled to send them to the worker processes, so jobs whose
+  scenes refer to unpicklable objects fail.
+  """
+  
+  def __init__(self, processes=None):
+    if processes is None:
+      processes = multiprocessing.cpu_count()
+    
+    self.processes = processes
+  
+  @property
+  def processes(self):
+    return self.__processes
+  
+  @processes.setter
+  def processes(self, processes):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    processes = int(processes)
+    
+    if processes < 1:
+      raise Exception('Number of processes must be at least 1')
+    
+    self.__processes = processes
+  
+  def export(self, jobs, callback=None):
+    """
+    Export the specified jobs, which are either ExportJob objects or tuples of
+    (scene, path, fileFormat, size, dpi). Returns an ExportResult for each
+    job, in the same order.
+    
+    If a callback is specified, it is called with each result as it arrives.
+    """
+    
+    jobs = [job if isinstance(job, ExportJob) else ExportJob(*job) for job in jobs]
+    
+    results = [None] * len(jobs)
+    
+    def addResult(index, error, duration):
+      result = ExportResult(jobs[index], error=error, duration=duration)
+      
+      if callback is not None:
+        callback(result)
+      
+      results[index] = result
+    
+    if self.processes == 1 or len(jobs) == 1:
+      for (index, job) in enumerate(jobs):
+        addResult(index, *runJob(job))
+      
+      return results
+    
+    tasks = []
+    
+    for (index, job) in enumerate(jobs):
+      # jobs are pickled here rather than by the pool, so that a scene which
+      # can't be pickled (e.g. one referring to weakly referenced pykat
+      # objects) only fails its own job
+      try:
+        tasks.append((index, pickle.dumps(job, pickle.HIGHEST_PROTOCOL)))
+      except Exception:
+        addResult(index, traceback.format_exc(), 0)
+    
+    if not tasks:
+      return results
+    
+    pool = multiprocessing.Pool(min(self.processes, len(tasks)))
+    
+    try:
+      # hand out one job at a time, as export times vary a lot between
+      # scenes, and take results in the order they finish
+      for (index, error, duration) in pool.imap_unordered(runPickledJob, tasks, chunksize=1):
+        addResult(index, error, duration)
+    finally:
+      pool.close()
+      pool.join()
+    
+    return results
+
+def main(args=None):
+  """
+  Export the jobs defined in a Python script, e.g.:
+    
+    python -m optivis export jobs.py --processes 8
+  
+  The script must define a list called jobs, containing ExportJob objects or
+  (scene, path, fileFormat, size, dpi) tuples. Returns the number of failed
+  jobs.
+  """
+  
+  parser = argparse.ArgumentParser(prog='python -m optivis export', description='Export scenes defined in a script in parallel.')
+  parser.add_argument('script', help='Python script defining a list of jobs')
+  parser.add_argument('-p', '--processes', type=int, default=None, help='number of processes to use (default: number of CPUs)')
+  
+  args = parser.parse_args(args)
+  
+  scriptGlobals = runpy.run_path(args.script)
+  
+  if 'jobs' not in scriptGlobals:
+    raise Exception('Script {0} does not define a list of jobs'.format(args.script))
+  
+  def reportResult(result):
+    sys.stdout.write("{0}\n".format(result))
+    sys.stdout.flush()
+  
+  results = BatchExporter(processes=args.processes).export(scriptGlobals['jobs'], callback=reportResult)
+  
+  failures = [result for result in results if not result.success]
+  
+  sys.stdout.write("{0} of {1} jobs exported successfully\n".format(len(results) - len(failures), len(results)))
+  
+  return len(failures)
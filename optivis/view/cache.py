@@ -0,0 +1,152 @@
+from __future__ import unicode_literals, division
+
+import os
+import os.path
+import errno
+import hashlib
+import tempfile
+
+class ExportCache(object):
+  """
+  On-disk cache of exported files, keyed by scene fingerprint and export
+  arguments.
+  
+  Entries are files in the cache directory named by the hash of their key.
+  When the total size of the entries exceeds the maximum size, the least
+  recently used entries are removed. Use is tracked with the entries'
+  modification times, so the cache can be shared between processes.
+  """
+  
+  def __init__(self, directory, maxSize=100 * 1024 * 1024):
+    self.directory = directory
+    self.maxSize = maxSize
+    
+    try:
+      os.makedirs(self.directory)
+    except OSError as e:
+      # ignore directory already existing
+      if e.errno != errno.EEXIST:
+        raise
+  
+  @property
+  def maxSize(self):
+    return self.__maxSize
+  
+  @maxSize.setter
+  def maxSize(self, maxSize):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    maxSize = int(maxSize)
+    
+    if maxSize < 0:
+      raise Exception('Maximum size must be >= 0')
+    
+    self.__maxSize = maxSize
+  
+  @staticmethod
+  def getKey(*args):
+    """
+    Get key for the specified arguments, e.g. scene fingerprint, file format,
+    size and dpi.
+    """
+    
+    return hashlib.sha1(repr(args).encode('utf-8')).hexdigest()
+  
+  def getPath(self, key):
+    return os.path.join(self.directory, '{0}.cache'.format(key))
+  
+  def get(self, key):
+    """
+    Get content stored with the specified key, or None if there is none.
+    """
+    
+    path = self.getPath(key)
+    
+    try:
+      with open(path, 'rb') as f:
+        content = f.read()
+    except IOError:
+      return None
+    
+    # mark entry as recently used
+    try:
+      os.utime(path, None)
+    except OSError:
+      # entry evicted by another process since it was read
+      pass
+    
+    return content
+  
+  def put(self, key, content):
+    """
+    Store content with the specified key, then evict least recently used
+    entries until the cache is within its maximum size.
+    """
+    
+    if len(content) > self.maxSize:
+      # would be evicted straight away
+      return
+    
+    # write to a temporary file first, so other processes never read partial entries
+    (handle, temporaryPath) = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+    
+    try:
+      with os.fdopen(handle, 'wb') as f:
+        f.write(content)
+      
+      os.rename(temporaryPath, self.getPath(key))
+    except Exception:
+      # don't leave partial entries behind
+      try:
+        os.unlink(temporaryPath)
+      except OSError:
+        pass
+      
+      raise
+    
+    self.evict()
+  
+  def getEntries(self):
+    """
+    Get (modification time, size, path) of each entry, least recently used first.
+    """
+    
+    entries = []
+    
+    for filename in os.listdir(self.directory):
+      if not filename.endswith('.cache'):
+        continue
+      
+      path = os.path.join(self.directory, filename)
+      
+      try:
+        stat = os.stat(path)
+      except OSError:
+        # entry removed by another process
+        continue
+      
+      entries.append((stat.st_mtime, stat.st_size, path))
+    
+    entries.sort()
+    
+    return entries
+  
+  def evict(self):
+    entries = self.getEntries()
+    
+    totalSize = sum(size for (mtime, size, path) in entries)
+    
+    for (mtime, size, path) in entries:
+      if totalSize <= self.maxSize:
+        break
+      
+      try:
+        os.unlink(path)
+      except OSError:
+        # entry removed by another process
+        pass
+      
+      totalSize -= size
+  
+  def clear(self):
+    for (mtime, size, path) in self.getEntries():
+      os.unlink(path)
@@ -16,9 +16,14 @@ import PyQt4.QtSvg
 import optivis.view
 import optivis.view.svg
 import optivis.layout
+import optivis.layout.background
 import optivis.bench.components
 import optivis.bench.links
+import optivis.bench.observers
 import optivis.geometry
+import optivis.log
+
+logger = optivis.log.getLogger('gui')
 
 class AbstractCanvas(optivis.view.AbstractView):
   __metaclass__ = abc.ABCMeta
@@ -29,12 +34,45 @@ class AbstractCanvas(optivis.view.AbstractView):
   qView = None
   
   def __init__(self, *args, **kwargs):
+    # cache the graphics of items as pixmaps in device coordinates, so that
+    # repainting unchanged items is just a copy
+    self.pixmapCache = bool(kwargs.pop('pixmapCache', False))
+    
+    # lay out on a worker thread when the scene is edited in the GUI, so the
+    # window stays responsive
+    self.backgroundLayout = bool(kwargs.pop('backgroundLayout', False))
+    
+    # worker for background layouts, created when first needed
+    self.layoutWorker = None
+    
+    # interval, in milliseconds, within which edits made in the GUI are
+    # coalesced into one layout and redraw (one frame at 60 Hz by default)
+    self.editInterval = int(kwargs.pop('editInterval', 16))
+    
+    # only lay out edits once the edit widget is released, e.g. for very
+    # large scenes
+    self.applyEditsOnRelease = bool(kwargs.pop('applyEditsOnRelease', False))
+    
+    # timer for coalescing edits, created when first needed, and whether there
+    # are edits waiting to be laid out
+    self.editTimer = None
+    self.editPending = False
+    
+    # whether the view must be fully redrawn or calibrated once the scene has
+    # been laid out, accumulated over layouts superseded before they finish
+    self.pendingFullRedraw = False
+    self.pendingCalibration = False
+    
     super(AbstractCanvas, self).__init__(*args, **kwargs)
 
     # create empty lists for canvas stuff
     self.canvasLinks = []
     self.canvasComponents = []
     self.canvasLabels = []
+    
+    # canvas items whose bench items have changed since they were last drawn,
+    # keyed by identity
+    self.changedCanvasItems = {}
 
     # create and initialise GUI
     self.create()
@@ -98,6 +136,7 @@ class AbstractCanvas(optivis.view.AbstractView):
     # draw links
     for canvasLink in self.canvasLinks:      
       canvasLink.draw(self.qScene, startMarkerRadius=self.startMarkerRadius, endMarkerRadius=self.endMarkerRadius, startMarkerColor=self.startMarkerColor, endMarkerColor=self.endMarkerColor)
+      canvasLink.setCacheMode(self.getCacheMode())
       
       if self.showFlags & AbstractCanvas.SHOW_LINKS:	
 	# set visibility
@@ -115,59 +154,231 @@ class AbstractCanvas(optivis.view.AbstractView):
     # draw components
     for canvasComponent in self.canvasComponents:
       canvasComponent.draw(self.qScene)
+      canvasComponent.setCacheMode(self.getCacheMode())
       
       if self.showFlags & AbstractCanvas.SHOW_COMPONENTS:
 	canvasComponent.graphicsItem.setVisible(True)
       else:
 	canvasComponent.graphicsItem.setVisible(False)
     
-    # draw labels
+    # draw labels, if shown (others are drawn when they are first shown)
     for canvasLabel in self.canvasLabels:
-      canvasLabel.draw(self.qScene, self.labelFlags)
-      
-      if self.showFlags & AbstractCanvas.SHOW_LABELS:
-	canvasLabel.graphicsItem.setVisible(True)
-      else:
-	canvasLabel.graphicsItem.setVisible(False)
+      self.redrawCanvasLabel(canvasLabel)
 
-  def redraw(self, *args, **kwargs):    
-    # update links
-    for canvasLink in self.canvasLinks:      
-      if self.showFlags & AbstractCanvas.SHOW_LINKS:	
-	canvasLink.redraw(startMarkerRadius=self.startMarkerRadius, endMarkerRadius=self.endMarkerRadius, startMarkerColor=self.startMarkerColor, endMarkerColor=self.endMarkerColor)
-	
-	# set visibility
-	canvasLink.graphicsItem.setVisible(True)
-      else:
-	canvasLink.graphicsItem.setVisible(False)
-      
-      # show start and end markers?
-      startMarker = self.showFlags & AbstractCanvas.SHOW_START_MARKERS
-      endMarker = self.showFlags & AbstractCanvas.SHOW_END_MARKERS
+  def getCacheMode(self):
+    if self.pixmapCache:
+      return PyQt4.QtGui.QGraphicsItem.DeviceCoordinateCache
+    
+    return PyQt4.QtGui.QGraphicsItem.NoCache
+  
+  def redraw(self, changedOnly=False, *args, **kwargs):
+    """
+    Update canvas items from their bench items.
+    
+    If changedOnly is True, only canvas items whose bench items have notified
+    changes since the last redraw are updated, and the rest are left alone.
+    """
+    
+    if changedOnly:
+      # skip items which haven't been drawn yet
+      canvasItems = [canvasItem for canvasItem in self.changedCanvasItems.values() if canvasItem.graphicsItem is not None]
       
-      canvasLink.startMarker.setVisible(startMarker)
-      canvasLink.endMarker.setVisible(endMarker)
+      canvasLinks = [canvasItem for canvasItem in canvasItems if isinstance(canvasItem, CanvasLink)]
+      canvasComponents = [canvasItem for canvasItem in canvasItems if isinstance(canvasItem, CanvasComponent)]
+      canvasLabels = [canvasItem for canvasItem in canvasItems if isinstance(canvasItem, CanvasLabel)]
+    else:
+      canvasLinks = self.canvasLinks
+      canvasComponents = self.canvasComponents
+      canvasLabels = self.canvasLabels
+    
+    self.changedCanvasItems = {}
+    
+    # update links
+    for canvasLink in canvasLinks:
+      self.redrawCanvasLink(canvasLink)
     
     # update components
-    for canvasComponent in self.canvasComponents:
-      if self.showFlags & AbstractCanvas.SHOW_COMPONENTS:
-	canvasComponent.redraw()
-	canvasComponent.graphicsItem.setVisible(True)
-      else:
-	canvasComponent.graphicsItem.setVisible(False)
+    for canvasComponent in canvasComponents:
+      self.redrawCanvasComponent(canvasComponent)
     
     # update labels
-    for canvasLabel in self.canvasLabels:
-      if self.showFlags & AbstractCanvas.SHOW_LABELS:
-	canvasLabel.redraw(self.labelFlags)
-	canvasLabel.graphicsItem.setVisible(True)
-      else:
-	canvasLabel.graphicsItem.setVisible(False)
+    for canvasLabel in canvasLabels:
+      self.redrawCanvasLabel(canvasLabel)
+  
+  def redrawCanvasLink(self, canvasLink):
+    if self.showFlags & AbstractCanvas.SHOW_LINKS:
+      canvasLink.redraw(startMarkerRadius=self.startMarkerRadius, endMarkerRadius=self.endMarkerRadius, startMarkerColor=self.startMarkerColor, endMarkerColor=self.endMarkerColor)
+      
+      # set visibility
+      canvasLink.graphicsItem.setVisible(True)
+    else:
+      canvasLink.graphicsItem.setVisible(False)
+    
+    # show start and end markers?
+    startMarker = self.showFlags & AbstractCanvas.SHOW_START_MARKERS
+    endMarker = self.showFlags & AbstractCanvas.SHOW_END_MARKERS
+    
+    canvasLink.startMarker.setVisible(startMarker)
+    canvasLink.endMarker.setVisible(endMarker)
+  
+  def redrawCanvasComponent(self, canvasComponent):
+    if self.showFlags & AbstractCanvas.SHOW_COMPONENTS:
+      canvasComponent.redraw()
+      canvasComponent.graphicsItem.setVisible(True)
+    else:
+      canvasComponent.graphicsItem.setVisible(False)
+  
+  def redrawCanvasLabel(self, canvasLabel):
+    if self.showFlags & AbstractCanvas.SHOW_LABELS:
+      if canvasLabel.graphicsItem is None:
+        # first time the label is shown
+        self.drawCanvasLabel(canvasLabel)
+      
+      canvasLabel.redraw(self.labelFlags)
+      canvasLabel.graphicsItem.setVisible(True)
+    elif canvasLabel.graphicsItem is not None:
+      # keep the graphics item for when the label is shown again
+      canvasLabel.graphicsItem.setVisible(False)
+  
+  def drawCanvasLabel(self, canvasLabel):
+    """
+    Create the graphics item for a label. This is done when the label is first
+    shown rather than when the canvas is drawn, as there are often many labels
+    that are never shown.
+    """
+    
+    canvasLabel.draw(self.qScene, self.labelFlags)
+    canvasLabel.setCacheMode(self.getCacheMode())
+    
+    # label can now be updated when it changes
+    self.watchCanvasItems([canvasLabel])
+  
+  def canvasItemChanged(self, canvasItem):
+    """
+    Handles notifications from canvas items that their bench items have
+    changed, so that they are updated by the next changed-only redraw.
+    """
+    
+    self.changedCanvasItems[id(canvasItem)] = canvasItem
+  
+  def watchCanvasItems(self, canvasItems):
+    for canvasItem in canvasItems:
+      canvasItem.changeHandler = self.canvasItemChanged
+      canvasItem.observe()
+  
+  def unwatchCanvasItems(self, canvasItems):
+    for canvasItem in canvasItems:
+      if canvasItem.changeHandler is None:
+        # not watched, e.g. a label that was never shown
+        continue
+      
+      canvasItem.unobserve()
+      canvasItem.changeHandler = None
+      
+      self.changedCanvasItems.pop(id(canvasItem), None)
 
-  def layout(self):
-    # instantiate layout manager and arrange objects
-    layout = self.layoutManager(self.scene)
-    layout.arrange()
+  def layout(self, incremental=False):
+    """
+    Lay out the scene.
+    
+    If incremental is True, only the parts of the scene affected by items
+    edited since the last layout are laid out again.
+    """
+    
+    # arrange objects
+    self.getLayoutInstance().arrange(incremental=incremental)
+  
+  def relayout(self, incremental=False, changedOnly=False, calibrate=False):
+    """
+    Lay out the scene after it has been edited, then redraw it.
+    
+    Only the changed canvas items are redrawn if changedOnly is True, and the
+    view is calibrated afterwards if calibrate is True. With background layout,
+    this returns straight away and the canvas is updated once the layout has
+    finished; incremental is then ignored, as the worker lays out a snapshot
+    of the scene from scratch.
+    """
+    
+    self.pendingFullRedraw |= not changedOnly
+    self.pendingCalibration |= calibrate
+    
+    if self.backgroundLayout:
+      self.getLayoutWorker().request(self.scene, self.layoutManager, scaleFunc=self.getLayoutInstance().scaleFunc)
+    else:
+      self.layout(incremental=incremental)
+      self.finishRelayout()
+  
+  def scheduleRelayout(self, changedOnly=False):
+    """
+    Lay out the scene and redraw it after an edit, together with any other
+    edits made within the edit interval, or once the edit widget is released
+    if applyEditsOnRelease is True.
+    """
+    
+    self.pendingFullRedraw |= not changedOnly
+    self.editPending = True
+    
+    if self.applyEditsOnRelease:
+      return
+    
+    if self.editTimer is None:
+      self.editTimer = PyQt4.QtCore.QTimer()
+      self.editTimer.setSingleShot(True)
+      self.editTimer.timeout.connect(self.applyPendingEdits)
+    
+    # the first edit starts the interval, and later ones wait for it to end
+    if not self.editTimer.isActive():
+      self.editTimer.start(self.editInterval)
+  
+  def applyPendingEdits(self):
+    """
+    Lay out and redraw edits scheduled with scheduleRelayout() straight away.
+    """
+    
+    if self.editTimer is not None:
+      self.editTimer.stop()
+    
+    if not self.editPending:
+      return
+    
+    self.editPending = False
+    
+    self.relayout(incremental=True, changedOnly=not self.pendingFullRedraw)
+  
+  def finishRelayout(self):
+    self.redraw(refreshLabelMenu=False, changedOnly=not self.pendingFullRedraw)
+    
+    if self.pendingCalibration:
+      self.calibrateView()
+    
+    self.pendingFullRedraw = False
+    self.pendingCalibration = False
+  
+  def getLayoutWorker(self):
+    if self.layoutWorker is None:
+      self.layoutComms = LayoutCommunicator()
+      
+      # results arrive on the worker thread, so pass them to this one with a
+      # queued signal
+      self.layoutComms.layoutFinished.connect(self.layoutFinishedHandler, PyQt4.QtCore.Qt.QueuedConnection)
+      
+      self.layoutWorker = optivis.layout.background.BackgroundLayout(self.layoutComms.layoutFinished.emit)
+    
+    return self.layoutWorker
+  
+  def layoutFinishedHandler(self, result):
+    try:
+      # the view's layout, which views sharing it may use, needn't arrange
+      # the scene again
+      applied = self.layoutWorker.apply(result, self.scene, layout=self.getLayoutInstance())
+    except Exception, e:
+      logger.error("Background layout failed: %s", e)
+      
+      return
+    
+    if applied:
+      # positions set from the result have notified the canvas items they affect
+      self.finishRelayout()
   
   def show(self):
     # layout scene
@@ -198,20 +409,33 @@ class AbstractCanvas(optivis.view.AbstractView):
       sys.exit(self.qApplication.exec_())
 
   def createCanvasLinks(self):
+    # stop replaced canvas links listening to their links
+    self.unwatchCanvasItems(self.canvasLinks)
+    
     self.canvasLinks = []
     
     for link in self.scene.links:
       # Add link to list of canvas links.
       self.canvasLinks.append(CanvasLink(link))
+    
+    self.watchCanvasItems(self.canvasLinks)
 
   def createCanvasComponents(self):
+    # stop replaced canvas components listening to their components
+    self.unwatchCanvasItems(self.canvasComponents)
+    
     self.canvasComponents = []
     
     for component in self.scene.getComponents():
       # Add component to list of canvas components.
       self.canvasComponents.append(CanvasComponent(component))
+    
+    self.watchCanvasItems(self.canvasComponents)
   
   def createCanvasLabels(self):
+    # stop replaced canvas labels listening to their labels
+    self.unwatchCanvasItems(self.canvasLabels)
+    
     self.canvasLabels = []
     
     for canvasLink in self.canvasLinks:
@@ -278,9 +502,17 @@ class AbstractCanvas(optivis.view.AbstractView):
     return self.exportSvg(path=path + extension, fileFormat=fileFormat)
   
   def exportSvg(self, *args, **kwargs):
-    svgView = optivis.view.svg.Svg(self.scene, layoutManager=self.layoutManager)
+    # share this canvas's layout, so the export doesn't arrange the scene again
+    svgView = optivis.view.svg.Svg(self.scene, layoutManager=self.layoutManager, layoutInstance=self.layoutInstance)
     svgView.export(*args, **kwargs)
 
+class LayoutCommunicator(PyQt4.QtCore.QObject):
+  """
+  Qt Signals communication class for background layouts
+  """
+  
+  layoutFinished = PyQt4.QtCore.pyqtSignal(object)
+
 class MainWindow(PyQt4.Qt.QMainWindow):
   def __init__(self, *args, **kwargs):
     super(MainWindow, self).__init__(*args, **kwargs)
@@ -340,7 +572,20 @@ class Full(AbstractCanvas):
   zoomRange = (0.1, 10)
   zoomStep = 0.1
   
-  def __init__(self, *args, **kwargs):    
+  # Zoom levels below which items are drawn with less detail. Components are
+  # drawn as pixmaps, then as outlines; labels are hidden; and link patterns
+  # are drawn as solid lines.
+  componentPixmapZoom = 0.5
+  componentOutlineZoom = 0.2
+  labelZoom = 0.4
+  linkPatternZoom = 0.3
+  
+  def __init__(self, *args, **kwargs):
+    # detail thresholds, if different from the defaults
+    for name in ['componentPixmapZoom', 'componentOutlineZoom', 'labelZoom', 'linkPatternZoom']:
+      if name in kwargs:
+        setattr(self, name, float(kwargs.pop(name)))
+    
     super(Full, self).__init__(*args, **kwargs)
   
   def create(self, *args, **kwargs):
@@ -355,25 +600,44 @@ class Full(AbstractCanvas):
     # attach link click signals to handlers
     for canvasLink in self.canvasLinks:
       canvasLink.graphicsItem.comms.mouseReleased.connect(self.canvasLinkMouseReleasedHandler)
+      
+      for lineItem in canvasLink.graphicsItem.items:
+        lineItem.patternDetail = self.linkPatternZoom
 
     # attach component click signals to handlers
     for canvasComponent in self.canvasComponents:   
       canvasComponent.graphicsItem.mouseReleased.connect(self.canvasComponentMouseReleasedHandler)
+      
+      canvasComponent.graphicsItem.pixmapDetail = self.componentPixmapZoom
+      canvasComponent.graphicsItem.outlineDetail = self.componentOutlineZoom
+  
+  def drawCanvasLabel(self, canvasLabel):
+    super(Full, self).drawCanvasLabel(canvasLabel)
     
-    # attach link click signals to handlers
-    for canvasLabel in self.canvasLabels:
-      canvasLabel.graphicsItem.comms.mousePressed.connect(self.canvasLabelMousePressedHandler)
-      canvasLabel.graphicsItem.comms.mouseMoved.connect(self.canvasLabelMouseMovedHandler)
-      canvasLabel.graphicsItem.comms.mouseReleased.connect(self.canvasLabelMouseReleasedHandler)
+    canvasLabel.graphicsItem.visibleDetail = self.labelZoom
+    
+    # attach label click signals to handlers
+    canvasLabel.graphicsItem.comms.mousePressed.connect(self.canvasLabelMousePressedHandler)
+    canvasLabel.graphicsItem.comms.mouseMoved.connect(self.canvasLabelMouseMovedHandler)
+    canvasLabel.graphicsItem.comms.mouseReleased.connect(self.canvasLabelMouseReleasedHandler)
   
-  def redraw(self, refreshLabelMenu=True, *args, **kwargs):
+  def redraw(self, refreshLabelMenu=True, changedOnly=False, *args, **kwargs):
+    if changedOnly:
+      # only labels about to be redrawn can have new content
+      canvasLabels = [canvasItem for canvasItem in self.changedCanvasItems.values() if isinstance(canvasItem, CanvasLabel)]
+    else:
+      canvasLabels = self.canvasLabels
+    
     # Refresh label flags
-    for canvasLabel in self.canvasLabels:
+    for canvasLabel in canvasLabels:
       if canvasLabel.item.content is not None:
 	for kv in canvasLabel.item.content.items():
 	  if kv[0] not in self.labelFlags.keys():	    
 	    # add label to list of labels, but set it off by default
 	    self.labelFlags[kv[0]] = False
+	    
+	    # menu needs the new label
+	    refreshLabelMenu = True
     
     if refreshLabelMenu:
       # Now that all labels have been created the dictionary of
@@ -399,13 +663,16 @@ class Full(AbstractCanvas):
       self.labelMenu.addAction(PyQt4.QtGui.QAction("Clear all...", self.qMainWindow))
     
     # call parent redraw
-    super(Full, self).redraw(*args, **kwargs)
+    super(Full, self).redraw(changedOnly=changedOnly, *args, **kwargs)
 
     # update scene to avoid graphical artifacts
     self.qScene.update()
   
   def initialise(self):
     super(Full, self).initialise()
+    
+    # only repaint the parts of the view that have changed
+    self.qView.setViewportUpdateMode(PyQt4.QtGui.QGraphicsView.SmartViewportUpdate)
 
     ### create controls
     
@@ -518,8 +785,8 @@ class Full(AbstractCanvas):
     # set label offset
     canvasLabel.item.offset = canvasLabel.item.offset + projection
     
-    # redraw scene
-    self.redraw()
+    # redraw the moved label
+    self.redraw(refreshLabelMenu=False, changedOnly=True)
     
     # update mouse position
     self.canvasLabelMousePosition = eventPos
@@ -764,6 +1031,7 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     self.itemEditScrollArea = PyQt4.QtGui.QScrollArea()
     self.itemEditPanel = OptivisItemEditPanel()
     self.itemEditPanel.parameterEdited.connect(self.parameterEditedHandler)
+    self.itemEditPanel.parameterReleased.connect(self.parameterReleasedHandler)
     self.itemEditScrollArea.setWidget(self.itemEditPanel)
     self.itemEditScrollArea.setWidgetResizable(True)
     itemEditGroupBoxLayout = PyQt4.QtGui.QVBoxLayout()
@@ -776,14 +1044,28 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     ### add layout to control widget
     self.setLayout(controlLayout)
   
-  def parameterEditedHandler(self):
+  def parameterEditedHandler(self, target):
     """
     Handles signals from edit panel showing that a parameter has been edited.
     """
     
-    # an edited parameter might have changed the look of the view, so lay it out again and redraw
-    self.canvas.layout()
-    self.canvas.redraw()
+    # an edited parameter might have changed the look of the view, so lay out
+    # whatever it affects again and redraw
+    #
+    # bench items and labels notify the canvas items they affect, but external
+    # objects don't, so editing them could have changed anything
+    #
+    # edits come in quick succession, e.g. while a spin box arrow is held, so
+    # they are coalesced
+    self.canvas.scheduleRelayout(changedOnly=isinstance(target, optivis.bench.observers.Observable))
+  
+  def parameterReleasedHandler(self):
+    """
+    Handles signals from edit panel showing that an edit widget has been released.
+    """
+    
+    # apply edits now rather than waiting for the rest of the edit interval
+    self.canvas.applyPendingEdits()
   
   def layoutComboBoxChangeHandler(self):
     # get combo box
@@ -799,17 +1081,11 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     # update canvas layout
     self.canvas.layoutManager = layoutManagerClasses[layoutIndex]
 
-    # re-layout
-    self.canvas.layout()
-
-    # redraw
-    self.canvas.redraw()
-    
-    # reset view
-    self.canvas.calibrateView()
+    # re-layout, then redraw and reset view
+    self.canvas.relayout(calibrate=True)
   
   def layoutEditButtonClickHandler(self):
-    print self.canvas.layoutManager.title
+    logger.debug("Editing layout %s", self.canvas.layoutManager.title)
     layoutEditWindow = CanvasScaleFunctionEditor(self.canvas.qMainWindow, self.canvas.layoutManager)
     layoutEditWindow.show()
     
@@ -831,14 +1107,8 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     else:
       self.canvas.scene.reference = canvasComponents[componentIndex].item
 
-    # re-layout
-    self.canvas.layout()
-
-    # redraw
-    self.canvas.redraw()
-    
-    # reset view
-    self.canvas.calibrateView()
+    # re-layout, then redraw and reset view
+    self.canvas.relayout(calibrate=True)
 
   def zoomSliderChanged(self, value):
     # scale value by zoom step (sliders only support int increments)
@@ -849,7 +1119,11 @@ class ControlPanel(PyQt4.QtGui.QWidget):
 
 class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
   # signal to emit when item parameters are edited in the GUI
-  parameterEdited = PyQt4.QtCore.pyqtSignal()
+  parameterEdited = PyQt4.QtCore.pyqtSignal(object)
+  
+  # signal to emit when an edit widget is released, e.g. when a held spin box
+  # arrow is let go
+  parameterReleased = PyQt4.QtCore.pyqtSignal()
   
   def __init__(self, *args, **kwargs):
     super(OptivisItemEditPanel, self).__init__(*args, **kwargs)
@@ -860,6 +1134,10 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
 
     # set layout
     self.setLayout(self.vBox) 
+    
+    # containers and edit widgets for external parameters, kept for reuse and
+    # keyed by parameter name and data type
+    self.externalParamEditWidgets = {}
 
   def paramEditWidgetChanged(self, *args, **kwargs):    
     # get widget that sent the signal
@@ -874,8 +1152,11 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
     ### send new value to associated bench item
     self.setParamOnTarget(target, paramName, paramValue, sender)
     
-    # emit signal
-    self.parameterEdited.emit()
+    # emit signal with the edited object
+    self.parameterEdited.emit(target)
+
+  def paramEditWidgetReleased(self, *args, **kwargs):
+    self.parameterReleased.emit()
 
   def extractParamEditWidgetPayload(self, sender):
     # get parameters from sender
@@ -908,7 +1189,48 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
       # yellow background
       widget.setStyleSheet("background-color: yellow;")
 
+  def getExternalParamEditWidget(self, paramName, dataType):
+    """
+    Get container and edit widget for an external parameter, reusing those made
+    for earlier items where possible.
+    """
+    
+    key = (paramName, dataType)
+    
+    if key not in self.externalParamEditWidgets:
+      paramEditWidget = OptivisCanvasItemDataType.getCanvasWidget(paramName, dataType)
+      
+      # connect edit widget text change signal to a slot that deals with it
+      self.connect(paramEditWidget, PyQt4.QtCore.SIGNAL("textChanged(QString)"), self.paramEditWidgetChanged)
+      self.connect(paramEditWidget, PyQt4.QtCore.SIGNAL("editingFinished()"), self.paramEditWidgetReleased)
+      
+      # create a container for this edit widget
+      container = PyQt4.QtGui.QWidget()
+      containerLayout = PyQt4.QtGui.QHBoxLayout()
+      
+      # remove padding between widgets
+      containerLayout.setContentsMargins(0, 0, 0, 0)
+      
+      # create label
+      label = PyQt4.QtGui.QLabel(text=paramName)
+      
+      # add label and edit widget to layout
+      containerLayout.addWidget(label, 2) # stretch 2
+      containerLayout.addWidget(paramEditWidget, 1) # stretch 1
+      
+      # set layout of container
+      container.setLayout(containerLayout)
+      
+      self.externalParamEditWidgets[key] = (container, paramEditWidget)
+    
+    return self.externalParamEditWidgets[key]
+  
   def setContentFromCanvasItem(self, canvasItem):
+    # take reusable widgets out of the current contents, so they aren't
+    # deleted along with them
+    for (container, paramEditWidget) in self.externalParamEditWidgets.values():
+      container.setParent(None)
+    
     # empty current contents
     # from http://stackoverflow.com/questions/4528347/clear-all-widgets-in-a-layout-in-pyqt
     for i in reversed(range(self.vBox.count())): 
@@ -934,6 +1256,7 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
       
       # connect edit widget text change signal to a slot that deals with it
       aoiEditWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
+      aoiEditWidget.released.connect(self.paramEditWidgetReleased)
       
       OptivisCanvasItemDataType.setCanvasWidgetValue(aoiEditWidget, OptivisCanvasItemDataType.SPINBOX, getattr(canvasItem.item, 'aoi'))
       
@@ -967,6 +1290,7 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
       
       # connect edit widget text change signal to a slot that deals with it
       lengthEditWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
+      lengthEditWidget.released.connect(self.paramEditWidgetReleased)
       
       OptivisCanvasItemDataType.setCanvasWidgetValue(lengthEditWidget, OptivisCanvasItemDataType.SPINBOX, getattr(canvasItem.item, 'length'))
       
@@ -999,6 +1323,7 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
       
       # connect edit widget text change signal to a slot that deals with it
       azimuthEditWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
+      azimuthEditWidget.released.connect(self.paramEditWidgetReleased)
       
       OptivisCanvasItemDataType.setCanvasWidgetValue(azimuthEditWidget, OptivisCanvasItemDataType.SPINBOX, getattr(canvasItem.item, 'azimuth'))
       
@@ -1050,38 +1375,24 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
 	  # get attribute value
 	  paramValue = getattr(pykatObject, paramName)
 
-	  # get widget for this parameter
+	  # get widget for this parameter, reusing the one made for an earlier item if possible
 	  try:
-	    paramEditWidget = OptivisCanvasItemDataType.getCanvasWidget(paramName, dataType)
+	    (container, paramEditWidget) = self.getExternalParamEditWidget(paramName, dataType)
 
 	    # give the edit widget knowledge of its canvas item
 	    # use a weak reference to avoid making the canvas item a zombie if it is deleted
 	    paramEditWidget.data = (paramName, dataType, weakref.ref(pykatObject))
 	  except AttributeError, e:
-	    print "[GUI] WARNING: the value of a parameter specified in the parameter list with this object is not available. Skipping."
+	    logger.warning("The value of parameter %s specified in the parameter list of %s is not available. Skipping.", paramName, pykatObject)
 	    continue
 
-	  # connect edit widget text change signal to a slot that deals with it
-	  self.connect(paramEditWidget, PyQt4.QtCore.SIGNAL("textChanged(QString)"), self.paramEditWidgetChanged)
-	      
+	  # set value without signalling an edit
+	  paramEditWidget.blockSignals(True)
 	  OptivisCanvasItemDataType.setCanvasWidgetValue(paramEditWidget, dataType, paramValue)
+	  paramEditWidget.blockSignals(False)
 
-	  # create a container for this edit widget
-	  container = PyQt4.QtGui.QWidget()
-	  containerLayout = PyQt4.QtGui.QHBoxLayout()
-
-	  # remove padding between widgets
-	  containerLayout.setContentsMargins(0, 0, 0, 0)
-
-	  # create label
-	  label = PyQt4.QtGui.QLabel(text=paramName)
-
-	  # add label and edit widget to layout
-	  containerLayout.addWidget(label, 2) # stretch 2
-	  containerLayout.addWidget(paramEditWidget, 1) # stretch 1
-
-	  # set layout of container
-	  container.setLayout(containerLayout)
+	  # clear invalid value highlighting left from the widget's last use
+	  self.setEditWidgetValidity(paramEditWidget, True)
 
 	  # add container to edit panel
 	  externalLayout.addWidget(container)
@@ -1099,6 +1410,44 @@ class AbstractCanvasItem(object):
   def __init__(self, item, *args, **kwargs):
     self.item = item
     self.graphicsItem = None
+    
+    # called with this canvas item when an observed item changes
+    self.changeHandler = None
+    
+    # how the graphics items are cached
+    self.cacheMode = PyQt4.QtGui.QGraphicsItem.NoCache
+  
+  def getObservedItems(self):
+    """
+    Get the bench items and labels whose changes affect how this canvas item is drawn.
+    """
+    
+    return [self.item]
+  
+  def observe(self):
+    for item in self.getObservedItems():
+      item.addObserver(self.itemChanged)
+  
+  def unobserve(self):
+    for item in self.getObservedItems():
+      item.removeObserver(self.itemChanged)
+  
+  def itemChanged(self, item, attribute):
+    if self.changeHandler is not None:
+      self.changeHandler(self)
+  
+  def getGraphicsItems(self):
+    """
+    Get the QGraphicsItems drawing this canvas item.
+    """
+    
+    return [self.graphicsItem]
+  
+  def setCacheMode(self, cacheMode):
+    self.cacheMode = cacheMode
+    
+    for graphicsItem in self.getGraphicsItems():
+      graphicsItem.setCacheMode(cacheMode)
   
   @property
   def graphicsItem(self):
@@ -1134,13 +1483,15 @@ class CanvasComponent(AbstractCanvasItem):
     super(CanvasComponent, self).__init__(item=component, *args, **kwargs)
   
   def draw(self, qScene):
-    print "[GUI] Drawing component {0} at {1}".format(self.item, self.item.position)
+    logger.debug("Drawing component %s at %s", self.item, self.item.position)
     
     # Create full system path from filename and SVG directory.
     path = os.path.join(self.item.svgDir, self.item.filename)
     
-    # Create graphical representation of SVG image at path.
-    self.graphicsItem = OptivisSvgItem(path)
+    # Create graphical representation of SVG image at path, sharing the
+    # renderer of other components drawn from the same file.
+    self.graphicsItem = OptivisSvgItem()
+    self.graphicsItem.setSharedRenderer(CanvasRendererPool.getRenderer(path))
     
     # reference this CanvasComponent in the data payload
     self.graphicsItem.data = self
@@ -1151,7 +1502,7 @@ class CanvasComponent(AbstractCanvasItem):
     qScene.addItem(self.graphicsItem)
   
   def redraw(self):
-    print "[GUI] Redrawing component {0} at {1}".format(self.item, self.item.position)
+    logger.debug("Redrawing component %s at %s", self.item, self.item.position)
     
     self.setGraphicsFromItem()
     
@@ -1176,12 +1527,120 @@ class CanvasComponent(AbstractCanvasItem):
       else:
 	self.graphicsItem.setToolTip(str(self.item.tooltip))
 
+class CanvasRendererPool(object):
+  """
+  Process-wide pool of SVG renderers for component graphics.
+  
+  Renderers are keyed by path and modification time, so each asset is parsed
+  once per process unless it changes, and shared by every component drawn
+  from it.
+  """
+  
+  # map of paths to (modification time, renderer)
+  __renderers = {}
+  
+  # map of (renderer identity, width, height) to (renderer, pixmap)
+  __pixmaps = {}
+  
+  @classmethod
+  def getRenderer(cls, path):
+    """
+    Get renderer for the SVG file at the specified path.
+    """
+    
+    mtime = os.path.getmtime(path)
+    
+    if path in cls.__renderers:
+      (cachedMtime, renderer) = cls.__renderers[path]
+      
+      if cachedMtime == mtime:
+        return renderer
+    
+    logger.debug("Loading renderer for %s", path)
+    
+    renderer = PyQt4.QtSvg.QSvgRenderer(path)
+    
+    if not renderer.isValid():
+      raise Exception('Specified file {0} is not a valid SVG image'.format(path))
+    
+    cls.__renderers[path] = (mtime, renderer)
+    
+    return renderer
+  
+  @classmethod
+  def getPixmap(cls, renderer, scale=1):
+    """
+    Get pixmap of the graphic drawn by the specified renderer, at its default
+    size multiplied by the specified scale, for drawing components at low
+    detail. Each size is only rendered once.
+    """
+    
+    defaultSize = renderer.defaultSize()
+    
+    size = PyQt4.QtCore.QSize(max(1, int(math.ceil(defaultSize.width() * scale))), max(1, int(math.ceil(defaultSize.height() * scale))))
+    
+    key = (id(renderer), size.width(), size.height())
+    
+    if key not in cls.__pixmaps:
+      pixmap = PyQt4.QtGui.QPixmap(size)
+      pixmap.fill(PyQt4.QtCore.Qt.transparent)
+      
+      painter = PyQt4.QtGui.QPainter(pixmap)
+      renderer.render(painter)
+      painter.end()
+      
+      # keep the renderer, so that its identity isn't reused while it's a key
+      cls.__pixmaps[key] = (renderer, pixmap)
+    
+    return cls.__pixmaps[key][1]
+  
+  @classmethod
+  def clear(cls):
+    cls.__renderers.clear()
+    cls.__pixmaps.clear()
+  
+  @classmethod
+  def count(cls):
+    return len(cls.__renderers)
+
 class OptivisSvgItem(PyQt4.QtSvg.QGraphicsSvgItem):
   mousePressed = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
   mouseReleased = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
   
+  # levels of detail below which the graphic is drawn as a pixmap, and as an
+  # outline (always drawn in full by default)
+  pixmapDetail = 0
+  outlineDetail = 0
+  
   def __init__(self, *args, **kwargs):
+    # renderer shared with other items
+    self.sharedRenderer = None
+    
     super(OptivisSvgItem, self).__init__(*args, **kwargs)
+  
+  def paint(self, painter, option, widget=None):
+    detail = PyQt4.QtGui.QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+    
+    if detail >= self.pixmapDetail or self.sharedRenderer is None:
+      super(OptivisSvgItem, self).paint(painter, option, widget)
+    elif detail >= self.outlineDetail:
+      # the graphic is never drawn larger than it is at the pixmap threshold,
+      # so it only needs rendering at that size
+      pixmap = CanvasRendererPool.getPixmap(self.sharedRenderer, scale=self.pixmapDetail)
+      
+      painter.drawPixmap(self.boundingRect(), pixmap, PyQt4.QtCore.QRectF(pixmap.rect()))
+    else:
+      # cosmetic pen, so the outline stays visible however far out the view is zoomed
+      painter.setPen(PyQt4.QtGui.QPen(PyQt4.QtCore.Qt.black, 0))
+      painter.drawRect(self.boundingRect())
+  
+  def setSharedRenderer(self, renderer):
+    # Qt doesn't take ownership of shared renderers, so keep a reference to
+    # stop the renderer being deleted while this item uses it (e.g. after the
+    # pool replaces it)
+    self.sharedRenderer = renderer
+    
+    super(OptivisSvgItem, self).setSharedRenderer(renderer)
 
   def mousePressEvent(self, event, *args, **kwargs):
     # accept the event
@@ -1210,7 +1669,7 @@ class CanvasLink(AbstractCanvasItem):
     super(CanvasLink, self).__init__(item=link, *args, **kwargs)
 
   def draw(self, qScene, *args, **kwargs):
-    print "[GUI] Drawing link {0}".format(self.item)
+    logger.debug("Drawing link %s", self.item)
     
     # create graphics object(s)
     container = OptivisItemContainer()
@@ -1239,7 +1698,7 @@ class CanvasLink(AbstractCanvasItem):
     container.draw(qScene)
 
   def redraw(self, *args, **kwargs):
-    print "[GUI] Redrawing link {0}".format(self.item)
+    logger.debug("Redrawing link %s", self.item)
     
     self.setGraphicsFromItem(*args, **kwargs)
 
@@ -1270,6 +1729,9 @@ class CanvasLink(AbstractCanvasItem):
     
     self.endMarker.setRect(self.item.end.x - endMarkerRadius, self.item.end.y - endMarkerRadius, endMarkerRadius * 2, endMarkerRadius * 2)
     self.endMarker.setPen(PyQt4.QtGui.QPen(PyQt4.QtGui.QColor(endMarkerColor), 1, PyQt4.QtCore.Qt.SolidLine))
+  
+  def getGraphicsItems(self):
+    return self.graphicsItem.items + [self.startMarker, self.endMarker]
 
 class OptivisLineItemCommunicator(PyQt4.QtCore.QObject):
   """
@@ -1280,6 +1742,9 @@ class OptivisLineItemCommunicator(PyQt4.QtCore.QObject):
   mouseReleased = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
 
 class OptivisLineItem(PyQt4.QtGui.QGraphicsLineItem):  
+  # level of detail below which dash patterns are drawn as solid lines
+  patternDetail = 0
+  
   def __init__(self, *args, **kwargs):
     # Create a communicator.
     # This is necessary because QGraphicsLineItem does not inherit from QObject, so it does
@@ -1288,6 +1753,19 @@ class OptivisLineItem(PyQt4.QtGui.QGraphicsLineItem):
     self.comms = OptivisLineItemCommunicator()
     
     super(OptivisLineItem, self).__init__(*args, **kwargs)
+  
+  def paint(self, painter, option, widget=None):
+    detail = PyQt4.QtGui.QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+    
+    if detail >= self.patternDetail:
+      super(OptivisLineItem, self).paint(painter, option, widget)
+    else:
+      # stroking dashes is slow, and they can't be made out anyway
+      pen = PyQt4.QtGui.QPen(self.pen())
+      pen.setStyle(PyQt4.QtCore.Qt.SolidLine)
+      
+      painter.setPen(pen)
+      painter.drawLine(self.line())
     
   def mousePressEvent(self, event, *args, **kwargs):
     # Accept the event.
@@ -1311,9 +1789,13 @@ class CanvasLabel(AbstractCanvasItem):
       raise Exception('Specified label is not of type AbstractLabel')
                     
     super(CanvasLabel, self).__init__(item=label, *args, **kwargs)
+  
+  def getObservedItems(self):
+    # labels move with their items
+    return [self.item, self.item.item]
 
   def draw(self, qScene, *args, **kwargs):
-    print "[GUI] Drawing label {0}".format(self.item)
+    logger.debug("Drawing label %s", self.item)
 
     # create label
     self.graphicsItem = OptivisLabelItem()
@@ -1328,7 +1810,7 @@ class CanvasLabel(AbstractCanvasItem):
     qScene.addItem(self.graphicsItem)
     
   def redraw(self, *args, **kwargs):
-    print "[GUI] Redrawing label {0}".format(self.item)
+    logger.debug("Redrawing label %s", self.item)
     
     # Update graphical representation.
     self.setGraphicsFromItem(*args, **kwargs)
@@ -1352,21 +1834,22 @@ class CanvasLabel(AbstractCanvasItem):
     
     ### Calculate label size and azimuth.
     labelSize = optivis.geometry.Coordinates(self.graphicsItem.boundingRect().width(), self.graphicsItem.boundingRect().height())
-    labelAzimuth = self.item.item.getLabelAzimuth() + self.item.azimuth
     
-    ### Draw label at the correct position and orientation.
+    # rotation of the attached item, shared by the user-defined position and offset
+    itemRotation = self.item.item.getLabelRotation()
+    
+    labelAzimuth = itemRotation.azimuth + self.item.azimuth
     
-    # get nominal position
-    labelPosition = self.item.item.getLabelOrigin()
+    ### Draw label at the correct position and orientation.
     
-    # translate to user-defined position
-    labelPosition = labelPosition.translate((self.item.position * self.item.item.getSize()).rotate(self.item.item.getLabelAzimuth()))
+    # get nominal position, translated to user-defined position
+    labelPosition = itemRotation.rotateAndTranslate(self.item.position * self.item.item.getSize(), self.item.item.getLabelOrigin())
     
     # move label such that the text is y-centered
-    labelPosition = labelPosition.translate(optivis.geometry.Coordinates(0, labelSize.y / 2).flip().rotate(labelAzimuth))
+    labelPosition = optivis.geometry.Coordinates(0, labelSize.y / 2).flip().rotateAndTranslate(labelAzimuth, labelPosition)
     
     # add user-defined offset
-    labelPosition = labelPosition.translate(self.item.offset.rotate(self.item.item.getLabelAzimuth()))
+    labelPosition = itemRotation.rotateAndTranslate(self.item.offset, labelPosition)
     
     # set position and angle
     self.graphicsItem.setPos(labelPosition.x, labelPosition.y)
@@ -1382,6 +1865,9 @@ class OptivisLabelItemCommunicator(PyQt4.QtCore.QObject):
   mouseReleased = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
 
 class OptivisLabelItem(PyQt4.QtGui.QGraphicsSimpleTextItem):
+  # level of detail below which the label is too small to read, so isn't drawn
+  visibleDetail = 0
+  
   def __init__(self, *args, **kwargs):
     # Create a communicator.
     # This is necessary because QGraphicsSimpleTextItem does not inherit from QObject, so it does
@@ -1391,6 +1877,12 @@ class OptivisLabelItem(PyQt4.QtGui.QGraphicsSimpleTextItem):
     
     super(OptivisLabelItem, self).__init__(*args, **kwargs)
   
+  def paint(self, painter, option, widget=None):
+    if PyQt4.QtGui.QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform()) < self.visibleDetail:
+      return
+    
+    super(OptivisLabelItem, self).paint(painter, option, widget)
+  
   def mousePressEvent(self, event, *args, **kwargs):
     # Accept the event.
     # this is the default, but we'll call it anyway
@@ -1463,6 +1955,31 @@ class OptivisItemContainer(object):
   def items(self, items):
     self.__items = items
 
+class OptivisSpinBox(PyQt4.QtGui.QDoubleSpinBox):
+  """
+  Spin box which signals when it is released after an edit, i.e. when a key or
+  mouse button is let go, or editing is finished.
+  """
+  
+  released = PyQt4.QtCore.pyqtSignal()
+  
+  def __init__(self, *args, **kwargs):
+    super(OptivisSpinBox, self).__init__(*args, **kwargs)
+    
+    self.editingFinished.connect(self.released)
+  
+  def keyReleaseEvent(self, event, *args, **kwargs):
+    super(OptivisSpinBox, self).keyReleaseEvent(event, *args, **kwargs)
+    
+    # held keys send repeated releases
+    if not event.isAutoRepeat():
+      self.released.emit()
+  
+  def mouseReleaseEvent(self, event, *args, **kwargs):
+    super(OptivisSpinBox, self).mouseReleaseEvent(event, *args, **kwargs)
+    
+    self.released.emit()
+
 class OptivisItemDataType(object):
   """
   Class to define data types for editable parameters of bench items.
@@ -1485,7 +2002,7 @@ class OptivisCanvasItemDataType(OptivisItemDataType):
 
       return widget
     elif itemDataType == OptivisCanvasItemDataType.SPINBOX:
-      widget = PyQt4.QtGui.QDoubleSpinBox()
+      widget = OptivisSpinBox()
       
       # set range and increment
       acceptRange = kwargs['acceptRange']
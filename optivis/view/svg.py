@@ -5,6 +5,14 @@ import os.path
 import sys
 
 import abc
+import copy
+import functools
+import itertools
+import re
+import StringIO
+import tempfile
+import xml.sax.saxutils
+import multiprocessing
 import cairosvg
 from xml.etree import ElementTree as et
 
@@ -19,7 +27,21 @@ class Svg(optivis.view.AbstractView):
   __extensions = ['.svg', '.png', '.pdf', '.ps']
   __filters = ['SVG image (*.svg)', 'PNG image (*.png)', 'Portable Document Format (*.pdf)', 'PostScript document (*.ps)']
   
+  # cache to serve unchanged exports from, shared by all views unless set per view
+  exportCache = None
+  
+  # size in bytes of SVG documents below which exportFormats converts them
+  # serially, as they convert faster than they can be sent to other processes
+  concurrentSize = 256 * 1024
+  
+  # (process ID, pool) of processes converting SVG documents for
+  # exportFormats, kept between calls
+  __conversionPool = None
+  
   def __init__(self, *args, **kwargs):
+    if 'exportCache' in kwargs:
+      self.exportCache = kwargs.pop('exportCache')
+    
     super(Svg, self).__init__(*args, **kwargs)
   
   def getDrawableComponents(self):
@@ -41,12 +63,15 @@ class Svg(optivis.view.AbstractView):
     return drawableLinks
   
   def layout(self):
-    layout = self.layoutManager(self.scene)
-    layout.arrange()
+    layout = self.getLayoutInstance()
+    
+    # the layout may be shared with another view that has already arranged the scene
+    if not layout.isArranged():
+      layout.arrange()
     
     return
   
-  def export(self, path, fileFormat="svg", size=None, dpi=96):
+  def export(self, path, fileFormat="svg", size=None, dpi=96, symbols=False):
     """
     Export scene to file. Supports various formats, but ultimately
     everything is converted into its final format from a SVG.
@@ -58,9 +83,208 @@ class Svg(optivis.view.AbstractView):
         millimetres by the specified dots per inch (dpi, default 96)
         divided by the number of millimetres per inch (25.4)
     
+    If the view has an export cache, a scene that has not changed since it
+    was last exported with the same arguments is copied from the cache
+    without being laid out again.
+    
     Optional arguments:
       dpi - dots per inch for PDF and PS output
+      symbols - define each component graphic once and draw components as
+                references to it (see getSvgString)
+    
+    """
+    
+    self.checkExport(path, fileFormat, size)
+    
+    # key of this export in the export cache, if there is one
+    cacheKey = None
+    
+    if self.exportCache is not None:
+      cacheSize = None
+      
+      if size is not None:
+        cacheSize = (size.x, size.y)
+      
+      cacheKey = self.exportCache.getKey(self.getFingerprint(), fileFormat, cacheSize, dpi, symbols)
+      
+      exportContent = self.exportCache.get(cacheKey)
+      
+      if exportContent is not None:
+        # unchanged since last export - no need to lay out or convert
+        with open(path, 'w') as f:
+          f.write(exportContent)
+        
+        return
+    
+    # lay things out before doing anything else
+    self.layout()
+    
+    # initial export data
+    exportContent = None
+    
+    # convert format, if necessary
+    if fileFormat != 'svg':
+      # get SVG document
+      svgByteString = unicode.encode(self.getSvgString(size=size, symbols=symbols))
+      
+      exportContent = convertSvg(svgByteString, fileFormat, dpi=dpi)
+    elif cacheKey is None:
+      # write SVG document straight to a file, without holding it in memory
+      self.streamSvg(path, symbols=symbols)
+      
+      return
+    else:
+      # get SVG document to store in cache
+      exportContent = unicode.encode(self.getSvgString(symbols=symbols))
+    
+    if cacheKey is not None:
+      self.exportCache.put(cacheKey, exportContent)
+
+    f = open(path, 'w')
+    f.write(exportContent)
+    f.close()
+    
+    return
+
+  def streamSvg(self, path, symbols=False):
+    """
+    Write SVG document to the specified path as it is drawn.
+    
+    The document is written to a temporary file in the same directory, then
+    moved to the path once it is complete, so that a failed drawing (e.g. of a
+    missing component graphic) doesn't leave a partial document at the path.
+    """
+    
+    (handle, temporaryPath) = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    
+    try:
+      with os.fdopen(handle, 'w') as f:
+        self.writeSvg(f, symbols=symbols)
+      
+      # temporary files are only readable by their owner, so give the file the
+      # permissions it would have if written directly
+      umask = os.umask(0)
+      os.umask(umask)
+      
+      os.chmod(temporaryPath, 0o666 & ~umask)
+      os.rename(temporaryPath, path)
+    except Exception:
+      try:
+        os.unlink(temporaryPath)
+      except OSError:
+        pass
+      
+      raise
+  
+  def exportFormats(self, paths, size=None, dpi=96, symbols=False, concurrent=True):
+    """
+    Export scene to several files, with formats given by the paths'
+    extensions, e.g. ['figure.svg', 'figure.pdf'].
+    
+    The scene is laid out and its SVG document built once for all of the
+    files, so unlike export, a size applies to SVG files too. Files in the
+    export cache, if there is one, are copied from it, and the scene is only
+    laid out if some aren't. If concurrent is True, conversions of large
+    documents to other formats run in parallel processes. Other arguments are
+    as for export.
+    """
+    
+    fileFormats = [os.path.splitext(path)[1][1:].lower() for path in paths]
+    
+    for (path, fileFormat) in zip(paths, fileFormats):
+      # the shared document is drawn at the specified size, so it is not
+      # ignored for SVG files
+      if fileFormat == 'svg':
+        self.checkExport(path, fileFormat, None)
+      else:
+        self.checkExport(path, fileFormat, size)
+    
+    if size is not None and not isinstance(size, optivis.geometry.Coordinates):
+      raise Exception('Specified size is not of type Coordinates.')
+    
+    # exported content of each format
+    exportContents = {}
+    
+    # keys of each format in the export cache, if there is one
+    cacheKeys = {}
+    
+    if self.exportCache is not None:
+      cacheSize = None
+      
+      if size is not None:
+        cacheSize = (size.x, size.y)
+      
+      fingerprint = self.getFingerprint()
+      
+      for fileFormat in set(fileFormats):
+        # same keys as export uses
+        cacheKeys[fileFormat] = self.exportCache.getKey(fingerprint, fileFormat, cacheSize, dpi, symbols)
+        
+        exportContent = self.exportCache.get(cacheKeys[fileFormat])
+        
+        if exportContent is not None:
+          exportContents[fileFormat] = exportContent
+    
+    # formats not found in the cache
+    missingFormats = [fileFormat for fileFormat in set(fileFormats) if fileFormat not in exportContents]
+    
+    if missingFormats:
+      # lay things out before doing anything else
+      self.layout()
+      
+      # get SVG document, shared by all formats
+      svgByteString = unicode.encode(self.getSvgString(size=size, symbols=symbols))
+      
+      # formats to convert the SVG document into
+      conversionFormats = [fileFormat for fileFormat in missingFormats if fileFormat != 'svg']
+      
+      convert = functools.partial(convertSvg, svgByteString, dpi=dpi)
+      
+      # daemon processes (e.g. batch export workers) can't start their own
+      if concurrent and len(conversionFormats) > 1 and len(svgByteString) >= self.concurrentSize and not multiprocessing.current_process().daemon:
+        conversions = self.getConversionPool().map(convert, conversionFormats)
+      else:
+        conversions = [convert(fileFormat) for fileFormat in conversionFormats]
+      
+      missingContents = dict(zip(conversionFormats, conversions))
+      missingContents['svg'] = svgByteString
+      
+      for fileFormat in missingFormats:
+        exportContents[fileFormat] = missingContents[fileFormat]
+        
+        if fileFormat in cacheKeys:
+          self.exportCache.put(cacheKeys[fileFormat], exportContents[fileFormat])
+    
+    for (path, fileFormat) in zip(paths, fileFormats):
+      with open(path, 'w') as f:
+        f.write(exportContents[fileFormat])
+  
+  @staticmethod
+  def getConversionPool():
+    """
+    Get pool of processes to convert SVG documents with, creating it the first
+    time it is needed in this process.
+    """
+    
+    # pools can't be used by processes forked from the one that created them
+    if Svg.__conversionPool is None or Svg.__conversionPool[0] != os.getpid():
+      # one process for each format converted from SVG
+      Svg.__conversionPool = (os.getpid(), multiprocessing.Pool(len(Svg.__formats) - 1))
     
+    return Svg.__conversionPool[1]
+  
+  def getFingerprint(self):
+    """
+    Get fingerprint of the scene as this view lays it out, for export cache
+    keys. The layout instance may have a scale function other than the
+    default, so this is included.
+    """
+    
+    return self.scene.getFingerprint(layoutManager=self.layoutManager, scaleFunc=self.getLayoutInstance().scaleFunc)
+  
+  def checkExport(self, path, fileFormat, size):
+    """
+    Raise an exception if the specified export arguments are invalid.
     """
     
     # check path is valid
@@ -78,40 +302,36 @@ class Svg(optivis.view.AbstractView):
     # check size is valid, if specified
     if size is not None:
       if not isinstance(size, optivis.geometry.Coordinates):
-	raise Exception('Specified size is not of type Coordinates.')
+        raise Exception('Specified size is not of type Coordinates.')
     
     # raise exception if SVG format specified along with a size
     if fileFormat == 'svg' and isinstance(size, optivis.geometry.Coordinates):
       raise Exception('Size is ignored for SVG exports.')
+  
+  def getSvgString(self, size=None, symbols=False):
+    """
+    Get SVG document representing the scene.
     
-    # lay things out before doing anything else
-    self.layout()
+    If symbols is True, each distinct component graphic is defined once in a
+    <defs> element and components are drawn with <use> elements referencing
+    it, instead of with a copy of the graphic each.
+    """
     
-    # initial export data
-    exportContent = None
+    svgFile = StringIO.StringIO()
     
-    # convert format, if necessary
-    if fileFormat != 'svg':
-      # get SVG document
-      svgByteString = unicode.encode(self.getSvgString(size=size))
-      
-      if fileFormat == 'png':
-	exportContent = cairosvg.surface.PNGSurface.convert(bytestring=svgByteString)
-      elif fileFormat == 'pdf':
-	exportContent = cairosvg.surface.PDFSurface.convert(bytestring=svgByteString, dpi=dpi)
-      elif fileFormat == 'ps':
-	exportContent = cairosvg.surface.PSSurface.convert(bytestring=svgByteString, dpi=dpi)
-    else:
-      # get SVG document
-      exportContent = self.getSvgString()
-
-    f = open(path, 'w')
-    f.write(exportContent)
-    f.close()
+    self.writeSvg(svgFile, size=size, symbols=symbols)
+    
+    return svgFile.getvalue()
+  
+  def writeSvg(self, svgFile, size=None, symbols=False):
+    """
+    Write SVG document representing the scene to the specified file object.
+    
+    Each link and component is written as soon as it is drawn, so the whole
+    document is never held in memory and output starts straight away. See
+    getSvgString for the meaning of the arguments.
+    """
     
-    return
-
-  def getSvgString(self, size=None):
     sceneSize = self.scene.getSize()
     
     if size is None:
@@ -123,27 +343,234 @@ class Svg(optivis.view.AbstractView):
     # scaling factor
     scaling = size / sceneSize
     
-    rootElement = et.Element('svg', width='{0}'.format(size.x), height='{0}'.format(size.y), version='1.1', xmlns='http://www.w3.org/2000/svg')
+    rootAttributes = {'width': '{0}'.format(size.x), 'height': '{0}'.format(size.y), 'version': '1.1', 'xmlns': 'http://www.w3.org/2000/svg'}
     
-    # by default, we attach drawables to root
-    drawElement = rootElement
+    # table of graphics to reference from components, if enabled
+    symbolTable = None
     
-    if scaling != 1.0:
-      # make the draw element a scale group
-      drawElement = et.Element('g', transform='scale({0})'.format(scaling))
+    if symbols:
+      # <use> references need the XLink namespace
+      rootAttributes['xmlns:xlink'] = 'http://www.w3.org/1999/xlink'
       
-      rootElement.append(drawElement)
+      symbolTable = SvgSymbolTable(et.Element('defs'))
+    
+    svgFile.write('<?xml version=\"1.0\" encoding=\"utf-8\" standalone=\"no\"?>\n<!DOCTYPE svg PUBLIC \"-//W3C//DTD SVG 1.1//EN\"\n\"http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd\">\n')
+    svgFile.write(Svg.getStartTag('svg', rootAttributes))
+    
+    if scaling != 1.0:
+      # put drawables in a scale group
+      svgFile.write(Svg.getStartTag('g', {'transform': 'scale({0})'.format(scaling)}))
     
     for svgLink in self.getDrawableLinks():
-      svgLink.draw(drawElement)
+      Svg.writeItem(svgFile, svgLink)
     
     for svgComponent in self.getDrawableComponents():
       # draw component with offset applied to centre everything in the SVG canvas
-      svgComponent.draw(drawElement)
+      Svg.writeItem(svgFile, svgComponent, symbolTable=symbolTable)
     
-    docStr = '<?xml version=\"1.0\" encoding=\"utf-8\" standalone=\"no\"?>\n<!DOCTYPE svg PUBLIC \"-//W3C//DTD SVG 1.1//EN\"\n\"http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd\">\n' + et.tostring(rootElement)
+    if scaling != 1.0:
+      svgFile.write('</g>')
     
-    return docStr
+    svgFile.write('</svg>')
+  
+  @staticmethod
+  def writeItem(svgFile, svgItem, symbolTable=None):
+    """
+    Draw the specified item and write its markup to the specified file object.
+    """
+    
+    # temporary parent for the item's elements
+    container = et.Element('g')
+    
+    if symbolTable is None:
+      svgItem.draw(container)
+    else:
+      svgItem.draw(container, symbolTable=symbolTable)
+      
+      if len(symbolTable.definitions):
+        # write graphics first used by this item, then forget them
+        svgFile.write(et.tostring(symbolTable.definitions))
+        
+        del(symbolTable.definitions[:])
+    
+    for element in container:
+      svgFile.write(et.tostring(element))
+  
+  @staticmethod
+  def getStartTag(tag, attributes):
+    # attributes are sorted, as they are by ElementTree
+    return '<{0}{1}>'.format(tag, ''.join(' {0}={1}'.format(key, xml.sax.saxutils.quoteattr(value)) for (key, value) in sorted(attributes.items())))
+
+def convertSvg(svgByteString, fileFormat, dpi=96):
+  """
+  Convert SVG document into the specified format.
+  
+  This is a module level function so that it can be run in other processes.
+  """
+  
+  if fileFormat == 'png':
+    return cairosvg.surface.PNGSurface.convert(bytestring=svgByteString)
+  elif fileFormat == 'pdf':
+    return cairosvg.surface.PDFSurface.convert(bytestring=svgByteString, dpi=dpi)
+  elif fileFormat == 'ps':
+    return cairosvg.surface.PSSurface.convert(bytestring=svgByteString, dpi=dpi)
+  else:
+    raise Exception('The specified file format is invalid.')
+
+class SvgTemplate(object):
+  """
+  Component graphic parsed from an SVG file, ready to be copied into documents.
+  
+  The elements with IDs, and the attributes referencing these IDs, are found
+  once when the template is created, so that each copy can be given unique IDs
+  in a single pass over just these elements and attributes.
+  """
+  
+  # reference to an ID in an attribute value, e.g. fill="url(#gradient)"
+  referencePattern = re.compile(r'url\(#([^)]+)\)')
+  
+  # source of unique ID numbers (element identities can't be used, as elements
+  # may be freed and their identities reused once written to a stream)
+  idNumbers = itertools.count()
+  
+  def __init__(self, svgElement, path=None):
+    # make sure we've got an SVG element as root
+    if svgElement.tag != 'svg':
+      raise Exception('Root element of SVG file {0} is not an \'svg\' tag'.format(path))
+    
+    # put contents of SVG element in new group
+    self.graphicGroup = et.Element('g')
+    
+    for child in svgElement:
+      self.graphicGroup.append(child)
+    
+    elements = list(self.graphicGroup.iter())
+    
+    ids = set([])
+    
+    # positions of elements with IDs, in document order
+    self.idIndices = []
+    
+    for (index, element) in enumerate(elements):
+      if 'id' in element.attrib:
+        if element.attrib['id'] in ids:
+          raise Exception('Found duplicate ID in SVG file {0}'.format(path))
+        
+        ids.add(element.attrib['id'])
+        self.idIndices.append(index)
+    
+    # positions of elements and keys of their attributes that reference IDs
+    self.references = []
+    
+    for (index, element) in enumerate(elements):
+      for (attrKey, attrVal) in element.attrib.iteritems():
+        if attrKey == 'id':
+          continue
+        
+        if any(match.group(1) in ids for match in self.referencePattern.finditer(attrVal)):
+          self.references.append((index, attrKey))
+  
+  def getGraphicGroup(self):
+    """
+    Get copy of the graphic, with its IDs replaced by ones unique to this copy
+    (this allows the same graphic to be used multiple times in a document).
+    """
+    
+    graphicGroup = copy.deepcopy(self.graphicGroup)
+    
+    # copied elements are in the same order as the template's
+    elements = list(graphicGroup.iter())
+    
+    # map of current IDs to unique IDs
+    uniqueIds = {}
+    
+    for index in self.idIndices:
+      element = elements[index]
+      
+      uniqueId = 'e{0}'.format(next(SvgTemplate.idNumbers))
+      
+      uniqueIds[element.attrib['id']] = uniqueId
+      element.attrib['id'] = uniqueId
+    
+    def replaceReference(match):
+      return 'url(#{0})'.format(uniqueIds.get(match.group(1), match.group(1)))
+    
+    for (index, attrKey) in self.references:
+      element = elements[index]
+      
+      element.attrib[attrKey] = self.referencePattern.sub(replaceReference, element.attrib[attrKey])
+    
+    return graphicGroup
+
+class SvgAssetCache(object):
+  """
+  Process-wide cache of component SVG files.
+  
+  Files are keyed by path and modification time, so an asset is read from disk
+  and prepared as a template once per process unless it changes.
+  """
+  
+  # map of paths to (modification time, template)
+  __templates = {}
+  
+  @classmethod
+  def getTemplate(cls, path):
+    """
+    Get template for the graphic in the SVG file at the specified path.
+    """
+    
+    mtime = os.path.getmtime(path)
+    
+    if path in cls.__templates:
+      (cachedMtime, template) = cls.__templates[path]
+      
+      if cachedMtime == mtime:
+        return template
+    
+    # parse SVG file into an element tree and make a template from its root element
+    template = SvgTemplate(et.parse(path).getroot(), path)
+    
+    cls.__templates[path] = (mtime, template)
+    
+    return template
+  
+  @classmethod
+  def clear(cls):
+    cls.__templates.clear()
+  
+  @classmethod
+  def count(cls):
+    return len(cls.__templates)
+
+class SvgSymbolTable(object):
+  """
+  Component graphics defined once in a document, for components to reference.
+  """
+  
+  def __init__(self, definitions):
+    # element to add graphics to, usually the document's <defs>
+    self.definitions = definitions
+    
+    # map of SVG file paths to the IDs of their graphics
+    self.__symbolIds = {}
+  
+  def getSymbolId(self, path):
+    """
+    Get ID of the graphic in the SVG file at the specified path, adding the
+    graphic to the definitions if it is not already there.
+    """
+    
+    if path not in self.__symbolIds:
+      graphicGroup = SvgComponent.getGraphicGroup(path)
+      
+      symbolId = 's{0}'.format(len(self.__symbolIds))
+      graphicGroup.attrib['id'] = symbolId
+      
+      self.definitions.append(graphicGroup)
+      
+      self.__symbolIds[path] = symbolId
+    
+    return self.__symbolIds[path]
 
 class AbstractSvgItem(object):
   """
@@ -168,66 +595,34 @@ class SvgComponent(AbstractSvgItem):
     
     super(SvgComponent, self).__init__(*args, **kwargs)
   
-  def draw(self, document):
+  @staticmethod
+  def getGraphicGroup(path):
+    """
+    Get group containing the graphic in the SVG file at the specified path,
+    with its IDs replaced by ones unique to this copy.
+    """
+    
+    return SvgAssetCache.getTemplate(path).getGraphicGroup()
+  
+  def draw(self, document, symbolTable=None):
+    """
+    Draw component onto the specified document. If a symbol table is
+    specified, the component is drawn as a reference to its graphic in the
+    table rather than with a copy of the graphic.
+    """
+    
     if not isinstance(document, et.Element):
       raise Exception('Specified document is not of type ElementTree')
     
     # create full path to SVG file
     path = os.path.join(self.component.svgDir, self.component.filename)
     
-    # parse SVG file into an element tree
-    svgFile = et.parse(path)
-    
-    # get root element from tree
-    svgElement = svgFile.getroot()
-    
-    # make sure we've got an SVG element as root
-    if svgElement.tag != 'svg':
-      raise Exception('Root element of SVG file %s is not an \'svg\' tag'.format(path))
-    
-    # put contents of SVG element in new group to keep it unaltered
-    graphicGroup = et.Element('g')
-    
-    for child in svgElement:
-      graphicGroup.append(child)
+    if symbolTable is None:
+      graphicGroup = SvgComponent.getGraphicGroup(path)
+    else:
+      graphicGroup = et.Element('use', {'xlink:href': '#{0}'.format(symbolTable.getSymbolId(path))})
     
-    # map of unique IDs
-    uniqueIds = {}
-
-    # loop over all subelements of the root, replacing ID with a unique string (this allows the same SVG images to be used multiple times in a document)
-    for element in list(graphicGroup.iter()):
-      if 'id' in element.attrib:
-	# element has an ID associated with it - check if it's been seen already	
-	currentId = element.attrib['id']
-	
-	if currentId in uniqueIds:
-	  raise Exception('Found duplicate ID in SVG file %s'.format(path))
-	
-	# current ID has not yet been seen - generate a unique alternative
-	uniqueId = 'e{0}'.format(id(element))
-	
-	# map unique ID to current ID
-	uniqueIds[currentId] = uniqueId
-
-    # loop over all subelements again, replacing IDs with unique equivalents
-    for element in list(graphicGroup.iter()):
-      if 'id' in element.attrib:
-	element.attrib['id'] = uniqueIds[element.attrib['id']]
-      
-      # check any attributes for references to IDs
-      for (attrKey, attrVal) in element.attrib.iteritems():
-	# loop over all entries of map
-	for thisId in uniqueIds:
-	  # form string with hash at beginning to search for references to IDs
-	  needle = 'url(#{0})'.format(thisId)
-	  if needle in attrVal:
-	    # found reference to ID - create replacement
-	    newNeedle = 'url(#{0})'.format(uniqueIds[thisId])
-	  
-	    # replace with unique ID
-	    element.attrib[attrKey] = attrVal.replace(needle, newNeedle)
-
-    # now graphicGroup contains content with unique IDs, ready to be combined with other SVG markup.
+    # now graphicGroup contains the graphic, ready to be combined with other SVG markup.
     # create a new group to control this SVG image's global position (accounting for centre of rotation)
     group1 = et.Element('g', transform='translate({0} {1})'.format(self.component.position.x - self.component.size.x / 2, self.component.position.y - self.component.size.y / 2))
 
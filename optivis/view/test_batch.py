@@ -0,0 +1,90 @@
+from __future__ import unicode_literals, division
+
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from unittest import TestCase
+
+import optivis.scene
+import optivis.view.batch
+import optivis.bench.components as components
+
+class TestBatchExport(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def getScene(self, length):
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    mirror = components.CavityMirror()
+    
+    scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), length=length)
+    scene.reference = laser
+    
+    return scene
+  
+  def getJobs(self):
+    return [(self.getScene(10 * (i + 1)), os.path.join(self.directory, 'scene{0}.svg'.format(i)), 'svg', None, 96) for i in range(0, 4)]
+  
+  def test_invalid_processes(self):
+    self.assertRaises(Exception, optivis.view.batch.BatchExporter, 0)
+  
+  def test_format_from_extension(self):
+    self.assertEqual(optivis.view.batch.ExportJob(self.getScene(10), 'scene.PDF').fileFormat, 'pdf')
+  
+  def test_scene_pickle(self):
+    scene = pickle.loads(pickle.dumps(self.getScene(10), 2))
+    
+    # identity-keyed indices are rebuilt
+    self.assertTrue(scene.hasComponent(scene.reference))
+    self.assertEqual(len(scene.getComponentLinks(scene.reference)), 1)
+  
+  def assertResults(self, results, jobs):
+    self.assertEqual([result.job.path for result in results], [job[1] for job in jobs])
+    
+    for result in results:
+      self.assertTrue(result.success, result.error)
+      self.assertTrue(os.path.isfile(result.job.path))
+  
+  def test_serial(self):
+    jobs = self.getJobs()
+    
+    self.assertResults(optivis.view.batch.BatchExporter(processes=1).export(jobs), jobs)
+  
+  def test_parallel(self):
+    jobs = self.getJobs()
+    reported = []
+    
+    results = optivis.view.batch.BatchExporter(processes=2).export(jobs, callback=reported.append)
+    
+    self.assertResults(results, jobs)
+    
+    # results are reported as they finish, which may be out of order
+    self.assertItemsEqual(reported, results)
+  
+  def test_errors(self):
+    jobs = self.getJobs()
+    jobs[1] = (jobs[1][0], jobs[1][1], 'invalid', None, 96)
+    
+    results = optivis.view.batch.BatchExporter(processes=2).export(jobs)
+    
+    self.assertEqual([result.success for result in results], [True, False, True, True])
+    self.assertIn('file format is invalid', results[1].error)
+  
+  def test_unpicklable_scene(self):
+    jobs = self.getJobs()
+    
+    # weak references can't be pickled
+    pykatObject = set([])
+    jobs[2][0].reference.pykatObject = weakref.ref(pykatObject)
+    
+    results = optivis.view.batch.BatchExporter(processes=2).export(jobs)
+    
+    self.assertEqual([result.job.path for result in results], [job[1] for job in jobs])
+    self.assertEqual([result.success for result in results], [True, True, False, True])
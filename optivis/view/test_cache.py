@@ -0,0 +1,65 @@
+from __future__ import unicode_literals, division
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import optivis.view.cache
+
+class TestExportCache(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    
+    self.cache = optivis.view.cache.ExportCache(os.path.join(self.directory, 'cache'), maxSize=100)
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def setUsed(self, key, time):
+    os.utime(self.cache.getPath(key), (time, time))
+  
+  def test_key(self):
+    self.assertEqual(self.cache.getKey('abc', 'png', None, 96), self.cache.getKey('abc', 'png', None, 96))
+    self.assertNotEqual(self.cache.getKey('abc', 'png', None, 96), self.cache.getKey('abc', 'pdf', None, 96))
+  
+  def test_get_put(self):
+    self.assertIsNone(self.cache.get('a'))
+    
+    self.cache.put('a', b'content')
+    
+    self.assertEqual(self.cache.get('a'), b'content')
+  
+  def test_failed_put(self):
+    # unicode content can't be written to the binary entry file
+    self.assertRaises(Exception, self.cache.put, 'a', '\xe9')
+    
+    self.assertIsNone(self.cache.get('a'))
+    self.assertEqual(os.listdir(self.cache.directory), [])
+  
+  def test_too_large(self):
+    self.cache.put('a', b'x' * 101)
+    
+    self.assertIsNone(self.cache.get('a'))
+  
+  def test_least_recently_used_evicted(self):
+    self.cache.put('a', b'x' * 40)
+    self.setUsed('a', 1)
+    
+    self.cache.put('b', b'x' * 40)
+    self.setUsed('b', 2)
+    
+    # use a, so b is now the least recently used
+    self.cache.get('a')
+    
+    self.cache.put('c', b'x' * 40)
+    
+    self.assertIsNotNone(self.cache.get('a'))
+    self.assertIsNone(self.cache.get('b'))
+    self.assertIsNotNone(self.cache.get('c'))
+  
+  def test_clear(self):
+    self.cache.put('a', b'content')
+    self.cache.clear()
+    
+    self.assertEqual(self.cache.getEntries(), [])
@@ -0,0 +1,431 @@
+from __future__ import unicode_literals, division
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from xml.etree import ElementTree as et
+
+import optivis.scene
+import optivis.geometry
+import optivis.view.svg
+import optivis.view.cache
+import optivis.layout
+import optivis.layout.scale
+import optivis.layout.testing
+import optivis.bench.components as components
+
+class TestSvgAssetCache(TestCase):
+  def setUp(self):
+    optivis.view.svg.SvgAssetCache.clear()
+    
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'asset.svg')
+    
+    self.writeAsset('<svg><rect id="a" width="1" height="1"/></svg>')
+  
+  def tearDown(self):
+    optivis.view.svg.SvgAssetCache.clear()
+    
+    shutil.rmtree(self.directory)
+  
+  def writeAsset(self, content, mtime=0):
+    with open(self.path, 'w') as f:
+      f.write(content)
+    
+    os.utime(self.path, (mtime, mtime))
+  
+  def test_parsed_once(self):
+    template = optivis.view.svg.SvgAssetCache.getTemplate(self.path)
+    
+    self.assertIs(optivis.view.svg.SvgAssetCache.getTemplate(self.path), template)
+    self.assertEqual(optivis.view.svg.SvgAssetCache.count(), 1)
+  
+  def test_modified(self):
+    optivis.view.svg.SvgAssetCache.getTemplate(self.path)
+    
+    self.writeAsset('<svg><circle r="1"/></svg>', mtime=1)
+    
+    self.assertEqual(optivis.view.svg.SvgAssetCache.getTemplate(self.path).getGraphicGroup()[0].tag, 'circle')
+  
+  def test_invalid_root(self):
+    self.writeAsset('<g/>', mtime=1)
+    
+    self.assertRaises(Exception, optivis.view.svg.SvgAssetCache.getTemplate, self.path)
+  
+  def test_components_share_asset(self):
+    scene = optivis.scene.Scene()
+    
+    m1 = components.CavityMirror()
+    m2 = components.CavityMirror()
+    
+    scene.link(m1.getOutputNode('fr'), m2.getInputNode('fr'), length=10)
+    scene.reference = m1
+    
+    view = optivis.view.svg.Svg(scene)
+    view.layout()
+    
+    view.getSvgString()
+    view.getSvgString()
+    
+    # only the mirror asset is loaded
+    self.assertEqual(optivis.view.svg.SvgAssetCache.count(), 1)
+
+class TestSvgTemplate(TestCase):
+  def setUp(self):
+    svgElement = et.fromstring('<svg><defs><linearGradient id="a"/><linearGradient id="b"/></defs><rect id="c" fill="url(#a)" stroke="url(#b)" style="fill: url(#b); stroke: url(#a)" filter="url(#other)"/></svg>')
+    
+    self.template = optivis.view.svg.SvgTemplate(svgElement)
+  
+  def getIds(self, graphicGroup):
+    return dict((element.attrib['id'], element) for element in graphicGroup.iter() if 'id' in element.attrib)
+  
+  def test_unique_ids(self):
+    groupA = self.template.getGraphicGroup()
+    groupB = self.template.getGraphicGroup()
+    
+    idsA = self.getIds(groupA)
+    idsB = self.getIds(groupB)
+    
+    self.assertEqual(len(idsA), 3)
+    self.assertEqual(set(idsA) & set(idsB), set([]))
+    
+    # template is left unaltered
+    self.assertEqual(set(self.getIds(self.template.graphicGroup)), set(['a', 'b', 'c']))
+  
+  def test_references(self):
+    graphicGroup = self.template.getGraphicGroup()
+    
+    rect = graphicGroup.find('rect')
+    gradients = graphicGroup.findall('defs/linearGradient')
+    
+    self.assertEqual(rect.attrib['fill'], 'url(#{0})'.format(gradients[0].attrib['id']))
+    self.assertEqual(rect.attrib['stroke'], 'url(#{0})'.format(gradients[1].attrib['id']))
+    
+    # every reference in an attribute is replaced
+    self.assertEqual(rect.attrib['style'], 'fill: url(#{0}); stroke: url(#{1})'.format(gradients[1].attrib['id'], gradients[0].attrib['id']))
+    
+    # references to IDs outside the graphic are left alone
+    self.assertEqual(rect.attrib['filter'], 'url(#other)')
+  
+  def test_duplicate_id(self):
+    self.assertRaises(Exception, optivis.view.svg.SvgTemplate, et.fromstring('<svg><g id="a"/><g id="a"/></svg>'))
+
+class TestSvgSymbols(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    m1 = components.CavityMirror()
+    m2 = components.CavityMirror()
+    
+    self.scene.link(laser.getOutputNode('out'), m1.getInputNode('fr'), length=10)
+    self.scene.link(m1.getOutputNode('bk'), m2.getInputNode('fr'), length=10)
+    self.scene.reference = laser
+    
+    self.view = optivis.view.svg.Svg(self.scene)
+    self.view.layout()
+  
+  def getRoot(self, **kwargs):
+    # strip XML declaration and doctype
+    svgString = self.view.getSvgString(**kwargs)
+    
+    return et.fromstring(svgString[svgString.index('<svg'):])
+  
+  def test_graphics_defined_once(self):
+    root = self.getRoot(symbols=True)
+    
+    definitions = root.findall('{http://www.w3.org/2000/svg}defs/{http://www.w3.org/2000/svg}g')
+    uses = root.findall('.//{http://www.w3.org/2000/svg}use')
+    
+    # one definition per distinct graphic, one reference per component
+    self.assertEqual(len(definitions), 2)
+    self.assertEqual(len(uses), 3)
+    
+    definitionIds = set(definition.attrib['id'] for definition in definitions)
+    
+    for use in uses:
+      self.assertIn(use.attrib['{http://www.w3.org/1999/xlink}href'][1:], definitionIds)
+  
+  def test_smaller_than_inline(self):
+    self.assertLess(len(self.view.getSvgString(symbols=True)), len(self.view.getSvgString()))
+  
+  def test_inline_by_default(self):
+    root = self.getRoot()
+    
+    self.assertEqual(root.findall('{http://www.w3.org/2000/svg}defs'), [])
+    self.assertEqual(root.findall('.//{http://www.w3.org/2000/svg}use'), [])
+
+class TestSvgStreaming(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    previousNode = components.Laser().getOutputNode('out')
+    
+    for i in range(0, 20):
+      mirror = components.CavityMirror()
+      
+      self.scene.link(previousNode, mirror.getInputNode('fr'), length=10)
+      
+      previousNode = mirror.getOutputNode('bk')
+    
+    self.scene.reference = self.scene.links[0].outputNode.component
+    
+    self.view = optivis.view.svg.Svg(self.scene)
+    self.view.layout()
+  
+  def test_written_incrementally(self):
+    writes = []
+    
+    class RecordingFile(object):
+      def write(self, data):
+        writes.append(data)
+    
+    self.view.writeSvg(RecordingFile())
+    
+    # header, root tag, 20 links, 21 components and closing tag
+    self.assertEqual(len(writes), 44)
+    self.assertTrue(writes[0].startswith('<?xml'))
+    self.assertEqual(writes[-1], '</svg>')
+  
+  def test_unique_ids(self):
+    svgString = self.view.getSvgString()
+    root = et.fromstring(svgString[svgString.index('<svg'):])
+    
+    ids = [element.attrib['id'] for element in root.iter() if 'id' in element.attrib]
+    
+    self.assertEqual(len(ids), len(set(ids)))
+  
+  def test_export(self):
+    directory = tempfile.mkdtemp()
+    
+    try:
+      path = os.path.join(directory, 'scene.svg')
+      
+      self.view.export(path)
+      
+      with open(path) as f:
+        self.assertEqual(et.fromstring(f.read().split('\n', 3)[3]).tag, '{http://www.w3.org/2000/svg}svg')
+    finally:
+      shutil.rmtree(directory)
+
+  def test_failed_export(self):
+    directory = tempfile.mkdtemp()
+    
+    try:
+      path = os.path.join(directory, 'scene.svg')
+      
+      # graphic of the last component is drawn last
+      self.scene.getComponents()[-1].filename = 'missing.svg'
+      
+      self.assertRaises(Exception, self.view.export, path)
+      
+      # no partial document or temporary file is left behind
+      self.assertEqual(os.listdir(directory), [])
+    finally:
+      shutil.rmtree(directory)
+
+class CountingSvg(optivis.view.svg.Svg):
+  """
+  SVG view that counts how many times it lays out its scene.
+  """
+  
+  def __init__(self, *args, **kwargs):
+    super(CountingSvg, self).__init__(*args, **kwargs)
+    
+    self.layoutCount = 0
+  
+  def layout(self, *args, **kwargs):
+    self.layoutCount += 1
+    
+    return super(CountingSvg, self).layout(*args, **kwargs)
+
+class TestSvgExportFormats(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    mirror = components.CavityMirror()
+    
+    scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), length=10)
+    scene.reference = laser
+    
+    self.view = CountingSvg(scene)
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def getPaths(self, name, extensions):
+    return [os.path.join(self.directory, name + extension) for extension in extensions]
+  
+  def test_layout_once(self):
+    paths = self.getPaths('figure', ['.svg', '.png', '.pdf', '.ps'])
+    
+    self.view.exportFormats(paths)
+    
+    self.assertEqual(self.view.layoutCount, 1)
+    
+    for path in paths:
+      self.assertTrue(os.path.getsize(path) > 0)
+  
+  def test_concurrent(self):
+    concurrentPaths = self.getPaths('concurrent', ['.png', '.svg'])
+    serialPaths = self.getPaths('serial', ['.png', '.svg'])
+    
+    # convert even small documents concurrently
+    self.view.concurrentSize = 0
+    
+    self.view.exportFormats(concurrentPaths + self.getPaths('concurrent', ['.pdf']))
+    self.view.exportFormats(serialPaths, concurrent=False)
+    
+    with open(concurrentPaths[0], 'rb') as concurrentFile:
+      with open(serialPaths[0], 'rb') as serialFile:
+        self.assertEqual(concurrentFile.read(), serialFile.read())
+  
+  def test_pool_reused(self):
+    self.assertIs(optivis.view.svg.Svg.getConversionPool(), optivis.view.svg.Svg.getConversionPool())
+  
+  def test_size(self):
+    paths = self.getPaths('figure', ['.svg', '.png'])
+    
+    self.view.exportFormats(paths, size=optivis.geometry.Coordinates(200, 100))
+    
+    with open(paths[0]) as f:
+      svgElement = et.fromstring(f.read().split('\n', 3)[3])
+    
+    self.assertEqual((svgElement.get('width'), svgElement.get('height')), ('200', '100'))
+  
+  def test_from_cache(self):
+    cache = optivis.view.cache.ExportCache(os.path.join(self.directory, 'cache'))
+    paths = self.getPaths('figure', ['.svg', '.png'])
+    
+    self.view.exportCache = cache
+    self.view.exportFormats(paths)
+    
+    with open(paths[1], 'rb') as f:
+      content = f.read()
+    
+    view = CountingSvg(self.view.scene.copy(), exportCache=cache)
+    view.exportFormats(self.getPaths('cached', ['.svg', '.png']))
+    
+    # served from cache without layout
+    self.assertEqual(view.layoutCount, 0)
+    
+    with open(self.getPaths('cached', ['.png'])[0], 'rb') as f:
+      self.assertEqual(f.read(), content)
+    
+    # shares entries with export
+    view.export(self.getPaths('exported', ['.png'])[0], fileFormat='png')
+    
+    self.assertEqual(view.layoutCount, 0)
+  
+  def test_invalid_format(self):
+    self.assertRaises(Exception, self.view.exportFormats, self.getPaths('figure', ['.svg', '.invalid']))
+    
+    # nothing is laid out if any path is invalid
+    self.assertEqual(self.view.layoutCount, 0)
+
+class TestSvgExportCache(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    
+    self.cache = optivis.view.cache.ExportCache(os.path.join(self.directory, 'cache'))
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def getView(self, length=10):
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    mirror = components.CavityMirror()
+    
+    scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), length=length)
+    scene.reference = laser
+    
+    return CountingSvg(scene, exportCache=self.cache)
+  
+  def test_unchanged_scene_from_cache(self):
+    path = os.path.join(self.directory, 'figure.png')
+    
+    self.getView().export(path, fileFormat='png')
+    
+    with open(path, 'rb') as f:
+      content = f.read()
+    
+    os.unlink(path)
+    
+    view = self.getView()
+    view.export(path, fileFormat='png')
+    
+    # served from cache without layout
+    self.assertEqual(view.layoutCount, 0)
+    
+    with open(path, 'rb') as f:
+      self.assertEqual(f.read(), content)
+  
+  def test_changed_scene(self):
+    path = os.path.join(self.directory, 'figure.svg')
+    
+    self.getView().export(path)
+    
+    view = self.getView(length=20)
+    view.export(path)
+    
+    self.assertEqual(view.layoutCount, 1)
+  
+  def test_scale_function(self):
+    path = os.path.join(self.directory, 'figure.svg')
+    
+    view = self.getView()
+    
+    # arranged with a different scale function to the default
+    view.layoutInstance = optivis.layout.StandardLayout(view.scene, scaleFunc=optivis.layout.scale.ScaleFunction([0, 3]))
+    view.export(path)
+    
+    view = self.getView()
+    view.export(path)
+    
+    # not served from the cache
+    self.assertEqual(view.layoutCount, 1)
+  
+  def test_no_cache_by_default(self):
+    self.assertIsNone(optivis.view.svg.Svg(self.getView().scene).exportCache)
+
+class TestSvgSharedLayout(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    laser = components.Laser()
+    mirror = components.CavityMirror()
+    
+    self.scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), length=10)
+    self.scene.reference = laser
+    
+    self.layout = optivis.layout.testing.CountingLayout(self.scene)
+    self.layout.arrange()
+    self.layout.linkCount = 0
+  
+  def test_shared_layout_reused(self):
+    view = optivis.view.svg.Svg(self.scene, layoutManager=optivis.layout.testing.CountingLayout, layoutInstance=self.layout)
+    view.getSvgString()
+    view.layout()
+    
+    self.assertEqual(self.layout.linkCount, 0)
+  
+  def test_edited_scene_arranged(self):
+    self.scene.links[0].length = 20
+    
+    view = optivis.view.svg.Svg(self.scene, layoutManager=optivis.layout.testing.CountingLayout, layoutInstance=self.layout)
+    view.layout()
+    
+    self.assertEqual(self.layout.linkCount, 1)
+  
+  def test_other_layout_manager(self):
+    view = optivis.view.svg.Svg(self.scene, layoutManager=optivis.layout.ConstrainedLayout, layoutInstance=self.layout)
+    view.layout()
+    
+    self.assertIsInstance(view.layoutInstance, optivis.layout.ConstrainedLayout)
+    self.assertFalse(self.layout.isArranged())